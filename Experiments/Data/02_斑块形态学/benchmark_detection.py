@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+培养皿自动检测回归基准
+
+对 Photos 中所有全盘照片运行 plaque_pipeline.detect_auto，与 检测基准.json 中
+记录的预期检测结果比较:
+- 圆心误差、半径误差（按预期半径归一化）、两圆重叠度 IoU
+- 置信度与耗时
+另列出与手动配置的圆（plaque_pipeline.PLATES）的偏差，供核对配置。
+
+判定（任一照片不达标即退出码 1）:
+- 与预期的 IoU 低于 MIN_IOU，或检测失败
+- 置信度比预期低 CONFIDENCE_DROP 以上，或预期达标而现在低于 MIN_CONFIDENCE
+- 基准里没有的照片只报告，不判定
+
+改动检测算法后运行；确认结果变好（--overlay 看标注图）后用 --update 写入新的预期。
+--overlay 输出标注图（绿=自动检测，红=手动配置），代替在 visualize_plates 上反复调参数。
+
+用法:
+    python benchmark_detection.py
+    python benchmark_detection.py --photos ./Photos --overlay ./检测基准
+    python benchmark_detection.py --update       # 把当前检测结果写为预期
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from photo_catalog import originals
+from plaque_pipeline import (MIN_CONFIDENCE, PHOTOS_DIR, PLATES, TABLE_TOLERANCE, Frame, detect_auto,
+                             load_rgb, photo_name, save_jpeg)
+
+# 预期检测结果 {照片名: {"plate": [cx, cy, r], "confidence", "method"}}
+EXPECTED_PATH = Path(__file__).with_name("检测基准.json")
+# 与预期的最低 IoU
+MIN_IOU = 0.95
+# 置信度允许的下降
+CONFIDENCE_DROP = 0.05
+
+
+def circle_iou(a: tuple, b: tuple) -> float:
+    """两个圆的交并比（解析解）"""
+    (x1, y1, r1), (x2, y2, r2) = a[:3], b[:3]
+    d = np.hypot(x1 - x2, y1 - y2)
+    if d >= r1 + r2:
+        inter = 0.0
+    elif d <= abs(r1 - r2):
+        inter = np.pi * min(r1, r2) ** 2
+    else:
+        a1 = r1 * r1 * np.arccos((d * d + r1 * r1 - r2 * r2) / (2 * d * r1))
+        a2 = r2 * r2 * np.arccos((d * d + r2 * r2 - r1 * r1) / (2 * d * r2))
+        a3 = 0.5 * np.sqrt((-d + r1 + r2) * (d + r1 - r2) * (d - r1 + r2) * (d + r1 + r2))
+        inter = a1 + a2 - a3
+    union = np.pi * (r1 * r1 + r2 * r2) - inter
+    return float(inter / union)
+
+
+def compare(auto: tuple, manual: tuple) -> dict:
+    r = manual[2]
+    return {
+        "center": float(np.hypot(auto[0] - manual[0], auto[1] - manual[1]) / r),
+        "radius": float((auto[2] - manual[2]) / r),
+        "iou": circle_iou(auto, manual),
+    }
+
+
+def draw_overlay(image: np.ndarray, auto: tuple, manual: tuple, out_path: Path):
+    canvas = image.copy()
+    thickness = max(3, min(image.shape[:2]) // 300)
+    if manual is not None:
+        cv2.circle(canvas, (int(manual[0]), int(manual[1])), int(manual[2]), (255, 0, 0), thickness)
+    if auto is not None:
+        cv2.circle(canvas, (auto[0], auto[1]), auto[2], (0, 200, 0), thickness)
+        cv2.circle(canvas, (auto[0], auto[1]), thickness * 3, (0, 200, 0), -1)
+    save_jpeg(canvas, out_path, quality=85)
+
+
+def run_benchmark(photos_dir: Path, overlay_dir: Path = None) -> list:
+    """
+    Returns:
+        [{"name", "plate", "confidence", "method", "seconds", "manual": compare() 或 None}]
+    """
+    photos = originals(Path(photos_dir), closeup=False)
+    if overlay_dir is not None:
+        overlay_dir.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    for p in photos:
+        name = photo_name(p)
+        image = load_rgb(p)
+        start = time.perf_counter()
+        detection = detect_auto(Frame(image))
+        seconds = time.perf_counter() - start
+
+        manual = PLATES.get(name)
+        vs = compare(detection.plate, manual) if detection.plate and manual else None
+        results.append({"name": name, "plate": detection.plate, "confidence": float(detection.confidence),
+                        "method": detection.method, "seconds": seconds, "manual": vs})
+        if overlay_dir is not None:
+            draw_overlay(image, detection.plate, manual, overlay_dir / f"{name}_检测.jpg")
+    return results
+
+
+def load_expected(path: Path = EXPECTED_PATH) -> dict:
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_expected(results: list, path: Path = EXPECTED_PATH):
+    expected = {r["name"]: {"plate": None if r["plate"] is None else [int(v) for v in r["plate"]],
+                            "confidence": round(r["confidence"], 3), "method": r["method"]}
+                for r in results}
+    # 每张照片一行，改动检测后 diff 一目了然
+    lines = [f" {json.dumps(name, ensure_ascii=False)}: {json.dumps(entry, ensure_ascii=False)}"
+             for name, entry in expected.items()]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{\n" + ",\n".join(lines) + "\n}\n")
+
+
+def regressions(res: dict, expected: dict, vs: dict) -> list:
+    """一张照片相对预期的问题（空列表 = 达标）；vs: 与预期圆的 compare()"""
+    problems = []
+    if expected.get("plate") is not None:
+        if res["plate"] is None:
+            problems.append("检测失败")
+        elif vs["iou"] < MIN_IOU:
+            problems.append(f"IoU {vs['iou']:.3f} < {MIN_IOU}")
+    if res["confidence"] < expected["confidence"] - CONFIDENCE_DROP:
+        problems.append(f"置信度 {expected['confidence']:.2f} -> {res['confidence']:.2f}")
+    elif expected["confidence"] >= MIN_CONFIDENCE > res["confidence"]:
+        problems.append(f"置信度低于阈值 {MIN_CONFIDENCE}")
+    return problems
+
+
+def print_report(results: list, expected: dict) -> int:
+    """打印报告，返回不达标的照片数"""
+    print(f"{'照片':<6}{'自动检测 (cx, cy, r)':<24}{'置信度':>8}{'方法':>8}{'耗时':>8}")
+    failed = 0
+    for res in results:
+        plate = "-" if res["plate"] is None else "({}, {}, {})".format(*res["plate"])
+        flag = "" if res["confidence"] >= MIN_CONFIDENCE else "  <- 低于阈值，将使用手动配置"
+        print(f"{res['name']:<6}{plate:<24}{res['confidence']:>8.2f}{str(res['method']):>8}"
+              f"{res['seconds']:>7.2f}s{flag}")
+        want = expected.get(res["name"])
+        if want is None:
+            print("    基准中没有这张照片（--update 加入）")
+        else:
+            vs = compare(res["plate"], want["plate"]) if res["plate"] and want["plate"] else None
+            if vs is not None:
+                print(f"    vs 预期     圆心 {vs['center']:6.1%}  半径 {vs['radius']:+6.1%}  IoU {vs['iou']:.3f}")
+            problems = regressions(res, want, vs)
+            failed += bool(problems)
+            for problem in problems:
+                print(f"    ✗ {problem}")
+        d = res["manual"]
+        if d is not None:
+            mark = "  偏差" if max(d["center"], abs(d["radius"])) > TABLE_TOLERANCE else ""
+            print(f"    vs 手动配置 圆心 {d['center']:6.1%}  半径 {d['radius']:+6.1%}  IoU {d['iou']:.3f}{mark}")
+
+    confident = [r for r in results if r["confidence"] >= MIN_CONFIDENCE]
+    print()
+    print(f"置信度达标: {len(confident)}/{len(results)} (阈值 {MIN_CONFIDENCE})")
+    if results:
+        print(f"平均耗时: {np.mean([r['seconds'] for r in results]):.2f}s/张")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="培养皿自动检测回归基准")
+    parser.add_argument("--photos", type=Path, default=PHOTOS_DIR, help="原始照片目录")
+    parser.add_argument("--overlay", type=Path, default=None, help="输出标注图的目录")
+    parser.add_argument("--update", action="store_true", help="把当前检测结果写为预期（检测基准.json）")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("培养皿自动检测回归基准")
+    print("=" * 60)
+    results = run_benchmark(args.photos, args.overlay)
+    if args.update:
+        save_expected(results)
+        print(f"已写入预期: {EXPECTED_PATH.name}（{len(results)} 张）")
+        return
+    failed = print_report(results, load_expected())
+    print(f"\n{'全部达标' if not failed else f'{failed} 张照片不达标'}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+斑块照片流水线性能基准（合成培养皿，离线、可复现）
+
+改动 enhance_array / detect_auto / sector_mask 等热点后运行，用数字确认没有变慢:
+1. 合成 - 按固定随机种子渲染培养皿照片：桌面、皿沿、培养基、已知直径的斑块、
+   光照梯度、噪声；12 MP（3024x4032）与 24 MP（4284x5712），编码成JPEG
+2. 计时 - 解码 + 流水线每个阶段单独计时，重复 N 次取最小值
+3. 内存 - 另跑一遍记录每个阶段的峰值分配（tracemalloc：NumPy/OpenCV 输出数组）
+4. 对比 - 与保存的基准（JSON）逐阶段比较，超过容差的标记为退化，退出码 1
+
+同时检查检测结果与合成真值的 IoU，防止"变快"是因为检测失败提前退出。
+
+用法:
+    python benchmark_pipeline.py --save-baseline          # 记录基准
+    python benchmark_pipeline.py                          # 与基准比较
+    python benchmark_pipeline.py --sizes 12MP --variants quarter --repeat 5
+"""
+
+import argparse
+import io
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from benchmark_detection import circle_iou
+from plaque_pipeline import VARIANTS, Frame, PlaquePipeline, load_rgb, save_jpeg
+
+BASELINE_PATH = Path(__file__).with_name("benchmark_baseline.json")
+
+# 合成照片尺寸 (width, height)，与手机原图一致（竖拍）
+SIZES = {"12MP": (3024, 4032), "24MP": (4284, 5712)}
+SEED = 20260126
+
+# 合成颜色（RGB）：培养基落在 AGAR_COLOR 的 HSV 范围内
+TABLE_RGB = (45, 45, 50)
+RIM_RGB = (215, 215, 210)
+AGAR_RGB = (205, 175, 110)
+PLAQUE_RGB = (150, 125, 75)
+HALO_RGB = (180, 152, 92)
+N_PLAQUES = 150
+PLAQUE_DIAMETER_FRAC = (0.008, 0.04)   # 斑块直径相对皿直径
+LIGHT_RANGE = (0.8, 1.1)               # 光照梯度（左上 -> 右下）
+NOISE = 6                              # 噪声幅度（灰度级）
+BAND_ROWS = 256                        # 光照/噪声按行带处理，避免整图浮点临时数组
+
+DEFAULT_VARIANTS = ("quarter", "unified", "precise")
+REPEAT = 3
+# 慢于基准超过该比例、且绝对差超过 MIN_DELTA 秒的阶段记为退化
+TOLERANCE = 0.2
+MIN_DELTA = 0.005
+# 检测结果与合成真值的 IoU 低于该值记为检测失败
+MIN_IOU = 0.9
+
+
+def synthetic_plate(size: tuple, seed: int = SEED) -> tuple:
+    """
+    渲染一张合成培养皿照片
+
+    Returns:
+        (RGB uint8 数组, 真值 {"plate": (cx, cy, r), "plaques": [(x, y, 直径px)]})
+    """
+    w, h = size
+    rng = np.random.default_rng(seed)
+    short = min(w, h)
+    r = int(short * 0.42)
+    cx = w // 2 + int(rng.integers(-short // 20, short // 20))
+    cy = int(h * 0.45) + int(rng.integers(-short // 20, short // 20))
+
+    image = np.empty((h, w, 3), dtype=np.uint8)
+    image[:] = TABLE_RGB
+    cv2.circle(image, (cx, cy), r, RIM_RGB, -1, cv2.LINE_AA)
+    cv2.circle(image, (cx, cy), int(r * 0.97), AGAR_RGB, -1, cv2.LINE_AA)
+
+    plaques = []
+    low, high = (f * 2 * r for f in PLAQUE_DIAMETER_FRAC)
+    while len(plaques) < N_PLAQUES:
+        x, y = rng.uniform(-r, r, 2)
+        d = rng.uniform(low, high)
+        if np.hypot(x, y) + d > 0.9 * r:
+            continue
+        px, py = int(cx + x), int(cy + y)
+        if rng.random() < 0.5:  # 一半斑块带晕环
+            cv2.circle(image, (px, py), int(d * 0.8), HALO_RGB, -1, cv2.LINE_AA)
+        cv2.circle(image, (px, py), int(d / 2), PLAQUE_RGB, -1, cv2.LINE_AA)
+        plaques.append((px, py, float(d)))
+
+    # 光照梯度（乘性）+ 噪声，按行带处理
+    low, high = LIGHT_RANGE
+    gx = np.linspace(0.0, (high - low) / 2, w, dtype=np.float32)
+    gy = np.linspace(low, low + (high - low) / 2, h, dtype=np.float32)
+    for top in range(0, h, BAND_ROWS):
+        band = image[top:top + BAND_ROWS]
+        gain = gx[None, :] + gy[top:top + len(band), None]
+        lit = band * gain[..., None]
+        lit += rng.integers(-NOISE, NOISE + 1, band.shape, dtype=np.int16)
+        np.clip(lit, 0, 255, out=lit)
+        band[:] = lit.astype(np.uint8)
+
+    return image, {"plate": (cx, cy, r), "plaques": plaques}
+
+
+def write_synthetic(size_name: str, work_dir: Path) -> tuple:
+    """合成照片编码为JPEG（解码计入基准），返回 (路径, 真值)"""
+    image, truth = synthetic_plate(SIZES[size_name])
+    path = Path(work_dir) / f"合成{size_name}_原始.jpg"
+    save_jpeg(image, path)
+    return path, truth
+
+
+def timed_pipeline(config: list, times: dict, peaks: dict = None) -> PlaquePipeline:
+    """各阶段套上计时（及峰值内存）的流水线；同名阶段按出现顺序编号"""
+    pipeline = PlaquePipeline.from_config(config)
+    wrapped = []
+    for i, ((name, _), (fn, params)) in enumerate(zip(pipeline.config, pipeline.stages)):
+        label = f"{i + 1:02d} {name}"
+
+        def run(state, _fn=fn, _label=label, **kwargs):
+            if peaks is not None:
+                tracemalloc.reset_peak()
+            start = time.perf_counter()
+            _fn(state, **kwargs)
+            times[_label] = time.perf_counter() - start
+            if peaks is not None:
+                peaks[_label] = tracemalloc.get_traced_memory()[1]
+
+        wrapped.append((run, params))
+    pipeline.stages = wrapped
+    return pipeline
+
+
+def run_once(path: Path, config: list, output_dir: Path, trace_memory: bool = False) -> tuple:
+    """
+    解码 + 跑一遍流水线
+
+    Returns:
+        (各阶段耗时, 各阶段峰值字节或 None, 最终 state)
+    """
+    times, peaks = {}, ({} if trace_memory else None)
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    image = load_rgb(path)
+    times["00 decode"] = time.perf_counter() - start
+    if trace_memory:
+        peaks["00 decode"] = tracemalloc.get_traced_memory()[1]
+    with redirect_stdout(io.StringIO()):  # 各阶段的进度输出不计入也不显示
+        state = timed_pipeline(config, times, peaks).run(Frame(image), path.stem, output_dir)
+    if trace_memory:
+        tracemalloc.stop()
+    return times, peaks, state
+
+
+def bench_case(path: Path, truth: dict, variant: str, output_dir: Path, repeat: int = REPEAT) -> dict:
+    """一种尺寸 × 一个版本：每阶段取 repeat 次中的最小耗时，再单独跑一遍测内存"""
+    runs = [run_once(path, VARIANTS[variant], output_dir)[0] for _ in range(repeat)]
+    seconds = {stage: min(r[stage] for r in runs) for stage in runs[0]}
+    _, peaks, state = run_once(path, VARIANTS[variant], output_dir, trace_memory=True)
+    plate = state.get("plate")
+    return {
+        "seconds": seconds,
+        "total": sum(seconds.values()),
+        "peak_mb": {stage: peak / 2 ** 20 for stage, peak in peaks.items()},
+        "iou": circle_iou(plate, truth["plate"]) if plate else 0.0,
+    }
+
+
+def compare_baseline(results: dict, baseline: dict, tolerance: float = TOLERANCE) -> list:
+    """
+    逐阶段与基准比较
+
+    Returns:
+        [(用例, 阶段, 基准秒, 当前秒)]：超出容差的阶段
+    """
+    regressions = []
+    for case, res in results.items():
+        base = baseline.get("results", {}).get(case)
+        if base is None:
+            continue
+        for stage, now in list(res["seconds"].items()) + [("total", res["total"])]:
+            before = base["total"] if stage == "total" else base["seconds"].get(stage)
+            if before is not None and now > before * (1 + tolerance) and now - before > MIN_DELTA:
+                regressions.append((case, stage, before, now))
+    return regressions
+
+
+def print_case(case: str, res: dict, base: dict = None):
+    print(f"\n{case}  总计 {res['total']:.2f}s  检测 IoU {res['iou']:.3f}")
+    print(f"  {'阶段':<22}{'耗时':>9}{'基准':>9}{'变化':>9}{'峰值内存':>12}")
+    for stage, sec in res["seconds"].items():
+        before = base["seconds"].get(stage) if base else None
+        change = f"{sec / before - 1:+.0%}" if before else "-"
+        before_text = f"{before * 1000:.0f}ms" if before else "-"
+        print(f"  {stage:<22}{sec * 1000:>7.0f}ms{before_text:>9}{change:>9}"
+              f"{res['peak_mb'].get(stage, 0):>10.1f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="斑块照片流水线性能基准（合成数据）")
+    parser.add_argument("--sizes", nargs="+", default=list(SIZES), choices=list(SIZES), help="合成照片尺寸")
+    parser.add_argument("--variants", nargs="+", default=list(DEFAULT_VARIANTS), choices=sorted(VARIANTS),
+                        help="流水线版本")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="每个用例重复次数（取最小值）")
+    parser.add_argument("--threads", type=int, default=1, help="OpenCV 线程数（固定以便复现）")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="基准文件")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果保存为基准")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="退化容差（比例）")
+    args = parser.parse_args()
+
+    cv2.setNumThreads(args.threads)
+    cv2.setRNGSeed(SEED)
+
+    print("=" * 60)
+    print("斑块照片流水线性能基准")
+    print(f"OpenCV {cv2.__version__}，线程 {args.threads}，重复 {args.repeat} 次")
+    print("=" * 60)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        for size_name in args.sizes:
+            path, truth = write_synthetic(size_name, work_dir)
+            for variant in args.variants:
+                results[f"{size_name}/{variant}"] = bench_case(path, truth, variant, work_dir, args.repeat)
+
+    baseline = {}
+    if args.baseline.exists() and not args.save_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    for case, res in results.items():
+        print_case(case, res, baseline.get("results", {}).get(case))
+    # 用 tracemalloc 的阶段峰值（跨平台；resource.ru_maxrss 在 Windows 上没有）
+    case, stage, peak = max(((case, stage, mb) for case, res in results.items()
+                             for stage, mb in res["peak_mb"].items()), key=lambda x: x[2])
+    print(f"\n最大阶段峰值分配: {peak:.0f}MB（{case} {stage}）")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"opencv": cv2.__version__, "threads": args.threads, "results": results},
+                      f, ensure_ascii=False, indent=1)
+        print(f"基准已保存: {args.baseline}")
+        return
+
+    if not baseline:
+        print("没有基准文件，用 --save-baseline 先记录一次")
+        return
+    regressions = compare_baseline(results, baseline, args.tolerance)
+    failed = [case for case, res in results.items() if res["iou"] < MIN_IOU]
+    for case, stage, before, now in regressions:
+        print(f"退化: {case} {stage} {before * 1000:.0f}ms -> {now * 1000:.0f}ms")
+    for case in failed:
+        print(f"检测失败: {case} IoU {results[case]['iou']:.3f}")
+    if regressions or failed:
+        sys.exit(1)
+    print(f"没有超过 {args.tolerance:.0%} 的退化")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+缩放路径对比：precise / quarter 流水线与原 PIL 实现（两步 LANCZOS）
+
+原 process_plaque_precise.py / process_plaque_quarter.py 先把培养皿 LANCZOS 缩放到
+1600px 直径，裁剪象限（quarter 再加扇形mask）、增强后再 LANCZOS 缩放到 800px。
+流水线的标准化缩放是延迟的（plaque_pipeline.Frame.scaled），裁剪、翻转只更新映射，
+到增强时只采样用到的象限；增强要在标准直径下做（USM 半径按像素计），
+所以输出缩放仍是第二次缩放。这里确认画质与原实现一致、流水线确实变快:
+1. 参考 - reference_precise / reference_quarter：原 PIL 实现（两步 LANCZOS + reference_enhance），
+   圆心、半径、象限用流水线检测的结果，保证两边裁剪的是同一块区域
+2. 画质 - 流水线最终输出与参考的 SSIM（灰度，11x11 高斯窗）
+3. 速度 - 检测之后、保存之前的全部阶段（即流水线实际走的路径）与原 PIL 实现，
+   各重复 N 次取最小值
+4. 取舍 - 另跑"一次缩放"的阶段顺序（先缩放到输出尺寸再增强/mask）作对照，
+   只打印不判定：更快，但增强在 800px 上做，SSIM 明显下降
+5. 判定 - 流水线任一 SSIM 低于 MIN_SSIM 即失败，退出码 1
+
+用法:
+    python benchmark_resize.py                     # Photos/ 下的 R*/W*_原始.jpg（非特写）
+    python benchmark_resize.py R1_原始.jpg R2_原始.jpg --repeat 5
+"""
+
+import argparse
+import io
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from check_enhance import reference_enhance
+from photo_ingest import read_meta
+from plaque_pipeline import (OUTPUT_SIZE, PHOTOS_DIR, STANDARD_PLATE_DIAMETER, VARIANTS,
+                             PlaquePipeline, SkipImage, is_closeup, load_rgb, photo_name, quarter_mask)
+
+# 与原输出的最低 SSIM
+MIN_SSIM = 0.97
+# 培养皿外接正方形边距（与 VARIANTS 中 standardize_plate 的 margin 一致）
+MARGINS = {"precise": 0.05, "quarter": 0.02}
+# 原实现象限 -> (水平翻转, 垂直翻转)，翻转后弧线在右上角
+FLIPS = {"TR": (False, False), "TL": (True, False), "BR": (False, True), "BL": (True, True)}
+# "一次缩放"对照：输出缩放提前到几何阶段之后，增强/mask 都在输出尺寸上做
+SINGLE_RESIZE = {
+    "precise": ["resize_square", "enhance"],
+    "quarter": ["resize_square", "sector_mask", "enhance", "sector_mask"],
+}
+
+
+def ssim(a: np.ndarray, b: np.ndarray) -> float:
+    """灰度 SSIM（Wang et al. 2004，11x11 高斯窗 sigma=1.5）"""
+    x = cv2.cvtColor(a, cv2.COLOR_RGB2GRAY).astype(np.float64)
+    y = cv2.cvtColor(b, cv2.COLOR_RGB2GRAY).astype(np.float64)
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+
+    def blur(img):
+        return cv2.GaussianBlur(img, (11, 11), 1.5)
+
+    mx, my = blur(x), blur(y)
+    vx, vy, cov = blur(x * x) - mx * mx, blur(y * y) - my * my, blur(x * y) - mx * my
+    s = ((2 * mx * my + c1) * (2 * cov + c2)) / ((mx * mx + my * my + c1) * (vx + vy + c2))
+    return float(s.mean())
+
+
+def reference_geometry(image: np.ndarray, plate: tuple, quadrant: str, margin: float,
+                       half: int = None) -> Image.Image:
+    """原实现的几何部分：裁剪外接正方形 -> LANCZOS 到标准直径 -> 翻转后裁剪右上象限"""
+    cx, cy, r = plate
+    m = int(r * margin)
+    h, w = image.shape[:2]
+    img = Image.fromarray(image).crop((max(0, cx - r - m), max(0, cy - r - m),
+                                       min(w, cx + r + m), min(h, cy + r + m)))
+    scale = STANDARD_PLATE_DIAMETER / (2 * r)
+    img = img.resize((int(img.width * scale), int(img.height * scale)), Image.Resampling.LANCZOS)
+
+    flip_h, flip_v = FLIPS[quadrant]
+    if flip_h:
+        img = img.transpose(Image.FLIP_LEFT_RIGHT)
+    if flip_v:
+        img = img.transpose(Image.FLIP_TOP_BOTTOM)
+    w, h = img.size
+    cx, cy = w // 2, h // 2
+    if half is None:
+        return img.crop((cx, 0, w, cy))
+    return img.crop((cx, max(0, cy - half), min(w, cx + half), cy))
+
+
+def reference_mask(img: Image.Image) -> Image.Image:
+    """
+    原实现的扇形mask：圆心在左下角，扇形外纯黑
+    （原实现 mask 只有短边大小，裁剪不是正方形时 paste 报错；这里与 sector_mask 一样补黑）
+    """
+    size = min(img.size)
+    mask = np.zeros((img.height, img.width), dtype=np.uint8)
+    mask[:size, :size][quarter_mask(size)] = 255
+    result = Image.new("RGB", img.size, (0, 0, 0))
+    result.paste(img, (0, 0), Image.fromarray(mask))
+    return result
+
+
+def reference_precise(image: np.ndarray, plate: tuple, quadrant: str) -> np.ndarray:
+    """原 process_plaque_precise.py：几何 -> 增强 -> LANCZOS 到输出尺寸"""
+    img = reference_geometry(image, plate, quadrant, MARGINS["precise"])
+    img = Image.fromarray(reference_enhance(np.asarray(img)))
+    return np.asarray(img.resize((OUTPUT_SIZE, OUTPUT_SIZE), Image.Resampling.LANCZOS))
+
+
+def reference_quarter(image: np.ndarray, plate: tuple, quadrant: str) -> np.ndarray:
+    """原 process_plaque_quarter.py：几何 -> 扇形mask -> 增强 -> LANCZOS 到输出尺寸 -> 再mask"""
+    img = reference_geometry(image, plate, quadrant, MARGINS["quarter"], STANDARD_PLATE_DIAMETER // 2)
+    img = Image.fromarray(reference_enhance(np.asarray(reference_mask(img))))
+    return np.asarray(reference_mask(img.resize((OUTPUT_SIZE, OUTPUT_SIZE), Image.Resampling.LANCZOS)))
+
+
+REFERENCES = {"precise": reference_precise, "quarter": reference_quarter}
+
+
+def run_stages(stages: list, image: np.ndarray, name: str, fields: dict = None) -> dict:
+    """在内存中跑阶段（不含 save），返回 state；阶段的打印输出丢弃"""
+    with tempfile.TemporaryDirectory() as tmp, redirect_stdout(io.StringIO()):
+        return PlaquePipeline.from_config(stages).run(image, name, Path(tmp), fields=fields)
+
+
+def best_time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def single_resize(stages: list, variant: str) -> list:
+    """对照用的阶段顺序：几何阶段之后先缩放到输出尺寸，再做增强/mask"""
+    geometry = [s for s in stages if s[0] not in ("sector_mask", "enhance", "resize_square")]
+    return geometry + [(name, {}) for name in SINGLE_RESIZE[variant]]
+
+
+def compare_variant(variant: str, image: np.ndarray, name: str, repeat: int) -> float:
+    """一个版本：打印 SSIM 与耗时，返回流水线输出的 SSIM"""
+    stages = [s for s in VARIANTS[variant] if s[0] != "save"]
+    detected = run_stages(stages[:1], image, name)
+    fields = {"plate": detected["plate"], "quadrant": detected["quadrant"] or "TR"}
+    reference = REFERENCES[variant](image, fields["plate"], fields["quadrant"])
+
+    # 检测只做一次，计时的是检测之后流水线实际执行的阶段
+    paths = [("流水线", stages[1:]), ("一次缩放", single_resize(stages[1:], variant))]
+    old_t = best_time(lambda: REFERENCES[variant](image, fields["plate"], fields["quadrant"]), repeat)
+    print(f"  {variant}: 圆 {fields['plate']} 象限 {fields['quadrant']}，原 PIL 实现 {old_t * 1000:.0f}ms")
+    values = []
+    for i, (label, path) in enumerate(paths):
+        output = run_stages(path, image, name, fields)["frame"].rgb
+        values.append(ssim(output, reference))
+        t = best_time(lambda: run_stages(path, image, name, fields)["frame"].rgb, repeat)
+        mark = "·" if i else ("✓" if values[0] >= MIN_SSIM else "✗")
+        print(f"    {mark} {label:<8} SSIM {values[-1]:.4f}  {t * 1000:.0f}ms（{old_t / t:.1f}x）")
+    return values[0]
+
+
+def compare_photo(path: Path, repeat: int) -> list:
+    """一张照片的 [(版本, SSIM)]"""
+    name = photo_name(path)
+    image = load_rgb(path, orientation=read_meta(path).orientation)
+    print(f"  {name}")
+    return [(variant, compare_variant(variant, image, name, repeat)) for variant in REFERENCES]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="precise / quarter 流水线与原 PIL 实现的画质（SSIM）与耗时对比")
+    parser.add_argument("photos", nargs="*", type=Path, help="全盘照片（默认 Photos/ 下的非特写原图）")
+    parser.add_argument("--repeat", type=int, default=3, help="计时重复次数")
+    args = parser.parse_args()
+
+    photos = args.photos or sorted(p for p in PHOTOS_DIR.glob("*_原始.jpg") if not is_closeup(p))
+    if not photos:
+        print(f"✗ 没有照片: {PHOTOS_DIR}")
+        sys.exit(1)
+
+    print(f"阈值: SSIM ≥ {MIN_SSIM}")
+    failed = 0
+    for path in photos:
+        try:
+            results = compare_photo(path, args.repeat)
+        except SkipImage as e:
+            print(f"  跳过 {path.name}: {e}")
+            continue
+        failed += sum(value < MIN_SSIM for _, value in results)
+
+    print(f"\n{'全部达标' if not failed else f'{failed} 项低于阈值'}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+增强结果回归检查：enhance_array（及分块版 enhance_tiled）与原 PIL 增强链逐像素比较
+
+enhance_array 替换了 process_plaque_*.py 原来的 enhance_image（PIL ImageEnhance + UnsharpMask），
+输出必须与之一致，改动增强代码或升级 OpenCV / Pillow / NumPy 后运行:
+1. 参考 - reference_enhance：原 enhance_image 的 PIL 实现，原样保留
+2. 比较 - 每张照片（原图及其中心裁剪）计算最大差值、不同像素数、PSNR
+3. 分块 - enhance_tiled（小块，强制跨块）与整图 enhance_array 比较
+4. 判定 - 最大差值超过 MAX_DIFF 即失败，退出码 1
+
+用法:
+    python check_enhance.py                       # Photos/ 下的 *_原始.jpg
+    python check_enhance.py R1_原始.jpg W1-1-5_原始.jpg --crop 900
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageEnhance, ImageFilter
+
+from plaque_pipeline import PHOTOS_DIR, enhance_array, load_rgb
+from plaque_tiles import enhance_tiled
+
+# 允许的最大逐像素差值（0 = 必须逐像素一致）
+MAX_DIFF = 0
+# 分块检查用的块边长（小于照片，保证跨块）
+CHECK_TILE = 256
+
+
+def reference_enhance(image: np.ndarray) -> np.ndarray:
+    """原 process_plaque_*.py 的 enhance_image（PIL 实现）"""
+    img = Image.fromarray(image)
+    img = ImageEnhance.Contrast(img).enhance(1.3)
+    img = ImageEnhance.Sharpness(img).enhance(1.5)
+    img = ImageEnhance.Brightness(img).enhance(1.1)
+    img = img.filter(ImageFilter.UnsharpMask(radius=2, percent=150, threshold=3))
+    return np.asarray(img)
+
+
+def compare(a: np.ndarray, b: np.ndarray) -> tuple:
+    """(最大差值, 不同像素数, PSNR dB)，完全一致时 PSNR 为 inf"""
+    diff = np.abs(a.astype(np.int16) - b.astype(np.int16))
+    mse = float(np.mean(diff.astype(np.float64) ** 2))
+    psnr = float("inf") if mse == 0 else 10 * np.log10(255 ** 2 / mse)
+    return int(diff.max()), int(np.count_nonzero(diff.max(axis=-1))), psnr
+
+
+def center_crop(image: np.ndarray, size: int) -> np.ndarray:
+    h, w = image.shape[:2]
+    top, left = max(0, (h - size) // 2), max(0, (w - size) // 2)
+    return np.ascontiguousarray(image[top:top + size, left:left + size])
+
+
+def check(name: str, image: np.ndarray) -> bool:
+    """比较一张图，打印结果，返回是否通过"""
+    ours = enhance_array(image)
+    max_diff, count, psnr = compare(ours, reference_enhance(image))
+    tiled_diff = compare(enhance_tiled(image, tile=CHECK_TILE, workers=1), ours)[0]
+    ok = max_diff <= MAX_DIFF and tiled_diff <= MAX_DIFF
+    h, w = image.shape[:2]
+    print(f"  {'✓' if ok else '✗'} {name:<24}{w:>5}x{h:<5} 与PIL 最大差 {max_diff:>3}，"
+          f"不同像素 {count:>8}，PSNR {psnr:.1f} dB；分块与整图最大差 {tiled_diff}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="enhance_array 与 PIL 增强链逐像素比较")
+    parser.add_argument("photos", nargs="*", type=Path, help="照片（默认 Photos/ 下的 *_原始.jpg）")
+    parser.add_argument("--crop", type=int, default=900, help="另外检查的中心裁剪边长（0 = 不裁剪）")
+    args = parser.parse_args()
+
+    photos = args.photos or sorted(PHOTOS_DIR.glob("*_原始.jpg"))
+    if not photos:
+        print(f"✗ 没有照片: {PHOTOS_DIR}")
+        sys.exit(1)
+
+    print(f"容差: 最大差值 ≤ {MAX_DIFF}")
+    failed = 0
+    for path in photos:
+        image = load_rgb(path)
+        failed += not check(path.stem, image)
+        if args.crop:
+            failed += not check(f"{path.stem}[{args.crop}]", center_crop(image, args.crop))
+
+    print(f"\n{'全部一致' if not failed else f'{failed} 项超出容差'}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+特写照片的比例尺：把特写配准到同一培养皿的全盘照片
+
+特写照片（R1-5 等）只拍到培养皿的一部分，照片里没有比例尺；全盘照片上培养皿直径 = 90mm。
+两张照片拍的是同一块平板，斑块的相对位置不变：把特写缩小后在全盘照片上找到同一片斑块，
+缩放比例就给出特写的 px/mm。
+
+处理流程:
+1. 全盘照片 - 同名去掉末尾 "-数字" 的照片（R3-5 -> R3_原始.jpg，没有原图时用 _裁剪.jpg，
+   裁剪不改变像素尺度），自动检测培养皿（detect_auto，置信度须 ≥ MIN_CONFIDENCE）
+2. 斑块图 - 两张照片各自缩小（FULL_SCALE / CLOSEUP_SCALE），背景减图像后按噪声水平
+   阈值分割出暗斑块，模糊成 0~1 的斑块图：只比较斑块位置，不受两次拍摄的光照、白平衡影响
+3. 配准 - 特写斑块图按 SCALES 中的每个比例缩放，在全盘斑块图（皿内）上做归一化互相关，
+   取最高分，再在最佳比例附近细化（REFINE_STEPS）
+4. 验证 - 最高分低于 MIN_SCORE、特写中斑块少于 MIN_LANDMARKS、
+   或离最佳位置一个模板半径以外还有 ≥ AMBIGUITY × 最高分的位置（斑块排列重复，无法确定）时拒绝
+
+用法:
+    python closeup_scale.py                      # 所有特写照片的配准结果
+    python closeup_scale.py --overlay ./配准     # 同时输出全盘照片上的特写位置
+"""
+
+import argparse
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from photo_catalog import closeup_name, parse_name
+from plaque_pipeline import (MIN_CONFIDENCE, PHOTOS_DIR, Frame, SkipImage, detect_auto, load_rgb,
+                             save_jpeg)
+
+PLATE_DIAMETER_MM = 90.0
+# 全盘照片可用作比例尺的种类（按优先顺序）
+PARENT_KINDS = ("原始", "裁剪")
+
+# 斑块图分辨率：全盘照片缩小到 1/4，特写缩小到 1/8（斑块在两张图上都有几个像素）
+FULL_SCALE = 0.25
+CLOSEUP_SCALE = 0.125
+# 背景中值滤波核（缩小后的像素，奇数，需大于最大斑块）
+FULL_KERNEL = 31
+CLOSEUP_KERNEL = 51
+LAWN_MIN_GRAY = 80            # 背景亮度下限，低于此值视为培养皿外
+MASK_MIN_CONTRAST = 8         # 斑块与背景的最小灰度差
+MASK_K = 4                    # 阈值 = 差值中位数 + MASK_K × MAD
+MASK_BLUR = 1.5               # 斑块图的高斯模糊 σ（容忍 1~2px 的形变）
+PLATE_RIM = 0.97              # 全盘斑块图只取培养皿半径97%以内
+
+# 特写 -> 全盘的缩放比例搜索范围（全盘像素 / 特写像素）
+SCALES = np.geomspace(0.1, 0.5, 60)
+REFINE_STEPS = np.geomspace(1 / 1.03, 1.03, 13)
+
+# 验证
+MIN_SCORE = 0.4
+AMBIGUITY = 0.9
+MIN_LANDMARKS = 3
+
+# scale: 全盘像素 / 特写像素；offset: 特写左上角在全盘照片中的位置；
+# score: 最佳位置的互相关；elsewhere: 离最佳位置一个模板半径以外的最高分
+CloseupScale = namedtuple("CloseupScale", ["closeup", "parent", "plate", "confidence", "scale", "offset",
+                                           "px_per_mm", "score", "elsewhere", "landmarks"])
+
+
+def parent_photo(path: Path) -> Path:
+    """特写照片对应的全盘照片（R3-5_原始.jpg -> R3_原始.jpg / R3_裁剪.jpg），找不到时返回 None"""
+    name = parse_name(path.stem)["name"].rsplit("-", 1)[0]
+    for kind in PARENT_KINDS:
+        candidate = path.with_name(f"{name}_{kind}.jpg")
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def closeup_photos(photos_dir: Path = PHOTOS_DIR) -> list:
+    """
+    photos_dir 中的特写原图及其全盘照片 [(特写, 全盘)]，按名称排序
+
+    名字以 "-数字" 结尾、又是其他特写的全盘照片的（W1-1 是 W1-1-5 的全盘）不算特写
+    """
+    names = {}
+    for path in sorted(photos_dir.glob("*_原始.jpg")):
+        info = parse_name(path.stem)
+        if info is not None:
+            names[info["name"]] = path
+    parents = {name.rsplit("-", 1)[0] for name in names if closeup_name(name)}
+    pairs = []
+    for name, path in names.items():
+        if closeup_name(name) and name not in parents:
+            pairs.append((path, parent_photo(path)))
+    return pairs
+
+
+def plaque_map(gray: np.ndarray, kernel: int, region: np.ndarray = None) -> tuple:
+    """
+    暗斑块的 0~1 模糊图
+
+    Returns:
+        (斑块图 float32, 斑块个数)
+    """
+    background = cv2.medianBlur(gray, kernel).astype(np.float32)
+    diff = np.clip(background - cv2.GaussianBlur(gray, (3, 3), 0), 0, 255)
+    lawn = background > LAWN_MIN_GRAY
+    if region is not None:
+        lawn &= region
+    # 向内收缩半个核，避开培养皿边缘和照片边缘的背景估计误差
+    lawn = cv2.erode(lawn.astype(np.uint8), np.ones((kernel // 2 | 1,) * 2, np.uint8)) > 0
+    if not lawn.any():
+        return np.zeros(gray.shape, np.float32), 0
+    values = diff[lawn]
+    median = np.median(values)
+    threshold = max(MASK_MIN_CONTRAST, median + MASK_K * np.median(np.abs(values - median)))
+    mask = ((diff > threshold) & lawn).astype(np.uint8)
+    count = cv2.connectedComponents(mask)[0] - 1
+    return cv2.GaussianBlur(mask.astype(np.float32), (0, 0), MASK_BLUR), count
+
+
+def match_scale(full_map: np.ndarray, closeup_map: np.ndarray, scale: float) -> tuple:
+    """
+    特写斑块图按 scale（全盘 / 特写）缩放后在全盘斑块图上的互相关
+
+    Returns:
+        (互相关图, 模板尺寸 (h, w))；模板为空或大于全盘图时返回 (None, None)
+    """
+    zoom = scale * FULL_SCALE / CLOSEUP_SCALE
+    h, w = closeup_map.shape
+    size = (max(1, round(w * zoom)), max(1, round(h * zoom)))
+    if size[0] > full_map.shape[1] or size[1] > full_map.shape[0]:
+        return None, None
+    template = cv2.resize(closeup_map, size, interpolation=cv2.INTER_AREA)
+    if template.sum() < 1:
+        return None, None
+    return cv2.matchTemplate(full_map, template, cv2.TM_CCORR_NORMED), template.shape
+
+
+def register(full_gray: np.ndarray, plate: tuple, closeup_gray: np.ndarray) -> tuple:
+    """
+    在全盘照片上找特写的位置和缩放比例
+
+    Returns:
+        (scale, offset (x, y) 全盘像素, score, elsewhere, landmarks)
+    """
+    small = cv2.resize(full_gray, None, fx=FULL_SCALE, fy=FULL_SCALE, interpolation=cv2.INTER_AREA)
+    cx, cy, r = (v * FULL_SCALE for v in plate)
+    y, x = np.ogrid[:small.shape[0], :small.shape[1]]
+    full_map, _ = plaque_map(small, FULL_KERNEL, (x - cx) ** 2 + (y - cy) ** 2 < (PLATE_RIM * r) ** 2)
+    small = cv2.resize(closeup_gray, None, fx=CLOSEUP_SCALE, fy=CLOSEUP_SCALE, interpolation=cv2.INTER_AREA)
+    closeup_map, landmarks = plaque_map(small, CLOSEUP_KERNEL)
+
+    maps = []
+    for scale in SCALES:
+        result, shape = match_scale(full_map, closeup_map, scale)
+        if result is not None:
+            maps.append((scale, result, shape))
+    if not maps:
+        return None, None, 0.0, 0.0, landmarks
+    scale, result, shape = max(maps, key=lambda m: m[1].max())
+    _, score, _, loc = cv2.minMaxLoc(result)
+
+    # 重复图案：离最佳位置一个模板半径以外（任意比例）的最高分
+    radius = max(shape) / 2
+    elsewhere = 0.0
+    for _, other, _ in maps:
+        y, x = np.ogrid[:other.shape[0], :other.shape[1]]
+        far = (x - loc[0]) ** 2 + (y - loc[1]) ** 2 > radius ** 2
+        if far.any():
+            elsewhere = max(elsewhere, float(other[far].max()))
+
+    # 在最佳比例附近细化
+    coarse = scale
+    for step in REFINE_STEPS:
+        result, _ = match_scale(full_map, closeup_map, coarse * step)
+        if result is None:
+            continue
+        _, value, _, at = cv2.minMaxLoc(result)
+        if value > score:
+            scale, score, loc = coarse * step, value, at
+    return scale, (loc[0] / FULL_SCALE, loc[1] / FULL_SCALE), score, elsewhere, landmarks
+
+
+def problem(result: CloseupScale) -> str:
+    """配准结果不可用的原因，可用时返回 None"""
+    if result.scale is None:
+        return "没有可匹配的斑块"
+    if result.landmarks < MIN_LANDMARKS:
+        return f"特写中只有 {result.landmarks} 个斑块（至少 {MIN_LANDMARKS} 个）"
+    if result.score < MIN_SCORE:
+        return f"匹配分数 {result.score:.2f} < {MIN_SCORE}"
+    if result.elsewhere >= AMBIGUITY * result.score:
+        return f"其他位置分数 {result.elsewhere:.2f} 与最佳 {result.score:.2f} 接近（斑块排列重复）"
+    return None
+
+
+def closeup_scale(closeup: Path, parent: Path) -> CloseupScale:
+    """
+    配准一张特写照片
+
+    Raises:
+        SkipImage: 没有全盘照片、培养皿检测置信度不足或配准结果不可用
+    """
+    if parent is None:
+        raise SkipImage(f"{closeup.name}: 没有对应的全盘照片")
+    full = load_rgb(parent)
+    detection = detect_auto(Frame(full))
+    if detection.plate is None or detection.confidence < MIN_CONFIDENCE:
+        raise SkipImage(f"{parent.name}: 培养皿检测置信度 {detection.confidence:.2f} < {MIN_CONFIDENCE}")
+    full_gray = cv2.cvtColor(full, cv2.COLOR_RGB2GRAY)
+    del full
+    closeup_gray = cv2.cvtColor(load_rgb(closeup), cv2.COLOR_RGB2GRAY)
+
+    scale, offset, score, elsewhere, landmarks = register(full_gray, detection.plate, closeup_gray)
+    px_per_mm = 2 * detection.plate[2] / PLATE_DIAMETER_MM / scale if scale else None
+    result = CloseupScale(closeup.name, parent.name, detection.plate, detection.confidence, scale, offset,
+                          px_per_mm, score, elsewhere, landmarks)
+    reason = problem(result)
+    if reason:
+        raise SkipImage(f"{closeup.name}: {reason}")
+    return result
+
+
+def plate_in_closeup(result: CloseupScale, zoom: float = 1.0) -> tuple:
+    """全盘照片上检测到的培养皿在特写坐标中的位置 (cx, cy, r)；zoom 为特写的额外缩放"""
+    cx, cy, r = result.plate
+    x0, y0 = result.offset
+    return ((cx - x0) / result.scale * zoom, (cy - y0) / result.scale * zoom, r / result.scale * zoom)
+
+
+def save_overlay(result: CloseupScale, photos_dir: Path, out_dir: Path):
+    """全盘照片上画出培养皿（绿）和特写的范围（红）"""
+    full = load_rgb(photos_dir / result.parent)
+    h, w = load_rgb(photos_dir / result.closeup, reduce=8).shape[:2]
+    x0, y0 = result.offset
+    size = (round(w * 8 * result.scale), round(h * 8 * result.scale))
+    overlay = np.ascontiguousarray(full)
+    cx, cy, r = result.plate
+    thickness = max(2, r // 150)
+    cv2.circle(overlay, (cx, cy), r, (0, 200, 0), thickness)
+    cv2.rectangle(overlay, (round(x0), round(y0)), (round(x0) + size[0], round(y0) + size[1]),
+                  (230, 0, 0), thickness)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    save_jpeg(overlay, out_dir / f"{Path(result.closeup).stem}_配准.jpg", quality=85)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="特写照片配准到全盘照片，得到 px/mm")
+    parser.add_argument("--photos", type=Path, default=PHOTOS_DIR, help="照片目录")
+    parser.add_argument("--overlay", type=Path, default=None, help="输出标注图的目录")
+    args = parser.parse_args()
+
+    print(f"{'特写':<10}{'全盘':<14}{'比例':>8}{'px/mm':>8}{'分数':>7}{'其他位置':>9}{'斑块':>6}{'耗时':>7}")
+    print("-" * 72)
+    for closeup, parent in closeup_photos(args.photos):
+        name = parse_name(closeup.stem)["name"]
+        start = time.perf_counter()
+        try:
+            result = closeup_scale(closeup, parent)
+        except SkipImage as e:
+            print(f"{name:<10}跳过: {e}")
+            continue
+        elapsed = time.perf_counter() - start
+        print(f"{name:<10}{Path(result.parent).stem:<14}{result.scale:>8.4f}{result.px_per_mm:>8.1f}"
+              f"{result.score:>7.3f}{result.elsewhere:>9.3f}{result.landmarks:>6}{elapsed:>6.1f}s")
+        if args.overlay:
+            save_overlay(result, args.photos, args.overlay)
+
+
+if __name__ == "__main__":
+    main()
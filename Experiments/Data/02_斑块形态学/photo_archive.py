@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+照片无损归档：保存 HEIC 原始字节 + 派生输出的处理配方，输出按需渲染并缓存
+
+process_plaque_photos.py 把每张 HEIC 重新编码成原尺寸 JPEG（_原始，有损，体积是 HEIC 的
+3~5 倍），每个培养皿还要存 _增强 / _展示 / _裁剪 三个版本。归档模式只保存:
+
+1. 原图 - 原图/<SHA1>.heic：原始字节原样复制（按内容寻址，重复导入不重复存）
+2. 配方 - 配方.json：每张照片的源文件哈希 + 流水线配置（PHOTOS 的阶段和参数）
+   + 渲染时的库版本和流水线代码版本；每个 save 阶段对应一个输出
+3. 渲染 - render()：输出不存在时解码原图、跑配方中到该 save 为止的阶段，
+   结果存到 缓存/<键>/；键 = 源哈希 + 阶段配置 + 库版本 + 流水线代码版本，任何一项变了自动重新渲染；
+   同一张照片缺的几个输出一次解码一起渲染
+4. 导出 - export()：渲染后复制到指定目录（如 Photos/），供 process_plaque_*.py 和 PPT 使用
+5. 校验 - 首次渲染时记录每个输出的 SHA1，verify() 重新渲染比对，确认输出可复现
+
+需要备份 / 提交的只有 原图/ 和 配方.json；缓存/ 可以随时删除。
+
+用法:
+    python photo_archive.py add 噬菌体照片/              # 归档 HEIC
+    python photo_archive.py render R1_增强.jpg R1_裁剪.jpg
+    python photo_archive.py export --out Photos/        # 渲染全部输出并导出
+    python photo_archive.py stats / verify / prune
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+import PIL
+
+from photo_catalog import file_sha1
+from photo_ingest import capture_index
+from plaque_pipeline import HEIC_DIR, PHOTOS, PHOTOS_DIR, PlaquePipeline, code_version
+
+ARCHIVE_DIR = PHOTOS_DIR / "归档"
+ORIGINALS = "原图"
+CACHE = "缓存"
+RECIPES_NAME = "配方.json"
+SOURCE_SUFFIXES = (".heic", ".heif", ".jpg", ".jpeg", ".png")
+
+
+def render_versions() -> dict:
+    """
+    影响渲染结果的版本：库版本 + 流水线阶段实现（plaque_pipeline.code_version）
+    写入配方，也是缓存键的一部分
+    """
+    return {"opencv": cv2.__version__, "numpy": np.__version__, "pillow": PIL.__version__,
+            "pipeline": code_version()}
+
+
+def save_output(name: str, params: dict) -> str:
+    """save 阶段的输出文件名（与 plaque_pipeline.save 一致）"""
+    return f"{name}{params.get('suffix', '_统一')}.jpg"
+
+
+def output_names(name: str, stages: list) -> list:
+    """配方中每个 save 阶段的输出文件名"""
+    return [save_output(name, params) for stage, params in stages if stage == "save"]
+
+
+def recipe_stages(stages: list, outputs: list, name: str) -> list:
+    """只渲染 outputs 时要跑的阶段：截到最后一个需要的 save，去掉其他 save"""
+    wanted = set(outputs)
+    keep = []
+    for stage, params in stages:
+        if stage == "save":
+            output = save_output(name, params)
+            if output not in wanted:
+                continue
+            wanted.discard(output)
+        keep.append((stage, params))
+        if not wanted:
+            break
+    return keep
+
+
+def tree_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in Path(path).rglob("*") if p.is_file())
+
+
+class PhotoArchive:
+    """
+    归档目录: 原图/ + 配方.json + 缓存/
+
+    recipes: {照片名: {"source": 原图相对路径, "source_name", "sha1", "size",
+                       "stages": [[阶段名, 参数]], "outputs": [输出名], "versions", "rendered": {输出名: SHA1}}}
+    """
+
+    def __init__(self, root: Path = ARCHIVE_DIR):
+        self.root = Path(root)
+        self.recipes_path = self.root / RECIPES_NAME
+        self.recipes = {}
+        if self.recipes_path.exists():
+            with open(self.recipes_path, "r", encoding="utf-8") as f:
+                self.recipes = json.load(f)
+
+    def save_recipes(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.recipes_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.recipes, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.recipes_path)
+
+    # ---- 归档 ----
+
+    def add(self, source: Path, name: str = None, stages: list = PHOTOS) -> dict:
+        """
+        归档一张原图：原始字节复制到 原图/（已有相同内容时不复制），登记配方
+
+        Returns:
+            配方条目
+        """
+        source = Path(source)
+        name = name or source.stem
+        sha1 = file_sha1(source)
+        stored = Path(ORIGINALS) / f"{sha1}{source.suffix.lower()}"
+        target = self.root / stored
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_suffix(".tmp")
+            shutil.copyfile(source, tmp)
+            os.replace(tmp, target)
+
+        stages = [[stage, dict(params)] for stage, params in stages]
+        old = self.recipes.get(name, {})
+        versions = render_versions()
+        same = (old.get("sha1") == sha1 and old.get("stages") == json.loads(json.dumps(stages))
+                and old.get("versions") == versions)
+        self.recipes[name] = {
+            "source": stored.as_posix(),
+            "source_name": source.name,
+            "sha1": sha1,
+            "size": target.stat().st_size,
+            "stages": stages,
+            "outputs": output_names(name, stages),
+            "versions": versions,
+            # 源、配方或版本变了，之前记录的输出哈希作废
+            "rendered": old.get("rendered", {}) if same else {},
+        }
+        return self.recipes[name]
+
+    def add_dir(self, input_dir: Path, stages: list = PHOTOS) -> int:
+        """归档目录中的所有原图（按拍摄时间），返回张数"""
+        sources = [p for p in Path(input_dir).iterdir() if p.suffix.lower() in SOURCE_SUFFIXES]
+        metas = capture_index(sources)
+        for meta in metas:
+            recipe = self.add(Path(meta.path), stages=stages)
+            print(f"归档: {Path(meta.path).name} -> {recipe['source']}（{len(recipe['outputs'])} 个输出）")
+        self.save_recipes()
+        return len(metas)
+
+    # ---- 渲染 ----
+
+    def find(self, output: str) -> str:
+        """输出文件名 -> 照片名"""
+        for name, recipe in self.recipes.items():
+            if output in recipe["outputs"]:
+                return name
+        raise KeyError(f"归档中没有输出: {output}")
+
+    def cache_path(self, name: str, output: str) -> Path:
+        """输出的缓存位置：键 = 源哈希 + 到该输出为止的阶段 + 库版本 + 流水线代码版本"""
+        recipe = self.recipes[name]
+        stages = recipe_stages(recipe["stages"], [output], name)
+        text = json.dumps([recipe["sha1"], stages, render_versions()], sort_keys=True, ensure_ascii=False)
+        key = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+        return self.root / CACHE / key / output
+
+    def render(self, outputs: list, force: bool = False) -> list:
+        """
+        渲染输出（已缓存的直接返回）；同一张照片缺的输出一次解码一起渲染
+
+        Returns:
+            与 outputs 同序的缓存路径
+        """
+        by_name = {}
+        for output in outputs:
+            by_name.setdefault(self.find(output), []).append(output)
+
+        for name, wanted in by_name.items():
+            missing = [o for o in wanted if force or not self.cache_path(name, o).exists()]
+            if missing:
+                self._render(name, missing)
+        self.save_recipes()
+        return [self.cache_path(self.find(o), o) for o in outputs]
+
+    def _render(self, name: str, outputs: list):
+        recipe = self.recipes[name]
+        source = self.root / recipe["source"]
+        pipeline = PlaquePipeline.from_config(recipe_stages(recipe["stages"], outputs, name))
+        staging = Path(tempfile.mkdtemp(prefix=".渲染", dir=self.root))
+        try:
+            if pipeline.process(source, staging, name=name) is None:
+                raise RuntimeError(f"渲染失败: {name}")
+            for output in outputs:
+                target = self.cache_path(name, output)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(staging / output, target)
+                recipe["rendered"].setdefault(output, file_sha1(target))
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def export(self, output_dir: Path, outputs: list = None) -> list:
+        """渲染（默认全部输出）并复制到 output_dir，返回导出的路径"""
+        outputs = outputs or [o for recipe in self.recipes.values() for o in recipe["outputs"]]
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        exported = []
+        for output, cached in zip(outputs, self.render(outputs)):
+            shutil.copy2(cached, output_dir / output)
+            exported.append(output_dir / output)
+        return exported
+
+    # ---- 维护 ----
+
+    def verify(self) -> list:
+        """
+        重新渲染所有已记录哈希的输出并比对
+
+        Returns:
+            [(输出名, 记录的SHA1, 重新渲染的SHA1)]：不一致的输出
+        """
+        mismatched = []
+        for name, recipe in self.recipes.items():
+            recorded = dict(recipe["rendered"])
+            if not recorded:
+                continue
+            self.render(list(recorded), force=True)
+            for output, sha1 in recorded.items():
+                now = file_sha1(self.cache_path(name, output))
+                if now != sha1:
+                    mismatched.append((output, sha1, now))
+        return mismatched
+
+    def prune(self) -> int:
+        """删除不再被任何配方引用的缓存目录（配方、库版本或流水线代码变了之后），返回删除数"""
+        live = {self.cache_path(name, o).parent for name, r in self.recipes.items() for o in r["outputs"]}
+        removed = 0
+        cache = self.root / CACHE
+        for path in cache.iterdir() if cache.exists() else []:
+            if path.is_dir() and path not in live:
+                shutil.rmtree(path)
+                removed += 1
+        return removed
+
+    def stats(self) -> dict:
+        """归档体积：原图 + 配方（需要备份的部分）与缓存"""
+        return {
+            "photos": len(self.recipes),
+            "outputs": sum(len(r["outputs"]) for r in self.recipes.values()),
+            "originals": tree_size(self.root / ORIGINALS) if (self.root / ORIGINALS).exists() else 0,
+            "recipes": self.recipes_path.stat().st_size if self.recipes_path.exists() else 0,
+            "cache": tree_size(self.root / CACHE) if (self.root / CACHE).exists() else 0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="照片无损归档（原图 + 配方，输出按需渲染）")
+    parser.add_argument("command", choices=("add", "render", "export", "stats", "verify", "prune"))
+    parser.add_argument("items", nargs="*", help="add: 原图目录或文件；render/export: 输出文件名")
+    parser.add_argument("--archive", type=Path, default=ARCHIVE_DIR, help="归档目录")
+    parser.add_argument("--out", type=Path, default=PHOTOS_DIR, help="export 的目标目录")
+    parser.add_argument("--force", action="store_true", help="render: 忽略缓存重新渲染")
+    args = parser.parse_args()
+
+    archive = PhotoArchive(args.archive)
+    if args.command == "add":
+        for item in map(Path, args.items or [HEIC_DIR]):
+            if item.is_dir():
+                archive.add_dir(item)
+            else:
+                archive.add(item)
+                archive.save_recipes()
+    elif args.command == "render":
+        for path in archive.render(args.items, args.force):
+            print(path)
+    elif args.command == "export":
+        exported = archive.export(args.out, args.items or None)
+        print(f"导出 {len(exported)} 个输出到 {args.out}")
+    elif args.command == "verify":
+        mismatched = archive.verify()
+        for output, before, now in mismatched:
+            print(f"不一致: {output} {before[:12]} -> {now[:12]}")
+        print(f"校验完成，{len(mismatched)} 个输出不一致")
+        if mismatched:
+            sys.exit(1)
+    elif args.command == "prune":
+        print(f"删除 {archive.prune()} 个过期缓存目录")
+    else:
+        s = archive.stats()
+        print(f"照片 {s['photos']} 张，输出 {s['outputs']} 个")
+        print(f"原图 {s['originals'] / 2 ** 20:.1f}MB + 配方 {s['recipes'] / 1024:.1f}KB（需要备份）")
+        print(f"缓存 {s['cache'] / 2 ** 20:.1f}MB（可删除）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+斑块照片目录（SQLite）
+
+- 每张照片一行：噬菌体、宿主、分离株、稀释度、是否特写、尺寸、方向、拍摄时间、
+  设备、文件大小/修改时间、SHA1
+- 原图（*_原始.jpg）和派生输出（_增强/_展示/_裁剪/_统一 ...）在同一张表，
+  kind 区分；派生输出从所在目录的 清单.json 补充版本、培养皿、象限
+- 增量更新：只有新文件和大小/修改时间变了的文件才读文件头、算哈希，
+  已删除的文件从目录移除
+- 查询走索引，不再 glob 目录 + 解析文件名
+
+文件名规则（与原来各脚本的解析一致）：
+    R1_原始.jpg      噬菌体 R1，全盘
+    R1-5_原始.jpg    R1 特写（最后一段是数字）
+    W1-1-5_原始.jpg  W1 分离株 1 的特写
+
+用法:
+    catalog = PhotoCatalog(PHOTOS_DIR)
+    catalog.scan()
+    catalog.paths(phage="R3", closeup=False, since="2026-01-01", until="2026-02-01")
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+from photo_ingest import read_meta
+
+PHOTOS_DIR = Path(r"C:\Users\36094\Desktop\EcAZPhageDocumentation\Experiments\Data\02_斑块形态学\Photos")
+CATALOG_NAME = "照片目录.db"
+MANIFEST_NAME = "清单.json"
+ORIGINAL = "原始"
+# 不登记的子目录（阶段缓存）
+SKIP_DIRS = ("缓存",)
+
+# 宿主按噬菌体名首字母（见 02_斑块形态学.md 实验材料）
+HOSTS = {"R": "EcAZ-2-OVA", "W": "EcAZ-1"}
+
+# 文件名中没有稀释度；需要时按照片名补充，如 {"R1": 1e-6}
+DILUTIONS = {}
+
+NAME_PATTERN = re.compile(r"^(?P<name>(?P<phage>[A-Za-z]+\d+)(?:-\d+)*)_(?P<kind>[^_]+)$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS photos (
+    file TEXT PRIMARY KEY,      -- 相对目录根的路径
+    folder TEXT NOT NULL,       -- 所在子目录，根目录为空字符串
+    name TEXT NOT NULL,         -- R1-5
+    kind TEXT NOT NULL,         -- 原始 / 增强 / 展示 / 裁剪 / 统一 ...
+    phage TEXT NOT NULL,
+    host TEXT,
+    isolate TEXT,
+    dilution REAL,
+    closeup INTEGER NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    orientation INTEGER,
+    captured TEXT,              -- ISO 时间
+    captured_from TEXT,         -- exif / mtime
+    device TEXT,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha1 TEXT NOT NULL,
+    variant TEXT,               -- 派生输出：清单中的处理版本
+    plate TEXT,                 -- 派生输出：培养皿 [cx, cy, r]（JSON）
+    quadrant TEXT
+);
+CREATE INDEX IF NOT EXISTS photos_query ON photos (kind, phage, closeup, captured);
+CREATE INDEX IF NOT EXISTS photos_folder ON photos (folder, kind, closeup, name);
+CREATE INDEX IF NOT EXISTS photos_captured ON photos (kind, captured);
+CREATE INDEX IF NOT EXISTS photos_name ON photos (name, kind);
+"""
+
+
+def closeup_name(name: str) -> bool:
+    """名字中包含 "-数字" 的是特写照片（如 R1-5, W1-1-5）"""
+    parts = name.split("-")
+    return len(parts) > 1 and parts[-1].isdigit()
+
+
+def parse_name(stem: str) -> dict:
+    """
+    文件名（不含扩展名）-> 字段；不符合命名规则时返回 None
+
+    最后一段是数字的是特写照片（R1-5, W1-1-5），中间各段是分离株编号
+    """
+    match = NAME_PATTERN.match(stem)
+    if match is None:
+        return None
+    name, phage = match["name"], match["phage"]
+    parts = name.split("-")
+    closeup = closeup_name(name)
+    isolate = "-".join(parts[1:-1] if closeup else parts[1:]) or None
+    return {
+        "name": name,
+        "kind": match["kind"],
+        "phage": phage,
+        "host": HOSTS.get(phage[0].upper()),
+        "isolate": isolate,
+        "dilution": DILUTIONS.get(name),
+        "closeup": int(closeup),
+    }
+
+
+def file_sha1(path: Path, chunk: int = 1 << 20) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(directory: Path) -> dict:
+    """目录中的 清单.json -> {输出文件名: 条目}"""
+    path = Path(directory) / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return {e["output"]: e for e in json.load(f)}
+
+
+class PhotoCatalog:
+    """
+    照片目录：root 下（含子目录）所有符合命名规则的 JPG
+
+    db_path 默认为 root/照片目录.db
+    """
+
+    def __init__(self, root: Path = PHOTOS_DIR, db_path: Path = None):
+        self.root = Path(root)
+        self.db_path = Path(db_path or self.root / CATALOG_NAME)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _files(self) -> list:
+        files = []
+        for path in self.root.rglob("*.jpg"):
+            rel = path.relative_to(self.root)
+            if any(part in SKIP_DIRS for part in rel.parts[:-1]):
+                continue
+            if parse_name(path.stem) is not None:
+                files.append(path)
+        return files
+
+    def _record(self, path: Path, st, manifests: dict) -> dict:
+        record = parse_name(path.stem)
+        meta = read_meta(path)
+        if meta.captured is not None:
+            captured, captured_from = meta.captured, "exif"
+        else:
+            captured, captured_from = datetime.fromtimestamp(st.st_mtime), "mtime"
+        if path.parent not in manifests:
+            manifests[path.parent] = load_manifest(path.parent)
+        entry = manifests[path.parent].get(path.name, {})
+        plate = entry.get("plate")
+        rel = path.relative_to(self.root)
+        record.update({
+            "file": rel.as_posix(),
+            "folder": rel.parent.as_posix() if rel.parent.parts else "",
+            "width": meta.width,
+            "height": meta.height,
+            "orientation": meta.orientation,
+            "captured": captured.isoformat(timespec="seconds"),
+            "captured_from": captured_from,
+            "device": meta.device or None,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "sha1": file_sha1(path),
+            "variant": entry.get("variant"),
+            "plate": json.dumps(plate) if plate else None,
+            "quadrant": entry.get("quadrant"),
+        })
+        return record
+
+    def scan(self) -> tuple:
+        """
+        增量更新：新文件和大小/修改时间变化的文件重新登记，消失的文件删除
+
+        Returns:
+            (新增或更新数, 删除数)
+        """
+        known = {row["file"]: (row["size"], row["mtime_ns"])
+                 for row in self.conn.execute("SELECT file, size, mtime_ns FROM photos")}
+        manifests = {}
+        records = []
+        seen = set()
+        for path in self._files():
+            rel = path.relative_to(self.root).as_posix()
+            seen.add(rel)
+            st = path.stat()
+            if known.get(rel) != (st.st_size, st.st_mtime_ns):
+                records.append(self._record(path, st, manifests))
+        removed = [(rel,) for rel in known if rel not in seen]
+
+        with self.conn:
+            if records:
+                columns = list(records[0])
+                self.conn.executemany(
+                    f"INSERT OR REPLACE INTO photos ({', '.join(columns)}) "
+                    f"VALUES ({', '.join(':' + c for c in columns)})", records)
+            self.conn.executemany("DELETE FROM photos WHERE file = ?", removed)
+        return len(records), len(removed)
+
+    def find(self, phage: str = None, closeup: bool = None, kind: str = ORIGINAL,
+             since=None, until=None, name: str = None, folder: str = None,
+             order: str = "captured") -> list:
+        """
+        查询照片
+
+        since/until: 拍摄时间范围 [since, until)，datetime 或 ISO 字符串
+        kind: None 表示所有种类；folder: "" 只查根目录，None 不限
+        order: "captured"（拍摄时间）或 "name"（名称）
+        """
+        conditions, params = [], []
+        for column, value in (("kind", kind), ("phage", phage), ("name", name), ("folder", folder)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if closeup is not None:
+            conditions.append("closeup = ?")
+            params.append(int(closeup))
+        if since is not None:
+            conditions.append("captured >= ?")
+            params.append(since.isoformat() if isinstance(since, datetime) else str(since))
+        if until is not None:
+            conditions.append("captured < ?")
+            params.append(until.isoformat() if isinstance(until, datetime) else str(until))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        order_by = {"captured": "captured, name", "name": "name, file"}[order]
+        return self.conn.execute(
+            f"SELECT * FROM photos {where} ORDER BY {order_by}", params).fetchall()
+
+    def paths(self, **query) -> list:
+        """find() 的结果转成绝对路径"""
+        return [self.root / row["file"] for row in self.find(**query)]
+
+    def outputs(self, name: str) -> list:
+        """一张原图的所有派生输出"""
+        return [row for row in self.find(name=name, kind=None) if row["kind"] != ORIGINAL]
+
+
+def originals(photos_dir: Path = PHOTOS_DIR, closeup: bool = None) -> list:
+    """
+    更新目录后返回 photos_dir 根目录下的原图（*_原始.jpg，按名称排序）
+
+    closeup: True 只要特写，False 只要全盘，None 全部
+    """
+    with PhotoCatalog(photos_dir) as catalog:
+        catalog.scan()
+        return catalog.paths(closeup=closeup, folder="", order="name")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="更新并查询斑块照片目录")
+    parser.add_argument("--photos", type=Path, default=PHOTOS_DIR, help="照片目录")
+    parser.add_argument("--phage", default=None, help="噬菌体，如 R3")
+    parser.add_argument("--closeup", choices=("yes", "no"), default=None, help="只看特写 / 全盘")
+    parser.add_argument("--kind", default=ORIGINAL, help="种类（原始/增强/统一...），all 为全部")
+    parser.add_argument("--since", default=None, help="拍摄时间下限，如 2026-01-01")
+    parser.add_argument("--until", default=None, help="拍摄时间上限（不含）")
+    args = parser.parse_args()
+
+    with PhotoCatalog(args.photos) as catalog:
+        updated, removed = catalog.scan()
+        print(f"目录: {catalog.db_path}（更新 {updated}，删除 {removed}）\n")
+        closeup = None if args.closeup is None else args.closeup == "yes"
+        rows = catalog.find(phage=args.phage, closeup=closeup,
+                            kind=None if args.kind == "all" else args.kind,
+                            since=args.since, until=args.until)
+        for row in rows:
+            print(f"{row['file']:<32} {row['phage']:<4} {'特写' if row['closeup'] else '全盘'} "
+                  f"{row['width']}x{row['height']} {row['captured']} ({row['captured_from']})")
+        print(f"\n共 {len(rows)} 张")
+
+
+if __name__ == "__main__":
+    main()
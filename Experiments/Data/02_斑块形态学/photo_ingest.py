@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+照片元数据读取（只读文件头，不解码像素）
+
+- 方向（EXIF Orientation）、拍摄时间、设备、分辨率、原始 EXIF / ICC
+- 方向用 NumPy 视图变换（翻转 / 转置）应用，不复制像素
+- 输出 JPEG 时带上原始 EXIF（方向改为 1，像素已经转正）
+- 按拍摄时间排序的索引：大批照片只读文件头即可排序、分组
+
+HEIC 需要 pillow_heif（只在遇到 HEIC 时导入）。pillow_heif 解码时已应用 HEIF 的
+旋转并把 EXIF 方向重置为 1，读到的方向与解码出的像素一致，不会重复旋转。
+"""
+
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+HEIF_SUFFIXES = (".heic", ".heif")
+
+# EXIF 标签
+TAG_ORIENTATION = 0x0112
+TAG_MAKE = 0x010F
+TAG_MODEL = 0x0110
+TAG_DATETIME = 0x0132
+TAG_EXIF_IFD = 0x8769
+TAG_DATETIME_ORIGINAL = 0x9003
+
+EXIF_TIME_FORMAT = "%Y:%m:%d %H:%M:%S"
+
+# 方向 -> (视图变换, 是否宽高互换)；见 EXIF 规范 Orientation 1~8
+ORIENTATIONS = {
+    1: (lambda a: a, False),
+    2: (lambda a: a[:, ::-1], False),                  # 水平镜像
+    3: (lambda a: a[::-1, ::-1], False),               # 旋转180°
+    4: (lambda a: a[::-1], False),                     # 垂直镜像
+    5: (lambda a: a.swapaxes(0, 1), True),             # 转置
+    6: (lambda a: np.rot90(a, -1), True),              # 顺时针90°
+    7: (lambda a: a.swapaxes(0, 1)[::-1, ::-1], True), # 反转置
+    8: (lambda a: np.rot90(a, 1), True),               # 逆时针90°
+}
+
+PhotoMeta = namedtuple("PhotoMeta", [
+    "path",          # 文件路径
+    "width",         # 转正后的宽
+    "height",        # 转正后的高
+    "orientation",   # EXIF 方向 1~8（没有时为 1）
+    "captured",      # 拍摄时间 datetime，没有时为 None
+    "device",        # "Make Model"，没有时为空字符串
+    "exif",          # 原始 EXIF 字节，没有时为 None
+    "icc_profile",   # ICC 字节，没有时为 None
+])
+
+
+def _register_heif():
+    import pillow_heif
+    pillow_heif.register_heif_opener()
+
+
+def parse_exif_time(text) -> datetime:
+    if not text:
+        return None
+    try:
+        return datetime.strptime(str(text).strip("\x00 "), EXIF_TIME_FORMAT)
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def _read_meta(path: str, mtime_ns: int) -> PhotoMeta:
+    if Path(path).suffix.lower() in HEIF_SUFFIXES:
+        _register_heif()
+    # Image.open 只解析文件头，像素在 load() 前不会解码
+    with Image.open(path) as img:
+        exif = img.getexif()
+        orientation = exif.get(TAG_ORIENTATION, 1)
+        if orientation not in ORIENTATIONS:
+            orientation = 1
+        captured = parse_exif_time(exif.get_ifd(TAG_EXIF_IFD).get(TAG_DATETIME_ORIGINAL)
+                                   or exif.get(TAG_DATETIME))
+        device = " ".join(str(exif.get(tag, "")).strip("\x00 ") for tag in (TAG_MAKE, TAG_MODEL)).strip()
+        width, height = img.size
+        raw_exif = img.info.get("exif") or (exif.tobytes() if len(exif) else None)
+        icc = img.info.get("icc_profile")
+    if ORIENTATIONS[orientation][1]:
+        width, height = height, width
+    return PhotoMeta(path, width, height, orientation, captured, device, raw_exif, icc)
+
+
+def read_meta(path: Path) -> PhotoMeta:
+    """读取一张照片的元数据（只读文件头；按路径+修改时间缓存）"""
+    path = Path(path)
+    return _read_meta(str(path), path.stat().st_mtime_ns)
+
+
+def orient_array(image: np.ndarray, orientation: int) -> np.ndarray:
+    """按 EXIF 方向把像素转正（视图，不复制）"""
+    return ORIENTATIONS.get(orientation, ORIENTATIONS[1])[0](image)
+
+
+def output_exif(meta: PhotoMeta) -> bytes:
+    """
+    输出用的 EXIF：保留拍摄时间、设备等，方向改为 1（像素已转正）
+
+    Returns:
+        EXIF 字节；原图没有 EXIF 时返回 None
+    """
+    if meta is None or meta.exif is None:
+        return None
+    exif = Image.Exif()
+    exif.load(meta.exif)
+    exif[TAG_ORIENTATION] = 1
+    return exif.tobytes()
+
+
+def capture_index(paths) -> list:
+    """
+    按拍摄时间排序（只读文件头）；没有拍摄时间的排在最后，按文件名
+
+    Returns:
+        [PhotoMeta]
+    """
+    metas = [read_meta(p) for p in paths]
+    return sorted(metas, key=lambda m: (m.captured is None, m.captured or datetime.min, Path(m.path).name))
+
+
+def meta_record(meta: PhotoMeta) -> dict:
+    """写入清单用的可序列化字段"""
+    return {
+        "source": Path(meta.path).name,
+        "captured": meta.captured.isoformat() if meta.captured else None,
+        "device": meta.device or None,
+        "orientation": meta.orientation,
+        "size": [meta.width, meta.height],
+    }
@@ -0,0 +1,1410 @@
+#!/usr/bin/env python3
+"""
+噬菌体斑块照片处理流水线（公共库）
+
+process_plaque_*.py 各版本共用的处理代码：每个版本只是一组阶段配置（VARIANTS）。
+
+处理流程:
+1. 读取 - 照片只解码一次，各阶段共享同一个 Frame：RGB 缓冲区 + 按需缓存的
+   灰度/HSV/平滑平面（裁剪、翻转都是视图，不复制像素，灰度等只转换一次）；
+   EXIF 方向、拍摄时间等由 photo_ingest 从文件头读取，方向以视图变换应用
+2. 检测培养皿 - 自动融合检测（霍夫 + 颜色 + 皿沿RANSAC，带置信度），
+   置信度不足时才用手动配置 / 单一方法
+3. 选象限、裁剪、统一方向 - 弧线统一在右上角
+4. 增强 - 对比度、锐度、亮度、USM锐化（与原 PIL ImageEnhance 逐像素一致，check_enhance.py 校验）
+5. 缩放、画布 - 输出统一尺寸
+6. 保存 - 只在写JPEG时转回 PIL，带上原图 EXIF（方向置 1）；输出目录写 清单.json。
+   批量处理时编码和写盘交给 plaque_writer 的线程池，与下一张照片的计算重叠
+
+各阶段（解码、检测的霍夫/颜色/RANSAC 子步骤、JPEG 编码）经 plaque_trace 计时，
+设置 PLAQUE_TRACE 环境变量时记录并在结束时打印汇总，默认关闭。
+
+用法:
+    pipeline = PlaquePipeline.from_config(VARIANTS["quarter"])
+    pipeline.process(Path("R1_原始.jpg"), output_dir)
+"""
+
+import hashlib
+import json
+import os
+import traceback
+from collections import namedtuple
+from functools import lru_cache
+from pathlib import Path
+
+import cv2
+import numpy as np
+import PIL
+from PIL import Image, ImageFilter
+
+from photo_catalog import MANIFEST_NAME, PhotoCatalog, closeup_name
+from photo_ingest import capture_index, meta_record, orient_array, output_exif, read_meta
+from plaque_trace import TRACER
+from plaque_writer import EXTENSIONS, ImageWriter, write_image
+
+# 路径设置
+PHOTOS_DIR = Path(r"C:\Users\36094\Desktop\EcAZPhageDocumentation\Experiments\Data\02_斑块形态学\Photos")
+OUTPUT_DIR = PHOTOS_DIR / "统一裁剪"
+# 中间结果缓存（.npy，可随时删除）
+CACHE_DIR = PHOTOS_DIR / "缓存"
+HEIC_DIR = Path(r"C:\Users\36094\Desktop\EcAZPhageDocumentation\Experiments\Data\噬菌体照片")
+
+# 统一输出尺寸（正方形）
+OUTPUT_SIZE = 800
+# 培养皿统一缩放到这个直径（像素）
+STANDARD_PLATE_DIAMETER = 1600
+JPEG_QUALITY = 95
+# 缩小比例低于此值时用 INTER_AREA（强缩小抗混叠），否则用 Lanczos（与原 PIL LANCZOS 接近）
+AREA_SCALE = 0.5
+
+# 增强参数（与 PIL ImageEnhance 的 factor 含义相同）
+CONTRAST = 1.3
+SHARPNESS = 1.5
+BRIGHTNESS = 1.1
+UNSHARP_RADIUS = 2
+UNSHARP_PERCENT = 150
+UNSHARP_THRESHOLD = 3
+
+# PIL ImageFilter.SMOOTH 卷积核（Sharpness 的退化图像）
+SMOOTH_KERNEL = np.array([[1, 1, 1], [1, 5, 1], [1, 1, 1]], dtype=np.float32) / 13
+
+# 培养基颜色范围（HSV，浅黄色到浅绿色）
+AGAR_COLOR = {"color_lower": (15, 15, 140), "color_upper": (55, 140, 255), "color_kernel": 25}
+AGAR_COLOR_NARROW = {"color_lower": (15, 20, 150), "color_upper": (45, 150, 255), "color_kernel": 15}
+
+QUADRANTS = ("TR", "TL", "BR", "BL")
+
+# 每张照片的培养皿圆 (center_x, center_y, radius)，原图像素（方向已转正）
+# 取自 detect_auto 的结果，在 benchmark_detection.py --overlay 的标注图上核对过贴合皿沿；
+# 只在自动检测置信度不足时使用（检测结果的回归基准见 检测基准.json）
+PLATES = {
+    "R1": (1075, 1893, 812),
+    # R2: 培养皿右缘超出照片约200px
+    "R2": (1644, 1914, 1577),
+    "R3": (1358, 2063, 811),
+    "W1": (1282, 1893, 811),
+    # W2 (4284x5712): 没有 _原始.jpg，由 W2_裁剪.jpg 的检测结果 (1244, 1250, 1215)
+    # 加上 crop_fraction 的偏移 (856, 1142) 换算
+    "W2": (2100, 2392, 1215),
+}
+
+# 各版本裁剪哪个象限 ("TR"=右上, "TL"=左上, "BR"=右下, "BL"=左下)，是取景选择:
+# 避开皿上的手写标记、选斑块多的一侧。圆与 PLATES 相同；
+# 自动检测的圆与配置的圆相差超过 TABLE_TOLERANCE 时，象限按检测结果重新选（见 detect_plate）
+# quarter 版本：扇形弧线正好是培养皿外边缘
+PLATE_CONFIG = {name: PLATES[name] + (quadrant,) for name, quadrant in {
+    "R1": "TL",  # 右上有标记"R6"
+    "R2": "TR",  # 左侧有标记"R2 T2"
+    "R3": "TL",  # 右侧有标记"R3 L4"，左上斑块最多
+    "W1": "TL",  # 右侧有标记"W1 L2"
+    "W2": "TL",
+}.items()}
+
+# precise 版本
+PRECISE_CONFIG = {name: PLATES[name] + (quadrant,) for name, quadrant in {
+    "R1": "BL",  # 右上有标记"R6"
+    "R2": "TR",  # 左侧有标记"R2 T2"
+    "R3": "TL",  # 左上斑块最多
+    "W1": "TL",  # 右侧有标记"W1 L2"
+    "W2": "TR",
+}.items()}
+
+# v3 版本只用圆 (center_x, center_y, radius)
+MANUAL_CONFIG = dict(PLATES)
+
+# 配置的圆与检测的圆相差超过该比例（圆心距离或半径差，相对半径）时，配置的象限不再适用
+TABLE_TOLERANCE = 0.05
+
+# final 版本：直接指定裁剪区域 (left, top, right, bottom)
+CROP_REGIONS = {
+    # R1 (3024x4032): 培养皿在上部，裁剪左侧区域（翻转后边缘在右上）
+    "R1": (350, 900, 1550, 2100),
+    # R2 (3024x4032): 培养皿大，裁剪右上四分之一
+    "R2": (1500, 550, 2950, 2000),
+    # R3 (3024x4032): 培养皿在中间，裁剪左上区域（翻转后边缘在右上）
+    "R3": (200, 1200, 1500, 2500),
+    # W1 (3024x4032): 培养皿在中上部，裁剪左上区域（翻转后边缘在右上）
+    "W1": (300, 800, 1500, 2000),
+    # W2 (4284x5712): 培养皿在中上部，裁剪左上区域（翻转后边缘在右上）
+    "W2": (600, 1200, 2200, 2800),
+}
+
+# 是否需要水平翻转以统一边缘方向
+FLIP_HORIZONTAL = {
+    "R1": True,   # 裁剪的是左边，需要翻转
+    "R2": False,  # 右边，不需要翻转
+    "R3": True,   # 裁剪左边，需要翻转
+    "W1": True,   # 裁剪左边，需要翻转
+    "W2": True,   # 裁剪左边，需要翻转
+}
+
+
+# 解码时缩小的倍数 -> OpenCV 读取标志
+REDUCED_DECODE = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+class SkipImage(Exception):
+    """该照片没有可用配置，跳过（不算错误）"""
+
+
+# ============ 基础操作（NumPy / OpenCV） ============
+
+def load_rgb(path: Path, reduce: int = 1, orientation: int = None) -> np.ndarray:
+    """
+    读取照片为 RGB uint8 数组（整个流程唯一一次解码），按 EXIF 方向转正
+
+    JPEG/PNG 用 OpenCV 解码到一块缓冲区后原地转成 RGB，只分配一帧；
+    其他格式（HEIC 等）经 PIL 读取。解码时不转方向，之后按 orientation
+    （None 时从文件头读取）做翻转/转置视图，不复制像素。
+    reduce (1/2/4/8): 解码时直接缩小（JPEG 在 DCT 阶段缩小，比先解码再缩放快得多），
+    用于预览、检测等不需要全分辨率的场合；尺寸为原图的 1/reduce（向上取整）
+    """
+    if orientation is None:
+        orientation = read_meta(path).orientation
+    return orient_array(_decode_rgb(path, reduce), orientation)
+
+
+def _decode_rgb(path: Path, reduce: int) -> np.ndarray:
+    if Path(path).suffix.lower() in (".jpg", ".jpeg", ".png"):
+        # np.fromfile + imdecode：Windows 中文路径下 cv2.imread 会失败
+        data = np.fromfile(str(path), dtype=np.uint8)
+        image = cv2.imdecode(data, REDUCED_DECODE[reduce] | cv2.IMREAD_IGNORE_ORIENTATION)
+        if image is not None:
+            return cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+    with Image.open(path) as img:
+        if reduce > 1:
+            size = (-(-img.width // reduce), -(-img.height // reduce))
+            img.draft('RGB', size)
+            if img.size != size:
+                img = img.resize(size, Image.Resampling.BOX)
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        return np.asarray(img)
+
+
+def save_jpeg(image: np.ndarray, path: Path, quality: int = JPEG_QUALITY,
+              exif: bytes = None, icc_profile: bytes = None):
+    write_image(image, path, quality, exif, icc_profile)
+
+
+def resize(image: np.ndarray, size: tuple) -> np.ndarray:
+    """
+    缩放到 (width, height)：缩小到 AREA_SCALE 以下用 INTER_AREA，其余用 Lanczos
+    （比例接近 1 时 INTER_AREA 相当于双线性，比原 PIL LANCZOS 糊，增强后差异会被放大）
+    """
+    width, height = size
+    h, w = image.shape[:2]
+    if (width, height) == (w, h):
+        return image
+    interp = cv2.INTER_AREA if max(width / w, height / h) < AREA_SCALE else cv2.INTER_LANCZOS4
+    return cv2.resize(image, (width, height), interpolation=interp)
+
+
+def clamp_box(box: tuple, shape: tuple) -> tuple:
+    """裁剪框限制在图片范围内"""
+    left, top, right, bottom = (int(v) for v in box)
+    h, w = shape[:2]
+    return max(0, left), max(0, top), min(w, right), min(h, bottom)
+
+
+class Frame:
+    """
+    一帧图像：RGB 缓冲区 + 按需计算并缓存的派生平面（gray / hsv / blurred）
+
+    各阶段共享同一个 Frame，同一张照片的灰度、HSV 只转换一次。
+    crop() 返回视图，已经算好的派生平面也按同一区域切片沿用，不重新计算；
+    其他改变像素的操作用 Frame(新数组) 得到新的帧，缓存随之失效。
+
+    缩放是延迟的：scaled() 只记录逻辑尺寸和逻辑像素到原像素的映射（比例 + 亚像素偏移），
+    之后的 crop()/view() 只更新映射，直到第一次读取 rgb 或 resized() 时才从原像素
+    一次采样到位（与先缩放整图再裁剪的位置一致，不按整像素取整）。
+    """
+
+    __slots__ = ("_src", "_size", "_map", "_planes")
+
+    def __init__(self, rgb: np.ndarray, planes: dict = None, size: tuple = None, mapping: tuple = None):
+        self._src = rgb
+        self._size = size if size != (rgb.shape[1], rgb.shape[0]) or mapping else None
+        # (sx, sy, ox, oy)：逻辑像素中心 x 对应原像素坐标 (x + 0.5) * sx - 0.5 + ox
+        self._map = (mapping or (rgb.shape[1] / size[0], rgb.shape[0] / size[1], 0.0, 0.0)
+                     if self._size is not None else None)
+        self._planes = planes or {}
+
+    @property
+    def rgb(self) -> np.ndarray:
+        if self._size is not None:
+            self._src = self._sample()
+            self._size = self._map = None
+        return self._src
+
+    def _sample(self) -> np.ndarray:
+        """按映射从原像素采样到逻辑尺寸"""
+        width, height = self._size
+        sx, sy, ox, oy = self._map
+        h, w = self._src.shape[:2]
+        if (ox, oy) == (0.0, 0.0) and (sx, sy) == (w / width, h / height):
+            return resize(self._src, self._size)
+        if max(1 / sx, 1 / sy) < AREA_SCALE:
+            # 强缩小：区域平均对亚像素偏移不敏感，取整到原像素后 INTER_AREA
+            region = self._src[round(oy):round(oy + height * sy), round(ox):round(ox + width * sx)]
+            return resize(region, self._size)
+        # 只取用到的原像素（含 Lanczos 核半径），翻转视图在此才复制
+        left = max(0, int(np.floor(ox + 0.5 * sx - 0.5)) - 4)
+        top = max(0, int(np.floor(oy + 0.5 * sy - 0.5)) - 4)
+        right = min(w, int(np.ceil(ox + (width - 0.5) * sx - 0.5)) + 5)
+        bottom = min(h, int(np.ceil(oy + (height - 0.5) * sy - 0.5)) + 5)
+        src = np.ascontiguousarray(self._src[top:bottom, left:right])
+        m = np.float64([[sx, 0, 0.5 * sx - 0.5 + ox - left], [0, sy, 0.5 * sy - 0.5 + oy - top]])
+        return cv2.warpAffine(src, m, (width, height), flags=cv2.INTER_LANCZOS4 | cv2.WARP_INVERSE_MAP,
+                              borderMode=cv2.BORDER_REPLICATE)
+
+    @property
+    def shape(self) -> tuple:
+        w, h = self.size
+        return (h, w) + self._src.shape[2:]
+
+    @property
+    def size(self) -> tuple:
+        """(width, height)，延迟缩放时为缩放后的尺寸"""
+        return self._size or (self._src.shape[1], self._src.shape[0])
+
+    def _plane(self, key: str, compute):
+        plane = self._planes.get(key)
+        if plane is None:
+            plane = self._planes[key] = compute()
+        return plane
+
+    @property
+    def gray(self) -> np.ndarray:
+        return self._plane("gray", lambda: cv2.cvtColor(self.rgb, cv2.COLOR_RGB2GRAY))
+
+    @property
+    def hsv(self) -> np.ndarray:
+        return self._plane("hsv", lambda: cv2.cvtColor(self.rgb, cv2.COLOR_RGB2HSV))
+
+    @property
+    def blurred(self) -> np.ndarray:
+        """霍夫圆检测用的平滑灰度图"""
+        return self._plane("blurred", lambda: cv2.GaussianBlur(self.gray, (9, 9), 2))
+
+    def crop(self, box: tuple) -> "Frame":
+        """裁剪（视图），已缓存的派生平面一并切片；延迟缩放时只平移映射"""
+        left, top, right, bottom = clamp_box(box, self.shape)
+        if self._size is None:
+            planes = {k: v[top:bottom, left:right] for k, v in self._planes.items()}
+            return Frame(self._src[top:bottom, left:right], planes)
+        sx, sy, ox, oy = self._map
+        return Frame(self._src, size=(right - left, bottom - top),
+                     mapping=(sx, sy, ox + left * sx, oy + top * sy))
+
+    def view(self, fn) -> "Frame":
+        """
+        对原像素做视图变换（翻转、旋转90°），保留延迟缩放
+        延迟缩放时用 2x2 探针数组得出 fn 怎样交换、翻转坐标轴，据此换算映射
+        """
+        if self._size is None:
+            return Frame(fn(self._src))
+        probe = fn(np.arange(4).reshape(2, 2))
+        origin = divmod(int(probe[0, 0]), 2)[::-1]
+        src = fn(self._src)
+        sx, sy, ox, oy = self._map
+        scales, offsets = (sx, sy), (ox, oy)
+        extents, sizes = (self._src.shape[1], self._src.shape[0]), self._size
+        axes = []
+        for corner in (probe[0, 1], probe[1, 0]):
+            step = divmod(int(corner), 2)[::-1]
+            axis = 0 if step[0] != origin[0] else 1
+            offset = offsets[axis]
+            if step[axis] < origin[axis]:
+                offset = extents[axis] - sizes[axis] * scales[axis] - offset
+            axes.append((axis, scales[axis], offset))
+        (ax, sx, ox), (ay, sy, oy) = axes
+        return Frame(src, size=(sizes[ax], sizes[ay]), mapping=(sx, sy, ox, oy))
+
+    def scaled(self, size: tuple) -> "Frame":
+        """缩放到 (width, height)（延迟）"""
+        size = tuple(size)
+        if self._size is None:
+            return Frame(self._src, size=size)
+        sx, sy, ox, oy = self._map
+        w, h = self._size
+        return Frame(self._src, size=size, mapping=(sx * w / size[0], sy * h / size[1], ox, oy))
+
+    def resized(self, size: tuple) -> "Frame":
+        """立即从原像素一次缩放到 (width, height)"""
+        return Frame(self.scaled(size).rgb)
+
+
+def quadrant_box(cx: int, cy: int, r: int, quadrant: str, margin: int = 0) -> tuple:
+    """以圆心为角、边长 r(+margin) 的象限裁剪框"""
+    size = r + margin
+    return {
+        "TR": (cx, cy - size, cx + size, cy),
+        "TL": (cx - size, cy - size, cx, cy),
+        "BR": (cx, cy, cx + size, cy + size),
+        "BL": (cx - size, cy, cx, cy + size),
+    }[quadrant]
+
+
+def flip_to_top_right(image: np.ndarray, quadrant: str) -> np.ndarray:
+    """翻转使指定象限移到右上（视图）"""
+    if quadrant in ("TL", "BL"):
+        image = image[:, ::-1]
+    if quadrant in ("BR", "BL"):
+        image = image[::-1]
+    return image
+
+
+@lru_cache(maxsize=8)
+def quarter_mask(size: int) -> np.ndarray:
+    """1/4扇形mask：圆心在左下角，半径为 size（弧线在右上角）"""
+    y, x = np.ogrid[:size, :size]
+    mask = (x ** 2 + (y - size) ** 2) <= size ** 2
+    mask.flags.writeable = False
+    return mask
+
+
+def gray_sum(image: np.ndarray, band: int = 256) -> int:
+    """
+    灰度总和：逐像素与 PIL convert('L') 相同的定点取整
+    (R*19595 + G*38470 + B*7471 + 0x8000) >> 16，按行分带计算，不生成整图灰度图
+    """
+    total = 0
+    for top in range(0, image.shape[0], band):
+        rgb = image[top:top + band].astype(np.uint32)
+        luma = (rgb[..., 0] * 19595 + rgb[..., 1] * 38470 + rgb[..., 2] * 7471 + 0x8000) >> 16
+        total += int(luma.sum(dtype=np.uint64))
+    return total
+
+
+def gray_mean(image: np.ndarray) -> int:
+    """灰度均值，取整同 ImageEnhance.Contrast: int(mean + 0.5)"""
+    return int(gray_sum(image) / (image.shape[0] * image.shape[1]) + 0.5)
+
+
+def pil_blend(degenerate, image: np.ndarray, factor: float) -> np.ndarray:
+    """
+    Image.blend(degenerate, image, factor)（ImageEnhance 的核心）：
+    float32 计算 degenerate + factor * (image - degenerate)，饱和后截断取整
+    degenerate: 数组或标量（对比度的灰度均值、亮度的 0）
+    """
+    base = degenerate.astype(np.float32) if isinstance(degenerate, np.ndarray) else np.float32(degenerate)
+    out = image.astype(np.float32)
+    out -= base
+    out *= np.float32(factor)
+    out += base
+    np.clip(out, 0, 255, out=out)
+    return out.astype(np.uint8)
+
+
+def enhance_array(image: np.ndarray, mean: int = None) -> np.ndarray:
+    """
+    增强图像：对比度、锐度、亮度 + USM锐化
+    与 ImageEnhance.Contrast(1.3) / Sharpness(1.5) / Brightness(1.1)
+    + ImageFilter.UnsharpMask(radius=2, percent=150, threshold=3) 逐像素一致（check_enhance.py 校验）
+    mean: 对比度用的灰度均值（分块处理时传入整图的值），None 时按本图计算
+    """
+    # 对比度：向灰度均值混合
+    if mean is None:
+        mean = gray_mean(image)
+    out = pil_blend(mean, image, CONTRAST)
+
+    # 锐度：与平滑图像混合（平滑图像边缘一圈保持原值，同 PIL）
+    smooth = cv2.filter2D(out, -1, SMOOTH_KERNEL)
+    smooth[0], smooth[-1], smooth[:, 0], smooth[:, -1] = out[0], out[-1], out[:, 0], out[:, -1]
+    out = pil_blend(smooth, out, SHARPNESS)
+
+    # 亮度
+    out = pil_blend(0, out, BRIGHTNESS)
+
+    # USM锐化：PIL 的模糊是三次盒式滤波近似高斯，OpenCV 没有对应实现，直接调用 PIL
+    usm = ImageFilter.UnsharpMask(radius=UNSHARP_RADIUS, percent=UNSHARP_PERCENT, threshold=UNSHARP_THRESHOLD)
+    return np.array(Image.fromarray(out).filter(usm))
+
+
+def square_canvas(frame: "Frame", size: int, anchor: str = "center",
+                  upscale: bool = True, background: int = 255) -> np.ndarray:
+    """等比缩放（从原像素一次缩放）后放到正方形画布上（anchor: center / bottom_left）"""
+    w, h = frame.size
+    scale = size / max(w, h)
+    if not upscale:
+        scale = min(scale, 1.0)
+    new_w, new_h = max(1, int(w * scale)), max(1, int(h * scale))
+    resized = frame.resized((new_w, new_h)).rgb
+
+    canvas = np.full((size, size, 3), background, dtype=np.uint8)
+    if anchor == "bottom_left":
+        x, y = 0, size - new_h
+    else:
+        x, y = (size - new_w) // 2, (size - new_h) // 2
+    canvas[y:y + new_h, x:x + new_w] = resized
+    return canvas
+
+
+# ============ 培养皿检测 ============
+
+def detect_hough(frame: Frame) -> tuple:
+    """霍夫圆检测，取最大的圆；失败返回 None"""
+    height, width = frame.shape[:2]
+    circles = cv2.HoughCircles(
+        frame.blurred,
+        cv2.HOUGH_GRADIENT,
+        dp=1.2,
+        minDist=min(height, width) // 2,
+        param1=50,
+        param2=30,
+        minRadius=min(height, width) // 4,
+        maxRadius=min(height, width) // 2
+    )
+    if circles is None:
+        return None
+    circles = np.uint16(np.around(circles))
+    largest = max(circles[0], key=lambda c: c[2])
+    return int(largest[0]), int(largest[1]), int(largest[2])
+
+
+def detect_color(frame: Frame, color_lower=AGAR_COLOR["color_lower"],
+                 color_upper=AGAR_COLOR["color_upper"], color_kernel: int = 25,
+                 min_circularity: float = 0.0, min_radius_frac: float = 0.0) -> tuple:
+    """
+    基于培养基颜色检测培养皿，拟合最小外接圆
+
+    min_circularity: 轮廓不够圆时改用质心 + 等效半径
+    min_radius_frac: 半径小于图片短边的该比例视为检测失败
+    """
+    mask = cv2.inRange(frame.hsv, np.array(color_lower), np.array(color_upper))
+
+    kernel = np.ones((color_kernel, color_kernel), np.uint8)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+
+    largest = max(contours, key=cv2.contourArea)
+    (cx, cy), radius = cv2.minEnclosingCircle(largest)
+
+    if min_circularity:
+        area = cv2.contourArea(largest)
+        expected_area = np.pi * radius * radius
+        circularity = area / expected_area if expected_area > 0 else 0
+        if circularity < min_circularity:
+            M = cv2.moments(largest)
+            if M["m00"] > 0:
+                cx = M["m10"] / M["m00"]
+                cy = M["m01"] / M["m00"]
+                radius = np.sqrt(area / np.pi)
+
+    if radius <= min(frame.shape[:2]) * min_radius_frac:
+        return None
+    return int(cx), int(cy), int(radius)
+
+
+# ---- 自动检测：霍夫 + 颜色 + 边缘 RANSAC 融合，带置信度 ----
+
+# 检测在缩小到长边 DETECT_SIZE 的图上进行（12MP 原图上霍夫要十几分钟）
+DETECT_SIZE = 800
+# 置信度低于该值时交给下一个方法（通常是手动配置）
+MIN_CONFIDENCE = 0.6
+# 两个圆的圆心距离、半径差都小于 AGREE_TOL·r 视为一致
+AGREE_TOL = 0.05
+
+Detection = namedtuple("Detection", ["plate", "confidence", "method", "support", "agreement"])
+
+
+def downscaled(frame: Frame, detect_size: int = DETECT_SIZE) -> tuple:
+    """检测用的缩小帧：长边缩到 detect_size（不放大），返回 (Frame, 缩放比例)"""
+    w, h = frame.size
+    scale = min(1.0, detect_size / max(w, h))
+    return frame.resized((max(1, round(w * scale)), max(1, round(h * scale)))), scale
+
+
+def detect_hough_scaled(frame: Frame, detect_size: int = DETECT_SIZE) -> tuple:
+    """缩小图上的霍夫圆检测（参数都按图片尺寸取比例），结果换算回原图坐标；失败返回 None"""
+    small, scale = downscaled(frame, detect_size)
+    plate = detect_hough(small)
+    return None if plate is None else tuple(int(round(v / scale)) for v in plate)
+
+
+def fit_circle(points: np.ndarray) -> tuple:
+    """最小二乘拟合圆（Kåsa 代数拟合），points 为 (N, 2)"""
+    x, y = points[:, 0], points[:, 1]
+    A = np.column_stack([2 * x, 2 * y, np.ones(len(x))])
+    (cx, cy, c), *_ = np.linalg.lstsq(A, x * x + y * y, rcond=None)
+    return cx, cy, float(np.sqrt(max(c + cx * cx + cy * cy, 0.0)))
+
+
+def rim_support(edges: np.ndarray, circle: tuple, samples: int = 360) -> tuple:
+    """
+    圆周上落在边缘像素（已膨胀）上的比例，只统计在图内的那段圆弧
+
+    Returns:
+        (support, coverage)：coverage 为圆周在图内的比例，不足1/4时 support 记为0
+    """
+    cx, cy, r = circle
+    h, w = edges.shape
+    t = np.linspace(0, 2 * np.pi, samples, endpoint=False)
+    px = np.rint(cx + r * np.cos(t)).astype(np.intp)
+    py = np.rint(cy + r * np.sin(t)).astype(np.intp)
+    inside = (px >= 0) & (px < w) & (py >= 0) & (py < h)
+    coverage = float(inside.mean())
+    if coverage < 0.25:
+        return 0.0, coverage
+    return np.count_nonzero(edges[py[inside], px[inside]]) / int(inside.sum()), coverage
+
+
+def ransac_rim(edges: np.ndarray, seeds: list, rng: np.random.Generator,
+               iterations: int = 300, tol: float = 3.0, band: float = 0.15) -> list:
+    """
+    在每个初始圆附近的环带内对边缘点做 RANSAC 拟合圆，再用内点最小二乘精修
+
+    Returns:
+        [(cx, cy, r)]，每个可用初始圆一个
+    """
+    ys, xs = np.nonzero(edges)
+    points = np.column_stack([xs, ys]).astype(np.float64)
+    fitted = []
+    for sx, sy, sr in seeds:
+        d = np.hypot(points[:, 0] - sx, points[:, 1] - sy)
+        ring = points[np.abs(d - sr) < band * sr]
+        if len(ring) < 20:
+            continue
+        best_count, best_inliers = 0, None
+        for _ in range(iterations):
+            cx, cy, r = fit_circle(ring[rng.choice(len(ring), 3, replace=False)])
+            if not 0.5 * sr < r < 1.5 * sr:
+                continue
+            inliers = np.abs(np.hypot(ring[:, 0] - cx, ring[:, 1] - cy) - r) < tol
+            count = int(inliers.sum())
+            if count > best_count:
+                best_count, best_inliers = count, inliers
+        if best_inliers is not None:
+            fitted.append(fit_circle(ring[best_inliers]))
+    return fitted
+
+
+def circles_agree(a: tuple, b: tuple, tol: float = AGREE_TOL) -> bool:
+    r = max(a[2], b[2])
+    return np.hypot(a[0] - b[0], a[1] - b[1]) < tol * r and abs(a[2] - b[2]) < tol * r
+
+
+def detect_auto(frame: Frame, detect_size: int = DETECT_SIZE, seed: int = 0) -> Detection:
+    """
+    融合检测培养皿：霍夫圆、培养基颜色、皿沿边缘 RANSAC 各给出候选圆，
+    按圆周边缘支持度选最佳，置信度 = 0.7·支持度 + 0.3·与其他方法的一致比例
+
+    Returns:
+        Detection(plate 原图坐标, confidence 0~1, method, support, agreement)；
+        没有任何候选时 plate 为 None、confidence 为 0
+    """
+    with TRACER.span("resize"):
+        small, scale = downscaled(frame, detect_size)
+        gray = small.gray
+    short = min(gray.shape)
+
+    with TRACER.span("hough"):
+        circles = cv2.HoughCircles(
+            cv2.GaussianBlur(gray, (9, 9), 2), cv2.HOUGH_GRADIENT, dp=1.2, minDist=short // 2,
+            param1=50, param2=30, minRadius=short // 5, maxRadius=short // 2 + short // 10)
+    hough = [tuple(map(float, c)) for c in circles[0][:3]] if circles is not None else []
+
+    with TRACER.span("color"):
+        color = detect_color(small, color_lower=AGAR_COLOR["color_lower"],
+                             color_upper=AGAR_COLOR["color_upper"], color_kernel=9)
+    color = [tuple(map(float, color))] if color is not None else []
+
+    with TRACER.span("ransac"):
+        edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 1.5), 40, 120)
+        ransac = ransac_rim(edges, hough[:2] + color, np.random.default_rng(seed))
+
+    with TRACER.span("score"):
+        edges = cv2.dilate(edges, np.ones((5, 5), np.uint8))
+        best = None
+        for method, candidates in (("ransac", ransac), ("hough", hough), ("color", color)):
+            for circle in candidates:
+                support, _ = rim_support(edges, circle)
+                if best is None or support > best[0]:
+                    best = (support, method, circle)
+    if best is None:
+        return Detection(None, 0.0, None, 0.0, 0.0)
+
+    support, method, circle = best
+    # 其他方法的最佳候选是否与选中的圆一致
+    others = [c for m, c in (("hough", hough[:1]), ("color", color), ("ransac", ransac[:1]))
+              if m != method and c]
+    agreement = sum(bool(circles_agree(circle, c[0])) for c in others) / len(others) if others else 0.0
+    confidence = 0.7 * support + 0.3 * agreement
+
+    plate = tuple(int(round(v / scale)) for v in circle)
+    return Detection(plate, confidence, method, support, agreement)
+
+
+# ============ 区域评分（积分图） ============
+
+# 象限方向：从圆心指向该象限的 (x, y) 单位方向
+QUADRANT_DIRECTIONS = {"TR": (1, -1), "TL": (-1, -1), "BR": (1, 1), "BL": (-1, 1)}
+
+
+class PlateStats:
+    """
+    培养皿圆内灰度的积分图（summed-area table）：像素数、I、I² 三张表
+
+    建表一次 O(N)，之后任意矩形框与圆的交集（象限框即1/4扇形）的
+    均值/标准差都是 O(1)（四次查表），可以批量给大量候选框打分。
+    scale < 1 时在缩小的灰度图上建表，节省内存，打分只用于比较候选。
+    """
+
+    def __init__(self, gray: np.ndarray, plate: tuple, scale: float = 1.0):
+        cx, cy, r = plate
+        h, w = gray.shape[:2]
+        # 只在培养皿外接正方形内建表
+        left, top, right, bottom = clamp_box((cx - r, cy - r, cx + r + 1, cy + r + 1), gray.shape)
+        region = gray[top:bottom, left:right]
+        if scale != 1.0:
+            size = (max(1, round(region.shape[1] * scale)), max(1, round(region.shape[0] * scale)))
+            region = cv2.resize(region, size, interpolation=cv2.INTER_AREA)
+        self.origin = (left, top)
+        self.scale = scale
+
+        mask = np.zeros(region.shape, np.uint8)
+        center = (round((cx - left) * scale), round((cy - top) * scale))
+        cv2.circle(mask, center, max(1, round(r * scale)), 1, -1)
+        masked = region * mask
+        self.sum, self.sqsum = cv2.integral2(masked, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+        self.count = cv2.integral(mask, sdepth=cv2.CV_32S)
+
+    def _corners(self, boxes: np.ndarray) -> tuple:
+        """原图坐标的框 -> 积分图下标（限制在表内）"""
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        left, top = self.origin
+        x = np.rint((boxes[:, [0, 2]] - left) * self.scale).astype(np.intp)
+        y = np.rint((boxes[:, [1, 3]] - top) * self.scale).astype(np.intp)
+        h, w = self.count.shape
+        return np.clip(x, 0, w - 1), np.clip(y, 0, h - 1)
+
+    @staticmethod
+    def _box_sum(table: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        return (table[y[:, 1], x[:, 1]] - table[y[:, 0], x[:, 1]]
+                - table[y[:, 1], x[:, 0]] + table[y[:, 0], x[:, 0]])
+
+    def stats(self, boxes) -> tuple:
+        """
+        批量计算框内（且在圆内）像素的统计量
+
+        Args:
+            boxes: (N, 4) 的 (left, top, right, bottom)，原图坐标
+
+        Returns:
+            (count, mean, std)，各为 (N,) 数组；框内没有培养皿像素时 mean/std 为 0
+        """
+        x, y = self._corners(boxes)
+        n = self._box_sum(self.count, x, y).astype(np.float64)
+        total = self._box_sum(self.sum, x, y)
+        total_sq = self._box_sum(self.sqsum, x, y)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, total / n, 0.0)
+            var = np.where(n > 0, total_sq / n - mean ** 2, 0.0)
+        return n, mean, np.sqrt(np.clip(var, 0, None))
+
+    def std(self, box: tuple) -> float:
+        return float(self.stats([box])[2][0])
+
+
+def view_candidates(plate: tuple, quadrants=QUADRANTS, scales=(1.0,), shifts=(0.0,)) -> list:
+    """
+    候选视野框：每个象限以圆心为角、边长 scale·r，
+    角点沿象限对角线向外平移 shift·r（shift 可为负）
+
+    Returns:
+        [(quadrant, box)]
+    """
+    cx, cy, r = plate
+    candidates = []
+    for quadrant in quadrants:
+        dx, dy = QUADRANT_DIRECTIONS[quadrant]
+        for shift in shifts:
+            x0, y0 = cx + dx * shift * r, cy + dy * shift * r
+            for scale in scales:
+                x1, y1 = x0 + dx * scale * r, y0 + dy * scale * r
+                box = (int(min(x0, x1)), int(min(y0, y1)), int(max(x0, x1)), int(max(y0, y1)))
+                candidates.append((quadrant, box))
+    return candidates
+
+
+def best_view(stats: PlateStats, plate: tuple, quadrants=QUADRANTS,
+              scales=(1.0,), shifts=(0.0,)) -> tuple:
+    """
+    在积分图上给所有候选框打分（培养皿内灰度标准差），取最高分
+
+    Returns:
+        (score, quadrant, box)
+    """
+    candidates = view_candidates(plate, quadrants, scales, shifts)
+    _, _, std = stats.stats([box for _, box in candidates])
+    best = int(np.argmax(std))
+    quadrant, box = candidates[best]
+    return float(std[best]), quadrant, box
+
+
+def same_circle(a: tuple, b: tuple, tolerance: float = TABLE_TOLERANCE) -> bool:
+    """两个圆的圆心距离和半径差都不超过 tolerance × b 的半径"""
+    r = b[2]
+    return (np.hypot(a[0] - b[0], a[1] - b[1]) <= tolerance * r
+            and abs(a[2] - b[2]) <= tolerance * r)
+
+
+# ============ 阶段 ============
+# 每个阶段签名: stage(state, **params)，就地更新 state
+# state: name, frame (Frame), plate (cx, cy, r), quadrant, view, output_dir, done, outputs
+
+STAGES = {}
+
+
+def stage(fn):
+    STAGES[fn.__name__] = fn
+    return fn
+
+
+@stage
+def detect_plate(state: dict, methods=("auto", "hough", "color"), table: dict = None,
+                 min_confidence: float = MIN_CONFIDENCE, **color_params):
+    """
+    按顺序尝试检测方法: "auto"（融合检测，置信度达标才采用）/ "table"（手动配置）
+    / "hough" / "color"
+    全部失败时使用图片中心；只允许 table 且没有配置时跳过该照片
+    手动配置里的象限是取景选择，自动检测的圆与配置的圆一致（same_circle）时沿用
+    """
+    frame = state["frame"]
+    entry = (table or {}).get(state["name"])
+    plate = None
+    for method in methods:
+        if method == "auto":
+            detection = detect_auto(frame)
+            print(f"  自动检测: 置信度 {detection.confidence:.2f} ({detection.method})")
+            if detection.plate is not None and detection.confidence >= min_confidence:
+                plate = detection.plate
+            elif entry is not None:
+                print("  置信度不足，使用手动配置")
+        elif method == "table":
+            if entry is not None:
+                plate = tuple(entry[:3])
+        elif method == "hough":
+            with TRACER.span("hough"):
+                plate = detect_hough_scaled(frame)
+        elif method == "color":
+            plate = detect_color(frame, **color_params)
+        if plate is not None:
+            break
+
+    if plate is None:
+        if "table" in methods and not set(methods) - {"table", "auto"}:
+            raise SkipImage(f"没有 {state['name']} 的配置，自动检测置信度也不足")
+        w, h = frame.size
+        print("  警告: 无法检测到培养皿，使用默认中心裁剪")
+        plate = (w // 2, h // 2, min(w, h) // 3)
+
+    if entry is not None and len(entry) > 3:
+        if same_circle(plate, entry[:3]):
+            state["quadrant"] = entry[3]
+        else:
+            # 配置的象限是对着配置的圆选的，圆不符时按斑块密度重新选
+            _, state["quadrant"], _ = best_view(PlateStats(frame.gray, plate, 0.5), plate)
+            print(f"  配置的圆 {tuple(entry[:3])} 与检测结果不符，象限改为 {state['quadrant']}")
+    state["plate"] = plate
+    print(f"  培养皿: 中心({plate[0]}, {plate[1]}), 半径{plate[2]}"
+          + (f", 象限{state['quadrant']}" if state.get("quadrant") else ""))
+
+
+@stage
+def select_quadrant(state: dict, scales=(1.0,), shifts=(0.0,), stats_scale: float = 0.5):
+    """
+    选择斑块最密集的视野（培养皿内灰度标准差最大）
+
+    默认只比较四个象限（1/4扇形）；给出多个 scales / shifts 时在积分图上
+    搜索全部候选裁剪框，选中的框记为 state["view"]，由 crop_quadrant 使用
+    """
+    stats = PlateStats(state["frame"].gray, state["plate"], stats_scale)
+    score, quadrant, box = best_view(stats, state["plate"], scales=scales, shifts=shifts)
+    state["quadrant"] = quadrant
+    if len(scales) > 1 or len(shifts) > 1:
+        state["view"] = box
+    print(f"  选择象限: {quadrant} (标准差 {score:.1f})")
+
+
+@stage
+def crop_quadrant(state: dict, quadrant: str = None, margin: float = 0.0):
+    """
+    裁剪以圆心为角的象限（margin 为半径的比例）
+    未指定 quadrant 且 select_quadrant 搜索出了视野框时，直接用该框
+    """
+    cx, cy, r = state["plate"]
+    if quadrant is None and state.get("view") is not None:
+        state["frame"] = state["frame"].crop(state["view"])
+        return
+    quadrant = quadrant or state.get("quadrant") or "TR"
+    state["quadrant"] = quadrant
+    state["frame"] = state["frame"].crop(quadrant_box(cx, cy, r, quadrant, int(r * margin)))
+
+
+@stage
+def crop_table(state: dict, regions: dict, flip: dict = None):
+    """按手动指定的裁剪区域裁剪，必要时水平翻转"""
+    region = regions.get(state["name"])
+    if region is None:
+        raise SkipImage(f"没有 {state['name']} 的裁剪配置")
+    print(f"  裁剪区域: {region}")
+    frame = state["frame"].crop(region)
+    if (flip or {}).get(state["name"], False):
+        frame = frame.view(lambda a: a[:, ::-1])
+        print("  水平翻转")
+    state["frame"] = frame
+
+
+@stage
+def standardize_plate(state: dict, diameter: int = STANDARD_PLATE_DIAMETER, margin: float = 0.05):
+    """
+    提取培养皿外接正方形（含边距）并缩放到标准直径，圆心在图像中心
+    缩放是延迟的：之后的翻转、裁剪只换算映射，第一次读取像素时只采样裁剪出的区域
+    """
+    cx, cy, r = state["plate"]
+    m = int(r * margin)
+    region = state["frame"].crop((cx - r - m, cy - r - m, cx + r + m, cy + r + m))
+    scale = diameter / (2 * r)
+    w, h = region.size
+    state["frame"] = region.scaled((int(w * scale), int(h * scale)))
+    print("  标准化后: {}x{}".format(*state["frame"].size))
+
+
+@stage
+def orient(state: dict, mode: str = "flip"):
+    """
+    统一方向使弧线在右上角
+    flip: 翻转（镜像），rotate: 按象限旋转 0/90/180/270 度
+    """
+    quadrant = state.get("quadrant") or "TR"
+    if mode == "rotate":
+        k = {"TR": 0, "TL": 1, "BL": 2, "BR": 3}[quadrant]
+        state["frame"] = state["frame"].view(lambda a: np.rot90(a, k))
+    else:
+        state["frame"] = state["frame"].view(lambda a: flip_to_top_right(a, quadrant))
+
+
+@stage
+def crop_top_right(state: dict, half: int = None):
+    """从圆心居中的图像裁剪右上象限（half 为边长，默认到图像边界）"""
+    frame = state["frame"]
+    w, h = frame.size
+    cx, cy = w // 2, h // 2
+    if half is None:
+        state["frame"] = frame.crop((cx, 0, w, cy))
+    else:
+        state["frame"] = frame.crop((cx, cy - half, cx + half, cy))
+
+
+@stage
+def sector_mask(state: dict, tile: int = None):
+    """
+    只保留1/4扇形内的像素，扇形外纯黑
+    tile: 分块处理（大图，见 plaque_tiles），不生成整图大小的mask
+    """
+    if tile is not None:
+        from plaque_tiles import sector_mask_tiled
+        state["frame"] = Frame(sector_mask_tiled(state["frame"].rgb, tile=tile))
+        return
+    image = state["frame"].rgb
+    size = min(image.shape[:2])
+    out = np.zeros_like(image)
+    region = quarter_mask(size)
+    np.copyto(out[:size, :size], image[:size, :size], where=region[..., None])
+    state["frame"] = Frame(out)
+
+
+@stage
+def enhance(state: dict, tile: int = None):
+    """tile: 分块增强（大图，见 plaque_tiles），临时数组只有块大小，结果相同"""
+    if tile is not None:
+        from plaque_tiles import enhance_tiled
+        state["frame"] = Frame(enhance_tiled(state["frame"].rgb, tile=tile))
+        return
+    state["frame"] = Frame(enhance_array(state["frame"].rgb))
+
+
+@stage
+def center_square(state: dict):
+    """裁剪中心正方形"""
+    frame = state["frame"]
+    w, h = frame.size
+    d = min(w, h)
+    left, top = (w - d) // 2, (h - d) // 2
+    state["frame"] = frame.crop((left, top, left + d, top + d))
+
+
+@stage
+def crop_fraction(state: dict, start: float = 0.2, end: float = 0.8, min_size: int = 2000):
+    """提取中心区域；图片小于 min_size 时结束流程（不输出）"""
+    frame = state["frame"]
+    w, h = frame.size
+    if w <= min_size or h <= min_size:
+        state["done"] = True
+        return
+    state["frame"] = frame.crop((int(w * start), int(h * start), int(w * end), int(h * end)))
+
+
+@stage
+def resize_square(state: dict, size: int = OUTPUT_SIZE):
+    """直接缩放到 size×size"""
+    state["frame"] = state["frame"].resized((size, size))
+
+
+@stage
+def fit_square(state: dict, size: int = OUTPUT_SIZE, anchor: str = "center",
+               upscale: bool = True, background: int = 255):
+    """等比缩放后放到正方形白色画布上"""
+    state["frame"] = Frame(square_canvas(state["frame"], size, anchor, upscale, background))
+
+
+@stage
+def save(state: dict, suffix: str = "_统一", quality: int = JPEG_QUALITY, max_size: int = None,
+         encoder: str = None, **options):
+    """
+    保存当前图像（流程继续）
+    max_size: 只对输出做等比缩小（如PPT展示版），不影响后续阶段
+    encoder/options: 编码器及参数（见 plaque_writer.ENCODERS），None 时用 writer 的默认（PIL JPEG）；
+    state 中有 writer 时交给线程池写入，不等编码完成
+    """
+    frame = state["frame"]
+    if max_size is not None:
+        w, h = frame.size
+        scale = min(1.0, max_size / max(w, h))
+        frame = frame.resized((max(1, round(w * scale)), max(1, round(h * scale))))
+    image = frame.rgb
+    writer = state.get("writer")
+    encoder = encoder or (writer.encoder if writer is not None else "pil")
+    output_name = f"{state['name']}{suffix}{EXTENSIONS[encoder]}"
+    output_path = Path(state["output_dir"]) / output_name
+    meta = state.get("meta")
+    args = (image, output_path, quality, output_exif(meta), meta and meta.icc_profile)
+    if writer is not None:
+        writer.submit(*args, encoder=encoder, **options)
+        # 大小和修改时间写完才知道，只有缓存用到（用缓存时不异步写入）
+        state["outputs"].append([output_name, None, None])
+    else:
+        write_image(*args, encoder=encoder, **options)
+        # 记录大小和修改时间：从缓存恢复时据此确认跳过的输出没被改动
+        st = output_path.stat()
+        state["outputs"].append([output_name, st.st_size, st.st_mtime_ns])
+    print(f"  保存: {output_name} ({image.shape[1]}x{image.shape[0]})")
+
+
+# ============ 流水线 ============
+
+# 中间结果随 state 一起缓存的字段
+CACHED_FIELDS = ("plate", "quadrant", "view", "done", "outputs")
+# 阶段实现所在的源文件（代码版本的一部分）
+STAGE_SOURCES = ("plaque_pipeline.py", "plaque_tiles.py", "photo_ingest.py")
+
+
+@lru_cache(maxsize=1)
+def code_version() -> str:
+    """阶段实现的版本：STAGE_SOURCES 源码 + 库版本的哈希，改了任何阶段实现缓存键都会变"""
+    digest = hashlib.sha1()
+    for name in STAGE_SOURCES:
+        digest.update(Path(__file__).with_name(name).read_bytes())
+    digest.update(f"{cv2.__version__}|{np.__version__}|{PIL.__version__}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def source_key(path: Path) -> str:
+    """源文件标识：绝对路径 + 大小 + 修改时间（文件变了缓存自动失效）"""
+    path = Path(path)
+    st = path.stat()
+    return f"{path.resolve()}|{st.st_size}|{st.st_mtime_ns}"
+
+
+def output_intact(path: Path, size: int, mtime_ns: int) -> bool:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return False
+    return st.st_size == size and st.st_mtime_ns == mtime_ns
+
+
+class StageCache:
+    """
+    阶段中间结果缓存：原始 uint8 数组存为 .npy，读取时内存映射（零拷贝、只读）
+
+    键 = 代码版本 + 源文件 + 到该阶段为止的全部 (阶段名, 参数)，任何前序参数变化、
+    阶段实现或库版本变化都换键（旧条目不再命中，可以直接删除缓存目录）。
+    每个条目: <键>.json（plate/quadrant 等 state 字段 + 数组文件名）+ <键>.npy；
+    阶段没有改变图像（如 detect_plate、save）时条目直接引用上一个数组文件，不重复写。
+    改后面的阶段（裁剪、增强参数）时，从最长的已缓存前缀继续，跳过解码和前面的阶段；
+    被跳过的 save 输出按大小+修改时间核对，被删除或被其他版本覆盖时退回更早的前缀。
+    """
+
+    DECODE = ("load_rgb", {"orient": True})
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(source: str, config: list) -> str:
+        text = json.dumps([code_version(), source, config], sort_keys=True, ensure_ascii=False, default=repr)
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def load(self, key: str):
+        """返回 (Frame, state字段dict, 数组文件名)，没有该条目时返回 None"""
+        meta_path = self.root / f"{key}.json"
+        if not meta_path.exists():
+            return None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        array_path = self.root / meta["array"]
+        if not array_path.exists():
+            return None
+        rgb = np.load(array_path, mmap_mode="r")
+        fields = {k: (tuple(v) if isinstance(v, list) and k in ("plate", "view") else v)
+                  for k, v in meta["state"].items()}
+        return Frame(rgb), fields, meta["array"]
+
+    def store(self, key: str, frame: Frame, state: dict, array: str = None) -> str:
+        """
+        写入一个条目；array 给出时引用已有数组文件，否则把 frame 写成新的 .npy
+
+        Returns:
+            数组文件名（供后续未改变图像的阶段引用）
+        """
+        if array is None:
+            array = f"{key}.npy"
+            tmp = self.root / f"{key}.tmp.npy"
+            np.save(tmp, np.ascontiguousarray(frame.rgb))
+            os.replace(tmp, self.root / array)
+        meta = {"array": array, "state": {k: state.get(k) for k in CACHED_FIELDS}}
+        tmp = self.root / f"{key}.tmp.json"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, self.root / f"{key}.json")
+        return array
+
+
+class PlaquePipeline:
+    """
+    由阶段组成的处理流水线
+
+    stages: [(阶段名, 参数dict)]，阶段名见 STAGES
+    cache: StageCache，给出时每个阶段的结果都缓存，下次从最长的可用前缀继续
+    writer: plaque_writer.ImageWriter，给出时 save 阶段异步写入；
+            缓存要记录输出的大小和修改时间，有 cache 时不使用 writer
+    """
+
+    def __init__(self, stages: list, cache: StageCache = None, writer: ImageWriter = None):
+        self.config = [(name, dict(params)) for name, params in stages]
+        self.stages = [(STAGES[name], params) for name, params in self.config]
+        self.cache = cache
+        self.writer = writer if cache is None else None
+
+    @classmethod
+    def from_config(cls, config: list, cache: StageCache = None,
+                    writer: ImageWriter = None) -> "PlaquePipeline":
+        return cls(config, cache, writer)
+
+    def run(self, image, name: str, output_dir: Path, start: int = 0, fields: dict = None,
+            keys: list = None, array: str = None, meta=None) -> dict:
+        """
+        在内存中的图像（RGB数组或 Frame，已转正）上运行阶段，返回最终 state
+
+        start/fields: 从缓存恢复时的起始阶段和 state 字段
+        keys: 各阶段之后的缓存键；array: image 已缓存时的数组文件名
+        meta: photo_ingest.PhotoMeta，保存时写入输出的 EXIF
+        """
+        frame = image if isinstance(image, Frame) else Frame(image)
+        state = {"name": name, "frame": frame, "plate": None, "quadrant": None, "view": None,
+                 "output_dir": output_dir, "done": False, "outputs": [], "meta": meta,
+                 "writer": self.writer}
+        state.update(fields or {})
+        state["outputs"] = list(state.get("outputs") or [])
+        for i in range(start, len(self.stages)):
+            if state["done"]:
+                break
+            fn, params = self.stages[i]
+            before = state["frame"]
+            with TRACER.span(self.config[i][0], photo=name):
+                fn(state, **params)
+            if self.cache is None or keys is None:
+                continue
+            frame = state["frame"]
+            if frame is before and array is not None:
+                self.cache.store(keys[i], frame, state, array)
+            elif frame._size is None:  # 延迟缩放中的帧不落盘，避免提前缩放
+                array = self.cache.store(keys[i], frame, state)
+        return state
+
+    def _resume(self, input_path: Path, output_dir: Path, keys: list):
+        """找最长的可用缓存前缀：返回 (起始阶段, Frame, state字段, 数组文件名)，没有时返回 None"""
+        for i in range(len(keys) - 1, -1, -1):
+            entry = self.cache.load(keys[i])
+            if entry is None:
+                continue
+            # 跳过的 save 阶段的输出必须还在当前输出目录里，且没有被改写
+            if all(output_intact(Path(output_dir) / name, size, mtime)
+                   for name, size, mtime in entry[1].get("outputs") or []):
+                return (i,) + entry
+        return None
+
+    def process(self, input_path: Path, output_dir: Path, name: str = None) -> dict:
+        """读取一张照片并运行流水线，返回最终 state；跳过或出错时返回 None"""
+        print(f"处理: {input_path.name}")
+        try:
+            name = name or photo_name(input_path)
+            meta = read_meta(input_path)
+            if meta.orientation != 1:
+                print(f"  EXIF方向: {meta.orientation}")
+            if self.cache is None:
+                with TRACER.span("decode", photo=name):
+                    image = load_rgb(input_path, orientation=meta.orientation)
+                print(f"  尺寸: {image.shape[1]}x{image.shape[0]}")
+                return self.run(image, name, output_dir, meta=meta)
+
+            source = source_key(input_path)
+            # keys[0] 是解码结果，keys[i + 1] 是第 i 个阶段之后
+            keys = [StageCache.key(source, [StageCache.DECODE] + self.config[:i])
+                    for i in range(len(self.config) + 1)]
+            resumed = self._resume(input_path, output_dir, keys)
+            if resumed is None:
+                with TRACER.span("decode", photo=name):
+                    image = Frame(load_rgb(input_path, orientation=meta.orientation))
+                print(f"  尺寸: {image.size[0]}x{image.size[1]}")
+                array = self.cache.store(keys[0], image, {})
+                start, fields = 0, {}
+            else:
+                start, image, fields, array = resumed
+                print(f"  缓存: 从第 {start} 个阶段继续" if start else "  缓存: 跳过解码")
+            return self.run(image, name, output_dir, start, fields, keys[1:], array, meta)
+        except SkipImage as e:
+            print(f"  警告: {e}")
+            return None
+        except Exception as e:
+            print(f"  错误: {e}")
+            traceback.print_exc()
+            return None
+
+
+# 特写照片：增强 -> 中心正方形 -> 缩放
+CLOSEUP = [
+    ("enhance", {}),
+    ("center_square", {}),
+    ("resize_square", {}),
+    ("save", {}),
+]
+
+# 各版本的全盘照片处理配置
+VARIANTS = {
+    # 霍夫圆检测 + 自动选象限，旋转统一方向
+    "unified": [
+        ("detect_plate", {"methods": ("auto", "hough", "color"), **AGAR_COLOR_NARROW}),
+        ("select_quadrant", {}),
+        ("crop_quadrant", {}),
+        ("orient", {"mode": "rotate"}),
+        ("enhance", {}),
+        ("fit_square", {"upscale": False}),
+        ("save", {}),
+    ],
+    # 培养基颜色检测，右上象限
+    "v2": [
+        ("detect_plate", {"methods": ("auto", "color"), **AGAR_COLOR, "min_circularity": 0.5}),
+        ("crop_quadrant", {"quadrant": "TR", "margin": 0.05}),
+        ("enhance", {}),
+        ("fit_square", {"anchor": "bottom_left"}),
+        ("save", {}),
+    ],
+    # 自动检测优先，置信度不足时用手动配置，颜色检测兜底
+    "v3": [
+        ("detect_plate", {"methods": ("auto", "table", "color"), "table": MANUAL_CONFIG,
+                          **AGAR_COLOR, "min_radius_frac": 0.2}),
+        ("crop_quadrant", {"quadrant": "TR"}),
+        ("enhance", {}),
+        ("fit_square", {"anchor": "bottom_left"}),
+        ("save", {}),
+    ],
+    # 直接指定裁剪区域
+    "final": [
+        ("crop_table", {"regions": CROP_REGIONS, "flip": FLIP_HORIZONTAL}),
+        ("enhance", {}),
+        ("fit_square", {}),
+        ("save", {}),
+    ],
+    # 培养皿缩放到统一直径后裁剪象限
+    # 增强在标准直径下做（与原 PIL 实现一致，USM 半径按像素计），之后再缩放到输出尺寸：
+    # 共两次缩放，但第一次只采样裁剪出的象限。先缩放到输出尺寸再增强只快 10-25%，
+    # 与原实现的 SSIM 从 0.98-0.99 降到 0.96-0.97（quarter 裁剪不是正方形时降到 0.91），
+    # 见 benchmark_resize.py
+    "precise": [
+        ("detect_plate", {"methods": ("auto", "table"), "table": PRECISE_CONFIG}),
+        ("standardize_plate", {"margin": 0.05}),
+        ("orient", {"mode": "flip"}),
+        ("crop_top_right", {}),
+        ("enhance", {}),
+        ("resize_square", {}),
+        ("save", {}),
+    ],
+    # 1/4扇形，扇形外纯黑（缩放、增强的顺序同 precise）
+    "quarter": [
+        ("detect_plate", {"methods": ("auto", "table"), "table": PLATE_CONFIG}),
+        ("standardize_plate", {"margin": 0.02}),
+        ("orient", {"mode": "flip"}),
+        ("crop_top_right", {"half": STANDARD_PLATE_DIAMETER // 2}),
+        ("sector_mask", {}),
+        ("enhance", {}),
+        ("resize_square", {}),
+        ("sector_mask", {}),
+        ("save", {}),
+    ],
+}
+
+# HEIC原图 -> 原始 / 增强 / 展示 / 裁剪 四个版本
+PHOTOS = [
+    ("save", {"suffix": "_原始"}),
+    ("enhance", {}),
+    ("save", {"suffix": "_增强"}),
+    ("save", {"suffix": "_展示", "quality": 90, "max_size": 1200}),
+    ("crop_fraction", {"start": 0.2, "end": 0.8, "min_size": 2000}),
+    ("save", {"suffix": "_裁剪"}),
+]
+
+
+def photo_name(path: Path) -> str:
+    """R1_原始.jpg -> R1"""
+    return path.stem.replace("_原始", "")
+
+
+def is_closeup(path: Path) -> bool:
+    """名字中包含 "-数字" 的是特写照片（如 R1-5, W1-1-5）"""
+    return closeup_name(photo_name(path))
+
+
+def manifest_entries(state: dict, variant: str) -> list:
+    """一张照片的清单条目（每个输出文件一条）"""
+    base = meta_record(state["meta"]) if state.get("meta") else {}
+    plate = state.get("plate")
+    return [{"output": output, **base, "variant": variant,
+             "plate": [int(v) for v in plate] if plate else None,
+             "quadrant": state.get("quadrant")}
+            for output, _, _ in state["outputs"]]
+
+
+def write_manifest(output_dir: Path, entries: list) -> Path:
+    """
+    合并写入输出目录的清单（按输出文件名更新，其他版本的条目保留），按拍摄时间排序；
+    没有拍摄时间的排在最后，按文件名
+    """
+    path = Path(output_dir) / MANIFEST_NAME
+    merged = {}
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            merged = {e["output"]: e for e in json.load(f)}
+    merged.update((e["output"], e) for e in entries)
+    records = sorted(merged.values(), key=lambda e: (e.get("captured") is None,
+                                                     e.get("captured") or "", e["output"]))
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    return path
+
+
+def finish_writes(writer: ImageWriter, entries: list) -> list:
+    """等异步写入完成，报告失败的输出，并从清单条目中去掉"""
+    if writer is None:
+        return entries
+    failed = {Path(path).name for path, _ in writer.close()}
+    for path, error in writer.errors:
+        print(f"写入失败: {Path(path).name}: {error}")
+    return [e for e in entries if e["output"] not in failed]
+
+
+def run_variant(variant: str, photos_dir: Path = PHOTOS_DIR, output_dir: Path = None,
+                cache_dir: Path = None, workers: int = None) -> tuple:
+    """
+    用指定版本处理目录中所有 *_原始.jpg
+
+    cache_dir: 中间结果缓存目录（如 CACHE_DIR），给出时调参重跑跳过解码和未变的阶段
+    workers: 编码写入线程数（不用缓存时输出异步写入）
+
+    Returns:
+        (成功数, 照片总数)
+    """
+    output_dir = Path(output_dir or photos_dir / "统一裁剪")
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # 照片目录增量更新，全盘/特写直接按索引查询
+    catalog = PhotoCatalog(photos_dir)
+    catalog.scan()
+    full_plates = catalog.paths(closeup=False, folder="", order="name")
+    closeups = catalog.paths(closeup=True, folder="", order="name")
+    photos = full_plates + closeups
+    print(f"\n找到 {len(photos)} 张原始照片\n")
+    print(f"全盘: {len(full_plates)}, 特写: {len(closeups)}\n")
+
+    cache = StageCache(cache_dir) if cache_dir else None
+    writer = None if cache else ImageWriter(workers)
+    full_pipeline = PlaquePipeline.from_config(VARIANTS[variant], cache, writer)
+    closeup_pipeline = PlaquePipeline.from_config(CLOSEUP, cache, writer)
+
+    success = 0
+    entries = []
+    for pipeline, group in ((full_pipeline, full_plates), (closeup_pipeline, closeups)):
+        for p in group:
+            state = pipeline.process(p, output_dir)
+            if state is not None:
+                success += 1
+                entries += manifest_entries(state, variant)
+            print()
+    entries = finish_writes(writer, entries)
+
+    print("=" * 60)
+    print(f"完成: {success}/{len(photos)}")
+    print(f"输出: {output_dir}")
+    print(f"清单: {write_manifest(output_dir, entries)}")
+    catalog.scan()  # 登记新输出（输出目录在照片目录下时）
+    catalog.close()
+    TRACER.print_summary()
+    return success, len(photos)
+
+
+def run_photos(input_dir: Path = HEIC_DIR, output_dir: Path = PHOTOS_DIR, workers: int = None) -> tuple:
+    """HEIC原图转换为 原始/增强/展示/裁剪 四个JPG版本（workers: 编码写入线程数）"""
+    import pillow_heif
+    pillow_heif.register_heif_opener()
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # 按拍摄时间处理（只读文件头排序）
+    heic_files = [Path(m.path) for m in capture_index(
+        set(Path(input_dir).glob("*.HEIC")) | set(Path(input_dir).glob("*.heic")))]
+    print(f"找到 {len(heic_files)} 个HEIC文件\n")
+
+    writer = ImageWriter(workers)
+    pipeline = PlaquePipeline.from_config(PHOTOS, writer=writer)
+    success = 0
+    entries = []
+    for heic_file in heic_files:
+        state = pipeline.process(heic_file, output_dir, name=heic_file.stem)
+        if state is not None:
+            success += 1
+            entries += manifest_entries(state, "photos")
+        print()
+    entries = finish_writes(writer, entries)
+
+    print("=" * 50)
+    print(f"处理完成: {success}/{len(heic_files)} 成功")
+    print(f"输出目录: {output_dir}")
+    print(f"清单: {write_manifest(output_dir, entries)}")
+    TRACER.print_summary()
+    return success, len(heic_files)
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+多培养皿扫描图拆分（一次扫描 6~12 个皿）
+
+处理流程:
+1. 找皿 - 扫描图缩小到长边 SCAN_DETECT_SIZE，多圆霍夫检测，候选圆在皿沿附近
+   RANSAC 精修，按圆周边缘支持度筛选，去掉重叠圆和半径离群的误检
+2. 编号 - 按网格排布编号：行 A/B/C...（从上到下），列 1/2/3...（从左到右）
+3. 拆分 - 每个皿一个裁剪框，Frame.crop 得到父缓冲区的视图，不复制像素
+4. 并行 - 各皿交给现有的单皿流水线（VARIANTS），线程池并行；
+   扫描图上的圆作为 detect_plate 的手动配置，裁剪图上自动检测置信度不足时使用
+5. 输出 - <扫描名>_<编号>_统一.jpg + 清单.json（含皿编号和在扫描图中的位置），
+   编码写入由 plaque_writer 线程池完成
+
+用法:
+    python plaque_scan.py 扫描01.jpg --variant quarter --expected 12
+"""
+
+import argparse
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from photo_ingest import read_meta
+from plaque_pipeline import (PHOTOS_DIR, VARIANTS, Frame, PlaquePipeline, SkipImage, finish_writes,
+                             load_rgb, manifest_entries, ransac_rim, rim_support, save_jpeg, write_manifest)
+from plaque_trace import TRACER
+from plaque_writer import ImageWriter
+
+SCAN_DIR = PHOTOS_DIR / "扫描"
+OUTPUT_DIR = SCAN_DIR / "拆分"
+
+# 找皿在缩小到长边 SCAN_DETECT_SIZE 的图上进行
+SCAN_DETECT_SIZE = 1200
+# 皿半径相对扫描图短边的范围（2x3 ~ 3x4 排布）
+DISH_RADIUS_FRAC = (0.06, 0.3)
+# 圆周边缘支持度低于该值的候选视为误检
+MIN_DISH_SUPPORT = 0.4
+# 半径与中位半径相差超过该比例的候选视为误检（同一批皿大小相同）
+RADIUS_TOL = 0.25
+# 裁剪框在皿半径外留的边（比例）
+CROP_MARGIN = 0.08
+
+# id: 网格编号（A1, A2, ... B1 ...）；plate: 扫描图坐标 (cx, cy, r)
+Dish = namedtuple("Dish", ["id", "plate", "support"])
+
+
+def dish_candidates(gray: np.ndarray, radius_frac: tuple = DISH_RADIUS_FRAC,
+                    seed: int = 0) -> list:
+    """
+    小图上的候选皿：多圆霍夫 + 皿沿 RANSAC 精修
+
+    Returns:
+        [(support, (cx, cy, r))]，按支持度从高到低
+    """
+    short = min(gray.shape)
+    min_r, max_r = (int(short * f) for f in radius_frac)
+    circles = cv2.HoughCircles(
+        cv2.GaussianBlur(gray, (9, 9), 2), cv2.HOUGH_GRADIENT, dp=1.2, minDist=int(min_r * 1.5),
+        param1=50, param2=30, minRadius=min_r, maxRadius=max_r)
+    if circles is None:
+        return []
+
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 1.5), 40, 120)
+    wide = cv2.dilate(edges, np.ones((5, 5), np.uint8))
+    rng = np.random.default_rng(seed)
+    scored = []
+    for circle in (tuple(map(float, c)) for c in circles[0]):
+        options = [circle] + ransac_rim(edges, [circle], rng)
+        scored.append(max((rim_support(wide, c)[0], c) for c in options))
+    return sorted(scored, reverse=True)
+
+
+def select_dishes(scored: list, min_support: float = MIN_DISH_SUPPORT,
+                  radius_tol: float = RADIUS_TOL) -> list:
+    """按支持度依次接受不与已接受圆重叠的候选，再去掉半径离群的"""
+    accepted = []
+    for support, (cx, cy, r) in scored:
+        if support < min_support:
+            break
+        if all(np.hypot(cx - ax, cy - ay) >= 0.8 * (r + ar) for _, (ax, ay, ar) in accepted):
+            accepted.append((support, (cx, cy, r)))
+    if not accepted:
+        return []
+    median_r = float(np.median([c[2] for _, c in accepted]))
+    return [(s, c) for s, c in accepted if abs(c[2] - median_r) <= radius_tol * median_r]
+
+
+def grid_ids(plates: list) -> list:
+    """
+    按网格编号：圆心纵向相差小于半径的归为同一行，行从上到下 A/B/C...，
+    行内从左到右 1/2/3...
+
+    Returns:
+        与 plates 同序的编号列表
+    """
+    order = sorted(range(len(plates)), key=lambda i: plates[i][1])
+    rows = []
+    for i in order:
+        if rows:
+            row_y = np.mean([plates[j][1] for j in rows[-1]])
+            if abs(plates[i][1] - row_y) < plates[i][2]:
+                rows[-1].append(i)
+                continue
+        rows.append([i])
+
+    ids = [None] * len(plates)
+    for r, row in enumerate(rows):
+        for c, i in enumerate(sorted(row, key=lambda j: plates[j][0])):
+            ids[i] = f"{chr(ord('A') + r)}{c + 1}"
+    return ids
+
+
+def find_dishes(frame: Frame, detect_size: int = SCAN_DETECT_SIZE,
+                radius_frac: tuple = DISH_RADIUS_FRAC, min_support: float = MIN_DISH_SUPPORT) -> list:
+    """
+    在扫描图中找出所有培养皿（缩小图上检测，坐标换算回原图）
+
+    Returns:
+        [Dish]，按编号排序
+    """
+    w, h = frame.size
+    scale = min(1.0, detect_size / max(w, h))
+    small = frame.resized((max(1, round(w * scale)), max(1, round(h * scale))))
+    selected = select_dishes(dish_candidates(small.gray, radius_frac), min_support)
+
+    plates = [tuple(int(round(v / scale)) for v in c) for _, c in selected]
+    ids = grid_ids(plates)
+    dishes = [Dish(i, p, s) for i, p, (s, _) in zip(ids, plates, selected)]
+    return sorted(dishes, key=lambda d: (d.id[0], int(d.id[1:])))
+
+
+def dish_crop(frame: Frame, plate: tuple, margin: float = CROP_MARGIN) -> tuple:
+    """
+    皿的裁剪（父缓冲区的视图）
+
+    Returns:
+        (Frame, 裁剪图中的圆 (cx, cy, r))
+    """
+    cx, cy, r = plate
+    half = int(r * (1 + margin))
+    left, top = max(0, cx - half), max(0, cy - half)
+    crop = frame.crop((left, top, cx + half, cy + half))
+    return crop, (cx - left, cy - top, r)
+
+
+def scan_config(config: list, table: dict) -> list:
+    """
+    单皿流水线配置 -> 扫描拆分用：detect_plate 先在裁剪图上自动检测，
+    置信度不足时用扫描图上找到的圆（table）
+    """
+    if not any(name == "detect_plate" for name, _ in config):
+        raise ValueError("该版本没有 detect_plate 阶段，不能用于扫描拆分")
+    return [(name, {**params, "methods": ("auto", "table"), "table": table})
+            if name == "detect_plate" else (name, params) for name, params in config]
+
+
+def draw_dishes(frame: Frame, dishes: list, out_path: Path, max_size: int = 1600):
+    """检测结果叠加图：圆 + 编号"""
+    w, h = frame.size
+    scale = min(1.0, max_size / max(w, h))
+    canvas = np.ascontiguousarray(frame.resized((round(w * scale), round(h * scale))).rgb).copy()
+    for dish in dishes:
+        cx, cy, r = (int(round(v * scale)) for v in dish.plate)
+        cv2.circle(canvas, (cx, cy), r, (0, 200, 0), 3)
+        cv2.putText(canvas, dish.id, (cx - r // 4, cy), cv2.FONT_HERSHEY_SIMPLEX,
+                    max(0.6, r / 60), (255, 0, 0), 3)
+    save_jpeg(canvas, out_path, quality=85)
+
+
+def _run_dish(pipeline: PlaquePipeline, crop: Frame, name: str, output_dir: Path, meta) -> dict:
+    try:
+        return pipeline.run(crop, name, output_dir, meta=meta)
+    except SkipImage as e:
+        print(f"  {name} 警告: {e}")
+    except Exception as e:
+        print(f"  {name} 错误: {e}")
+    return None
+
+
+def run_scan(scan_path: Path, output_dir: Path = OUTPUT_DIR, variant: str = "quarter",
+             workers: int = None, expected: int = None, overlay: bool = False) -> list:
+    """
+    拆分一张扫描图并逐皿处理
+
+    expected: 预期皿数，找到的数目不同时给出警告
+    Returns:
+        [(Dish, 最终 state 或 None)]
+    """
+    scan_path, output_dir = Path(scan_path), Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    print(f"扫描图: {scan_path.name}")
+
+    meta = read_meta(scan_path)
+    with TRACER.span("decode", photo=scan_path.stem):
+        frame = Frame(load_rgb(scan_path, orientation=meta.orientation))
+    w, h = frame.size
+    with TRACER.span("find_dishes", photo=scan_path.stem):
+        dishes = find_dishes(frame)
+    print(f"  尺寸: {w}x{h}，找到 {len(dishes)} 个培养皿: {' '.join(d.id for d in dishes)}")
+    if expected is not None and len(dishes) != expected:
+        print(f"  警告: 预期 {expected} 个培养皿")
+    if overlay:
+        draw_dishes(frame, dishes, output_dir / f"{scan_path.stem}_检测.jpg")
+
+    names, crops, table = [], [], {}
+    for dish in dishes:
+        name = f"{scan_path.stem}_{dish.id}"
+        crop, local = dish_crop(frame, dish.plate)
+        names.append(name)
+        crops.append(crop)
+        table[name] = local
+    writer = ImageWriter(workers)
+    pipeline = PlaquePipeline.from_config(scan_config(VARIANTS[variant], table), writer=writer)
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(dishes) or 1))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        states = list(pool.map(lambda job: _run_dish(pipeline, *job, output_dir, meta),
+                               zip(crops, names)))
+
+    entries = []
+    for dish, state in zip(dishes, states):
+        if state is not None:
+            entries += [{**e, "dish": dish.id, "scan_plate": list(dish.plate)}
+                        for e in manifest_entries(state, variant)]
+    entries = finish_writes(writer, entries)
+    print(f"  完成: {sum(s is not None for s in states)}/{len(dishes)}")
+    print(f"  清单: {write_manifest(output_dir, entries)}")
+    return list(zip(dishes, states))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多培养皿扫描图拆分并逐皿处理")
+    parser.add_argument("scans", type=Path, nargs="+", help="扫描图")
+    parser.add_argument("--variant", default="quarter", choices=sorted(VARIANTS), help="单皿处理版本")
+    parser.add_argument("--out", type=Path, default=OUTPUT_DIR, help="输出目录")
+    parser.add_argument("--workers", type=int, default=None, help="并行线程数")
+    parser.add_argument("--expected", type=int, default=None, help="每张扫描图预期的皿数")
+    parser.add_argument("--overlay", action="store_true", help="保存检测叠加图")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"多培养皿扫描拆分（{args.variant}）")
+    print("=" * 60)
+    for scan in args.scans:
+        run_scan(scan, args.out, args.variant, args.workers, args.expected, args.overlay)
+        print()
+    TRACER.print_summary()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,675 @@
+#!/usr/bin/env python3
+"""
+斑块形态学统计 -> PPT大纲自动回填
+
+处理流程:
+1. 比例尺 - 在特写照片（*-5_原始.jpg）上测量：全盘照片上的斑块太小（R1 约 0.5mm 只有几个像素），
+   特写配准到同一培养皿的全盘照片得到 px/mm（closeup_scale，培养皿直径 90mm），
+   配准不可靠的特写（W1-5 斑块排列重复）不测量
+2. 测量 - 特写缩放到统一分辨率（MEASURE_PX_PER_MM），背景减图像后按菌苔噪声水平
+   找出斑块（残差超过 NOISE_K 倍噪声的为候选，峰值超过 PEAK_K 倍噪声的才算斑块，
+   菌苔纹理的起伏只有 4~6 倍），逐个斑块量：
+   - 直径：残差 ≥ 峰值一半的连通区域（半高宽），与边缘模糊、光照无关
+   - 晕环：半高边缘以外残差仍 ≥ HALO_LEVEL × 峰值的环带宽度，≥ HALO_MIN_MM 记为有晕环
+   - 浑浊度：斑块 / 菌苔亮度比
+   大图用 --tile 分块测量（见 plaque_tiles），结果与整图相同
+3. 缓存 - 每张特写按照片签名（特写 + 全盘）+ 测量参数缓存（Photos/缓存/），未变化的不重新测量
+4. 汇总 - 按培养皿（R3-5 -> R3）对所有斑块做一次向量化 group-by，得到直径 mean±SD、
+   平均浑浊度、晕环比例
+5. 验证 - 与手工测量（斑块手工测量.json，在特写放大图上手工量的直径和晕环，不参与任何参数设定）
+   比较：手工斑块的检出率、直径一致率、晕环一致率都达到 MIN_AGREEMENT 才算通过；
+   没有手工测量的培养皿不回填
+6. 回填 - 默认只打印 ppt_outline_*_v2.json 中 table 幻灯片 斑块直径 / 斑块特征 两列的差异；
+   --write 时只写回验证通过的噬菌体。浑浊度没有手工标注，"透明 / 浑浊" 保留原词
+
+用法:
+    python plaque_stats.py                  # 测量、验证并显示差异，不修改大纲
+    python plaque_stats.py --write          # 写回验证通过的噬菌体
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from closeup_scale import closeup_photos, closeup_scale, plate_in_closeup
+from photo_catalog import parse_name
+from plaque_pipeline import SkipImage, load_rgb
+from plaque_tiles import block, inner_of, map_tiles, tile_grid
+
+PROJECT_ROOT = Path(r"C:\Users\36094\Desktop\EcAZPhageDocumentation")
+PHOTOS_SUBDIR = Path("Experiments/Data/02_斑块形态学/Photos")
+HAND_MEASUREMENTS = Path("Experiments/Data/02_斑块形态学/斑块手工测量.json")
+OUTLINES = [
+    Path("PPT/20260126/ppt_outline_cn_v2.json"),
+    Path("PPT/20260126/ppt_outline_en_v2.json"),
+]
+# 测量缓存放在 Photos/缓存/（不提交，可随时删除）
+CACHE_SUBDIR = "缓存"
+CACHE_NAME = "plaque_measurements.json"
+
+# 特写统一缩放到 MEASURE_PX_PER_MM（特写原图约 90 px/mm）
+MEASURE_PX_PER_MM = 40.0
+MM_PER_PX = 1 / MEASURE_PX_PER_MM
+
+# 分割参数（px 均为 MEASURE_PX_PER_MM 下的像素）
+BACKGROUND_KERNEL = 201       # 菌苔背景估计的中值滤波核（px，奇数，约5mm，需大于最大斑块）
+LAWN_MIN_GRAY = 100           # 菌苔背景亮度下限，低于此值视为培养皿外
+INK_RATIO = 0.6               # 亮度低于菌苔的60%视为记号笔字迹（斑块只是略暗）
+INK_DILATE = 31               # 字迹向外排除的范围（px）
+LAWN_ERODE = 15               # 菌苔区域向内收缩（px），避开培养皿边缘、照片边缘
+RIM_EXCLUDE = 0.95            # 只统计培养皿半径95%以内
+DETECT_SIGMA = 3.0            # 找斑块用的平滑 σ（px），抑制菌苔颗粒
+EDGE_SIGMA = 1.5              # 量直径 / 晕环用的平滑 σ（px）
+NOISE_K = 4.0                 # 候选阈值 = 菌苔残差中位数 + NOISE_K × σ（σ 由 MAD 换算）
+PEAK_K = 8.0                  # 候选内残差最大值 ≥ 中位数 + PEAK_K × σ 才算斑块
+RESIDUAL_STEP = 0.25          # 残差直方图的分辨率（灰度），整图与分块用同一个直方图求阈值
+RESIDUAL_BINS = 2048          # 覆盖 ±256 灰度
+HALF_MAX = 0.5                # 直径取残差 ≥ 峰值 × HALF_MAX 的区域
+PEAK_PERCENTILE = 90          # 峰值 = 斑块内残差的第90百分位（比最大值稳定）
+MIN_PLAQUE_MM = 0.25          # 最小斑块直径
+MAX_PLAQUE_MM = 4.0           # 最大斑块（种子外接框），更大的是连成片的斑块或污渍
+MAX_PLAQUE_PX = int(MAX_PLAQUE_MM * MEASURE_PX_PER_MM)
+MIN_FILL = 0.5                # 面积 / 外接框面积，排除划痕等细长区域
+MAX_ASPECT = 2.0              # 外接框长宽比上限
+HALO_LEVEL = 0.2              # 晕环：半高边缘外残差仍 ≥ 峰值 × HALO_LEVEL 的环带
+HALO_MAX_MM = 0.5             # 晕环最远量到边缘外 0.5mm
+HALO_MAX_PX = int(HALO_MAX_MM * MEASURE_PX_PER_MM)
+# 环带宽度 ≥ 此值记为有晕环；没有晕环的斑块边缘模糊（对焦、缩放）也有约 0.05~0.08mm 的过渡
+HALO_MIN_MM = 0.15
+
+# 默认分类阈值（format_features 不给阈值时使用）
+TURBID_THRESHOLD = 0.9        # 斑块/菌苔亮度比 ≥ 此值视为浑浊
+HALO_MAJORITY = 0.5           # 超过一半斑块有晕环则记为"有晕环"
+# 回填用的阈值：浑浊度没有手工标注可验证，保留原词
+VALIDATED_THRESHOLDS = {"turbidity": None, "halo_fraction": HALO_MAJORITY}
+
+# 与手工测量比较：手工斑块中心 d/2 以内最近的自动斑块算检出；
+# 直径差 ≤ max(DIAMETER_TOLERANCE_MM, DIAMETER_TOLERANCE × 手工直径) 算一致
+MIN_HAND = 5
+MIN_AGREEMENT = 0.8
+DIAMETER_TOLERANCE_MM = 0.1
+DIAMETER_TOLERANCE = 0.15
+
+# 斑块特征列中的词汇（按语言）
+FEATURE_TERMS = {
+    "cn": {"sep": "，", "clear": "透明", "turbid": "**浑浊**", "halo": "有晕环", "no_halo": "无晕环"},
+    "en": {"sep": ", ", "clear": "clear", "turbid": "**turbid**", "halo": "halo+", "no_halo": "no halo"},
+}
+DIAMETER_HEADERS = ("斑块直径", "直径", "Plaque Size", "Diameter")
+FEATURE_HEADERS = ("斑块特征", "Plaque Features")
+
+PLAQUE_FIELDS = ("diameter_mm", "turbidity", "halo_mm", "x", "y")
+
+
+def file_signature(path: Path) -> str:
+    """文件签名（大小+修改时间），用于判断是否需要重新测量"""
+    stat = path.stat()
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def measure_params() -> dict:
+    """影响测量结果的参数（写入缓存，变了就重新测量）"""
+    return {"px_per_mm": MEASURE_PX_PER_MM, "kernel": BACKGROUND_KERNEL, "lawn": [LAWN_MIN_GRAY, LAWN_ERODE],
+            "ink": [INK_RATIO, INK_DILATE], "rim": RIM_EXCLUDE, "sigma": [DETECT_SIGMA, EDGE_SIGMA],
+            "noise": [NOISE_K, PEAK_K, RESIDUAL_STEP], "half_max": [HALF_MAX, PEAK_PERCENTILE],
+            "size": [MIN_PLAQUE_MM, MAX_PLAQUE_MM], "shape": [MIN_FILL, MAX_ASPECT],
+            "halo": [HALO_LEVEL, HALO_MAX_MM]}
+
+
+def plate_mask(shape: tuple, plate: tuple, rim: float = RIM_EXCLUDE, box: tuple = None) -> np.ndarray:
+    """培养皿内（半径 rim 倍以内）的区域；box 给出时只生成框内部分"""
+    cx, cy, r = plate
+    left, top, right, bottom = box or (0, 0, shape[1], shape[0])
+    y, x = np.ogrid[top:bottom, left:right]
+    return (x - cx) ** 2 + (y - cy) ** 2 <= (r * rim) ** 2
+
+
+def empty_result() -> dict:
+    return {field: np.empty(0) for field in PLAQUE_FIELDS}
+
+
+def lawn_residual(gray: np.ndarray, region: np.ndarray) -> tuple:
+    """
+    菌苔背景、菌苔区域、背景减图像的残差（斑块为正）
+
+    斑块（透明区）在暗背景下比菌苔暗，用大核中值滤波估计菌苔背景；
+    培养皿外的暗背景通过背景亮度排除，记号笔字迹（远暗于菌苔）连同周围一圈排除。
+
+    Returns:
+        (background float32, region bool, detect 残差, edge 残差)：
+        detect 用 DETECT_SIGMA 平滑（找斑块），edge 用 EDGE_SIGMA 平滑（量直径、晕环）
+    """
+    background = cv2.medianBlur(gray, BACKGROUND_KERNEL).astype(np.float32)
+    ink = (gray < background * INK_RATIO).astype(np.uint8)
+    ink = cv2.dilate(ink, np.ones((INK_DILATE, INK_DILATE), np.uint8))
+    lawn = ((background > LAWN_MIN_GRAY) & region & (ink == 0)).astype(np.uint8)
+    lawn = cv2.erode(lawn, np.ones((LAWN_ERODE, LAWN_ERODE), np.uint8))
+
+    gray = gray.astype(np.float32)
+    detect = background - cv2.GaussianBlur(gray, (0, 0), DETECT_SIGMA)
+    edge = background - cv2.GaussianBlur(gray, (0, 0), EDGE_SIGMA)
+    return background, lawn > 0, detect, edge
+
+
+def residual_histogram(detect: np.ndarray, region: np.ndarray) -> np.ndarray:
+    """菌苔区域内残差的直方图（RESIDUAL_STEP 一格，中间一格为 0）"""
+    bins = np.floor(detect[region] / RESIDUAL_STEP).astype(np.int64) + RESIDUAL_BINS // 2
+    return np.bincount(np.clip(bins, 0, RESIDUAL_BINS - 1), minlength=RESIDUAL_BINS)
+
+
+def noise_level(hist: np.ndarray) -> tuple:
+    """
+    直方图 -> (中位数, σ = 1.4826 × MAD)
+
+    斑块只占菌苔的一小部分，中位数和 MAD 反映的是菌苔本身的纹理噪声；
+    斑块稀少时 Otsu 会把阈值压到噪声里（R1、W2 特写上只有 2 灰度）
+    """
+    centers = (np.arange(RESIDUAL_BINS) - RESIDUAL_BINS // 2 + 0.5) * RESIDUAL_STEP
+    cumulative = np.cumsum(hist)
+    median = centers[np.searchsorted(cumulative, cumulative[-1] / 2)]
+    deviation = np.abs(centers - median)
+    order = np.argsort(deviation, kind="stable")
+    cumulative = np.cumsum(hist[order])
+    mad = deviation[order][np.searchsorted(cumulative, cumulative[-1] / 2)]
+    return float(median), float(1.4826 * mad)
+
+
+def measure_plaque(seeds: np.ndarray, labels: np.ndarray, label: int, bbox: tuple, gray: np.ndarray,
+                   background: np.ndarray, region: np.ndarray, edge: np.ndarray) -> dict:
+    """
+    量一个斑块（种子 label，外接框 bbox = (left, top, width, height)）
+
+    只在斑块周围的窗口内计算：窗口 = 外接框向外扩 max(w, h)/2 + HALO_MAX_PX。
+    直径 = 残差 ≥ 峰值 × HALF_MAX 且包含种子的连通区域的等面积圆直径；
+    晕环宽度 = 半高边缘往外，按距离平均的残差第一次低于峰值 × HALO_LEVEL 的距离（其他斑块除外）
+
+    Returns:
+        dict: diameter_mm, turbidity, halo_mm, x, y（x, y 为斑块中心，本图坐标）；
+        斑块被窗口、菌苔区域截断或形状不像斑块时返回 None
+    """
+    left, top, w, h = bbox
+    pad = max(w, h) // 2 + HALO_MAX_PX + 2
+    height, width = labels.shape
+    x0, y0 = max(0, left - pad), max(0, top - pad)
+    x1, y1 = min(width, left + w + pad), min(height, top + h + pad)
+    window = (slice(y0, y1), slice(x0, x1))
+    own = labels[window] == label
+    residual = edge[window]
+    lawn = region[window]
+
+    peak = float(np.percentile(residual[own], PEAK_PERCENTILE))
+    if peak <= 0:
+        return None
+    core = ((residual >= HALF_MAX * peak) & lawn).astype(np.uint8)
+    _, core_labels = cv2.connectedComponents(core)
+    ids = np.unique(core_labels[own & (core > 0)])
+    plaque = np.isin(core_labels, ids[ids > 0])
+    if not plaque.any():
+        return None
+
+    # 截断：碰到窗口边缘或菌苔区域外（照片边缘、培养皿边缘、字迹）
+    ys, xs = np.nonzero(plaque)
+    if xs.min() == 0 or ys.min() == 0 or xs.max() == plaque.shape[1] - 1 or ys.max() == plaque.shape[0] - 1:
+        return None
+    grown = cv2.dilate(plaque.astype(np.uint8), np.ones((3, 3), np.uint8)) > 0
+    if (grown & ~lawn).any():
+        return None
+    pw, ph = xs.max() - xs.min() + 1, ys.max() - ys.min() + 1
+    area = len(xs)
+    if area / (pw * ph) < MIN_FILL or max(pw, ph) / min(pw, ph) > MAX_ASPECT:
+        return None
+
+    # 晕环：半高边缘外按距离（1px 一圈）平均残差
+    distance = cv2.distanceTransform((~plaque).astype(np.uint8), cv2.DIST_L2, 5)
+    others = (seeds[window] > 0) & ~own
+    ring = lawn & ~others & (distance > 0) & (distance <= HALO_MAX_PX)
+    rings = np.minimum(distance[ring].astype(np.int64), HALO_MAX_PX)
+    profile = (np.bincount(rings, weights=residual[ring], minlength=HALO_MAX_PX + 1)
+               / np.maximum(np.bincount(rings, minlength=HALO_MAX_PX + 1), 1))
+    below = np.nonzero(profile[1:] < HALO_LEVEL * peak)[0]
+    ring_px = below[0] if len(below) else HALO_MAX_PX
+
+    return {
+        "diameter_mm": 2 * np.sqrt(area / np.pi) * MM_PER_PX,
+        "turbidity": float(gray[window][plaque].mean() / max(background[window][plaque].mean(), 1)),
+        "halo_mm": ring_px * MM_PER_PX,
+        "x": float(xs.mean() + x0),
+        "y": float(ys.mean() + y0),
+    }
+
+
+# 分块的重叠边：归本块的斑块（种子外接框左上角在块内，边长 ≤ MAX_PLAQUE_PX）的测量窗口
+# 向外延伸 1.5 × MAX_PLAQUE_PX + HALO_MAX_PX，窗口内每个像素的背景还需要中值滤波半径、
+# 字迹外扩、菌苔收缩、平滑半径（4σ）和种子开运算
+SEGMENT_HALO = (MAX_PLAQUE_PX + MAX_PLAQUE_PX // 2 + HALO_MAX_PX + 2 + BACKGROUND_KERNEL // 2
+                + INK_DILATE // 2 + LAWN_ERODE // 2 + int(4 * DETECT_SIGMA) + 1)
+
+
+def measure_plaques(img_array: np.ndarray, plate: tuple, tile: int = None, workers: int = None) -> dict:
+    """
+    分割并测量一张图（MEASURE_PX_PER_MM 分辨率）中的所有斑块
+
+    plate: 图中培养皿 (cx, cy, r)，只统计皿内
+    tile: 分块边长（大图、内存映射输入），None 时整图一块；分块结果与整图相同：
+    第一遍累加各块菌苔区域的残差直方图 -> 整图噪声水平；第二遍各块找种子、逐个测量，
+    斑块归种子外接框左上角所在的块，跨块的斑块只统计一次。内存由块大小 × 线程数决定
+
+    Returns:
+        dict: PLAQUE_FIELDS 各一个等长数组（每个斑块一项）
+    """
+    shape = img_array.shape[:2]
+    tiles = tile_grid(shape, tile or max(shape), SEGMENT_HALO)
+
+    def prepare(t) -> tuple:
+        rgb = np.ascontiguousarray(block(img_array, t.outer))
+        gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY) if rgb.ndim == 3 else rgb
+        return (gray,) + lawn_residual(gray, plate_mask(shape, plate, box=t.outer))
+
+    def histogram(t) -> np.ndarray:
+        _, _, region, detect, _ = prepare(t)
+        return residual_histogram(inner_of(detect, t), inner_of(region, t))
+
+    hist = sum(h for _, h in map_tiles(histogram, tiles, workers))
+    if not hist.any():
+        return empty_result()
+    median, sigma = noise_level(hist)
+    threshold, min_peak = median + NOISE_K * sigma, median + PEAK_K * sigma
+
+    def segment(t) -> list:
+        gray, background, region, detect, edge = prepare(t)
+        seeds = ((detect > threshold) & region).astype(np.uint8)
+        seeds = cv2.morphologyEx(seeds, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+        n_labels, labels, stats, _ = cv2.connectedComponentsWithStats(seeds, connectivity=8)
+        plaques = []
+        for label in range(1, n_labels):
+            left, top, w, h, _ = stats[label]
+            x, y = left + t.outer[0], top + t.outer[1]
+            if not (t.inner[0] <= x < t.inner[2] and t.inner[1] <= y < t.inner[3]):
+                continue
+            if max(w, h) > MAX_PLAQUE_PX:
+                continue
+            box = (slice(top, top + h), slice(left, left + w))
+            if detect[box][labels[box] == label].max() < min_peak:
+                continue
+            plaque = measure_plaque(seeds, labels, label, (left, top, w, h), gray, background, region, edge)
+            if plaque is not None and plaque["diameter_mm"] >= MIN_PLAQUE_MM:
+                plaque["x"] += t.outer[0]
+                plaque["y"] += t.outer[1]
+                plaques.append(plaque)
+        return plaques
+
+    plaques = [p for _, part in map_tiles(segment, tiles, workers) for p in part]
+    if not plaques:
+        return empty_result()
+    return {field: np.array([p[field] for p in plaques]) for field in PLAQUE_FIELDS}
+
+
+def standardize(image: np.ndarray, px_per_mm: float) -> tuple:
+    """特写缩放到 MEASURE_PX_PER_MM，返回 (图像, 缩放比例)"""
+    zoom = MEASURE_PX_PER_MM / px_per_mm
+    size = (max(1, round(image.shape[1] * zoom)), max(1, round(image.shape[0] * zoom)))
+    interp = cv2.INTER_AREA if zoom < 1 else cv2.INTER_LANCZOS4
+    return cv2.resize(np.ascontiguousarray(image), size, interpolation=interp), zoom
+
+
+def load_cache(cache_path: Path) -> dict:
+    if cache_path.exists():
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def measure_closeup(closeup: Path, parent: Path, tile: int = None) -> dict:
+    """
+    配准并测量一张特写
+
+    Returns:
+        缓存条目：registration（全盘照片、比例、位置、px/mm、匹配分数）+ 各斑块的
+        PLAQUE_FIELDS（x, y 换回特写原图坐标）
+    Raises:
+        SkipImage: 配准不可用
+    """
+    scale = closeup_scale(closeup, parent)
+    standard, zoom = standardize(load_rgb(closeup), scale.px_per_mm)
+    result = measure_plaques(standard, plate_in_closeup(scale, zoom), tile=tile)
+    result["x"], result["y"] = result["x"] / zoom, result["y"] / zoom
+    return {
+        "registration": {"parent": scale.parent, "plate": [int(v) for v in scale.plate],
+                         "scale": round(scale.scale, 5), "offset": [round(v, 1) for v in scale.offset],
+                         "px_per_mm": round(scale.px_per_mm, 2), "score": round(scale.score, 3),
+                         "elsewhere": round(scale.elsewhere, 3)},
+        **{field: np.asarray(result[field]).round(4).tolist() for field in PLAQUE_FIELDS},
+    }
+
+
+def collect_measurements(photos_dir: Path, cache_path: Path, tile: int = None) -> dict:
+    """
+    测量所有特写，按照片签名 + 测量参数增量更新缓存（配准失败的也缓存，不反复尝试）
+    tile: 分块测量的块边长（大图用），结果与整图测量相同
+
+    Returns:
+        {特写名: 缓存条目}，配准失败的条目带 skip（原因）
+    """
+    cache = load_cache(cache_path)
+    params = measure_params()
+    updated = {}
+
+    for closeup, parent in closeup_photos(photos_dir):
+        info = parse_name(closeup.stem)
+        name = info["name"]
+        signature = [file_signature(closeup), file_signature(parent) if parent else None]
+        entry = cache.get(name)
+        if entry is None or entry["signature"] != signature or entry.get("params") != params:
+            print(f"测量: {closeup.name}")
+            entry = {"signature": signature, "params": params, "phage": info["phage"],
+                     "plate": name.rsplit("-", 1)[0]}
+            try:
+                entry.update(measure_closeup(closeup, parent, tile))
+            except SkipImage as e:
+                print(f"  跳过: {e}")
+                entry["skip"] = str(e)
+        else:
+            print(f"未变化: {closeup.name}")
+        updated[name] = entry
+
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump(updated, f, ensure_ascii=False, indent=1)
+    return updated
+
+
+def plaque_table(entries: dict) -> dict:
+    """
+    缓存条目 -> 所有斑块拼接成的数组
+
+    Returns:
+        dict: plate（培养皿，如 R3、W1-1）, diameter_mm, turbidity, halo（bool）
+    """
+    entries = [e for e in entries.values() if "skip" not in e]
+    return {
+        "plate": np.array([e["plate"] for e in entries for _ in e["diameter_mm"]], dtype=str),
+        "diameter_mm": np.concatenate([e["diameter_mm"] for e in entries] or [[]]).astype(np.float64),
+        "turbidity": np.concatenate([e["turbidity"] for e in entries] or [[]]).astype(np.float64),
+        "halo": np.concatenate([e["halo_mm"] for e in entries] or [[]]).astype(np.float64) >= HALO_MIN_MM,
+    }
+
+
+def summarize(phage, diameter_mm, turbidity, halo) -> dict:
+    """
+    按噬菌体汇总（一次向量化 group-by）
+
+    Returns:
+        dict: phage -> {n, diameter_mean, diameter_sd, turbidity, halo_fraction}
+    """
+    phage = np.asarray(phage)
+    if phage.size == 0:
+        return {}
+    groups, inverse = np.unique(phage, return_inverse=True)
+    n = np.bincount(inverse).astype(np.float64)
+    d = np.asarray(diameter_mm, dtype=np.float64)
+
+    mean = np.bincount(inverse, weights=d) / n
+    sq = np.bincount(inverse, weights=d * d)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        var = np.where(n > 1, (sq - n * mean ** 2) / (n - 1), 0.0)
+    sd = np.sqrt(np.maximum(var, 0.0))
+    turb = np.bincount(inverse, weights=np.asarray(turbidity, dtype=np.float64)) / n
+    halo_frac = np.bincount(inverse, weights=np.asarray(halo, dtype=np.float64)) / n
+
+    return {
+        str(g): {
+            "n": int(n[i]),
+            "diameter_mean": float(mean[i]),
+            "diameter_sd": float(sd[i]),
+            "turbidity": float(turb[i]),
+            "halo_fraction": float(halo_frac[i]),
+        }
+        for i, g in enumerate(groups)
+    }
+
+
+def format_diameter(mean: float, sd: float) -> str:
+    """直径文本：1.8±0.3 mm；小于1mm时保留两位小数"""
+    digits = 1 if mean >= 1 else 2
+    return f"{mean:.{digits}f}±{sd:.{digits}f} mm"
+
+
+def default_thresholds() -> dict:
+    return {"turbidity": TURBID_THRESHOLD, "halo_fraction": HALO_MAJORITY}
+
+
+def load_hand(path: Path) -> dict:
+    """手工测量 {特写名: [{"line": [x1, y1, x2, y2], "halo": bool}]}（"_" 开头的键是说明）"""
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return {k: v for k, v in json.load(f).items() if not k.startswith("_")}
+
+
+def validate(entry: dict, hand: list) -> dict:
+    """
+    一张特写的自动测量与手工测量比较
+
+    每个手工斑块取中心 d/2 以内最近的自动斑块；直径按配准得到的 px/mm 换算成 mm，
+    没检出的手工斑块算直径、晕环都不一致。
+
+    Returns:
+        dict: n, found（检出率）, diameter（直径一致率）, halo（晕环一致率）,
+        hand_mm / auto_mm（直径中位数，自动只取配对上的斑块）, passed
+    """
+    lines = np.array([p["line"] for p in hand], dtype=np.float64)
+    hand_halo = np.array([bool(p.get("halo", False)) for p in hand])
+    centers = (lines[:, :2] + lines[:, 2:]) / 2
+    hand_px = np.hypot(lines[:, 2] - lines[:, 0], lines[:, 3] - lines[:, 1])
+    hand_mm = hand_px / entry["registration"]["px_per_mm"]
+
+    auto_xy = np.column_stack([entry["x"], entry["y"]]) if entry["x"] else np.empty((0, 2))
+    auto_mm = np.asarray(entry["diameter_mm"])
+    auto_halo = np.asarray(entry["halo_mm"]) >= HALO_MIN_MM
+    if len(auto_xy):
+        distance = np.hypot(centers[:, None, 0] - auto_xy[None, :, 0], centers[:, None, 1] - auto_xy[None, :, 1])
+        nearest = distance.argmin(axis=1)
+        found = distance[np.arange(len(hand)), nearest] <= hand_px / 2
+    else:
+        nearest = np.zeros(len(hand), dtype=np.int64)
+        found = np.zeros(len(hand), dtype=bool)
+
+    matched = nearest[found]
+    tolerance = np.maximum(DIAMETER_TOLERANCE_MM, DIAMETER_TOLERANCE * hand_mm[found])
+    diameter_ok = np.abs(auto_mm[matched] - hand_mm[found]) <= tolerance
+    halo_ok = auto_halo[matched] == hand_halo[found]
+    result = {
+        "n": len(hand),
+        "found": float(found.mean()),
+        "diameter": float(diameter_ok.sum() / len(hand)),
+        "halo": float(halo_ok.sum() / len(hand)),
+        "hand_mm": float(np.median(hand_mm)),
+        "auto_mm": float(np.median(auto_mm[matched])) if found.any() else float("nan"),
+    }
+    result["passed"] = (len(hand) >= MIN_HAND
+                        and min(result["found"], result["diameter"], result["halo"]) >= MIN_AGREEMENT)
+    return result
+
+
+def validated_plates(entries: dict, hand: dict) -> tuple:
+    """
+    验证所有特写，返回 (通过验证的培养皿集合, {特写名: validate 结果})
+
+    一个培养皿的所有已测量特写都有手工测量且都通过，才算通过
+    """
+    results = {name: validate(entry, hand[name]) for name, entry in entries.items()
+               if "skip" not in entry and name in hand}
+    plates = {}
+    for name, entry in entries.items():
+        if "skip" not in entry:
+            plates.setdefault(entry["plate"], []).append(name in results and results[name]["passed"])
+    return {plate for plate, passed in plates.items() if all(passed)}, results
+
+
+def format_features(existing: str, stats: dict, lang: str, thresholds: dict = None) -> str:
+    """
+    更新斑块特征文本：只替换清晰度和晕环两个词，保留手写的其他描述
+    例: '极小，透明，有晕环' -> '极小，透明，无晕环'
+    thresholds: 分类阈值，None 时用默认值；其中某项为 None 时该词保持原样
+    """
+    thresholds = thresholds or default_thresholds()
+    terms = FEATURE_TERMS[lang]
+    clarity = halo = None
+    if thresholds["turbidity"] is not None:
+        clarity = terms["turbid"] if stats["turbidity"] >= thresholds["turbidity"] else terms["clear"]
+    if thresholds["halo_fraction"] is not None:
+        halo = terms["halo"] if stats["halo_fraction"] > thresholds["halo_fraction"] else terms["no_halo"]
+
+    clarity_words = {terms["clear"].strip("*").lower(), terms["turbid"].strip("*").lower()}
+    halo_words = {terms["halo"].lower(), terms["no_halo"].lower()}
+
+    tokens = [t for t in existing.split(terms["sep"].strip()) if t.strip()] if existing else []
+    tokens = [t.strip() for t in tokens]
+    result = []
+    placed_clarity = placed_halo = False
+    for i, token in enumerate(tokens):
+        key = token.strip("*").lower()
+        if key in clarity_words:
+            new = clarity
+            placed_clarity = True
+        elif key in halo_words:
+            new = halo
+            placed_halo = True
+        else:
+            result.append(token)
+            continue
+        if new is None:
+            result.append(token)
+            continue
+        # 原词首字母大写（英文句首）时保持大写
+        if i == 0 and token.strip("*")[:1].isupper():
+            plain = new.strip("*")
+            new = new.replace(plain, plain[:1].upper() + plain[1:])
+        result.append(new)
+    if not placed_clarity and clarity is not None:
+        result.append(clarity)
+    if not placed_halo and halo is not None:
+        result.append(halo)
+    return terms["sep"].join(result)
+
+
+def update_outline(outline_path: Path, summary: dict, thresholds: dict = None, write: bool = False) -> list:
+    """
+    回填大纲中 table 幻灯片的直径和特征列（write=False 时只比较，不写文件）
+    只替换改动的行文本，保持大纲原有的JSON排版（行内数组等）
+
+    Returns:
+        [(噬菌体, 列名, 原文本, 新文本)]：有变化的单元格
+    """
+    with open(outline_path, "r", encoding="utf-8") as f:
+        raw = f.read()
+    outline = json.loads(raw)
+
+    lang = "en" if "_en" in outline_path.stem else "cn"
+    changes = []
+    reformat = False
+
+    for slide in outline.get("slides", []):
+        if slide.get("type") != "table":
+            continue
+        headers = slide.get("headers", [])
+        d_col = next((i for i, h in enumerate(headers) if h in DIAMETER_HEADERS), None)
+        f_col = next((i for i, h in enumerate(headers) if h in FEATURE_HEADERS), None)
+        if d_col is None and f_col is None:
+            continue
+
+        for row in slide.get("rows", []):
+            phage = str(row[0]).replace("**", "").strip()
+            if phage not in summary:
+                continue
+            stats = summary[phage]
+            new_row = list(row)
+            if d_col is not None:
+                new_row[d_col] = format_diameter(stats["diameter_mean"], stats["diameter_sd"])
+            if f_col is not None:
+                new_row[f_col] = format_features(row[f_col], stats, lang, thresholds)
+            if new_row == row:
+                continue
+            changes += [(phage, headers[i], old, new)
+                        for i, (old, new) in enumerate(zip(row, new_row)) if old != new]
+
+            old_text = json.dumps(row, ensure_ascii=False)
+            if old_text in raw:
+                raw = raw.replace(old_text, json.dumps(new_row, ensure_ascii=False), 1)
+            else:
+                reformat = True
+            row[:] = new_row
+
+    if reformat:
+        raw = json.dumps(outline, ensure_ascii=False, indent=2) + "\n"
+    if changes and write:
+        with open(outline_path, "w", encoding="utf-8") as f:
+            f.write(raw)
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="斑块形态学统计并回填PPT大纲（默认只显示差异）")
+    parser.add_argument("--root", type=Path, default=PROJECT_ROOT, help="项目根目录")
+    parser.add_argument("--tile", type=int, default=None, help="分块测量的块边长（px），大图时使用")
+    parser.add_argument("--write", action="store_true", help="写回通过手工测量验证的噬菌体")
+    args = parser.parse_args()
+
+    photos_dir = args.root / PHOTOS_SUBDIR
+    print("=" * 60)
+    print("斑块形态学统计（特写照片）")
+    print(f"测量分辨率: {MEASURE_PX_PER_MM:g} px/mm，最小斑块 {MIN_PLAQUE_MM} mm，晕环 ≥ {HALO_MIN_MM} mm")
+    print("=" * 60)
+
+    entries = collect_measurements(photos_dir, photos_dir / CACHE_SUBDIR / CACHE_NAME, args.tile)
+    data = plaque_table(entries)
+    summary = summarize(data["plate"], data["diameter_mm"], data["turbidity"], data["halo"])
+
+    print(f"\n{'特写':<8}{'px/mm':>7}{'斑块数':>6}{'直径 (mm)':>16}{'浑浊度':>8}{'晕环比例':>10}")
+    print("-" * 57)
+    for name, entry in entries.items():
+        if "skip" in entry:
+            print(f"{name:<8}跳过: {entry['skip']}")
+            continue
+        s = summary.get(entry["plate"], {"n": 0})
+        line = f"{name:<8}{entry['registration']['px_per_mm']:>7.1f}{s['n']:>6}"
+        if s["n"]:
+            line += (f"{format_diameter(s['diameter_mean'], s['diameter_sd']):>16}"
+                     f"{s['turbidity']:>8.2f}{s['halo_fraction']:>10.0%}")
+        print(line)
+
+    hand = load_hand(args.root / HAND_MEASUREMENTS)
+    passed, results = validated_plates(entries, hand)
+    print(f"\n手工测量验证（{HAND_MEASUREMENTS.name}：检出、直径一致、晕环一致均 ≥ {MIN_AGREEMENT:.0%}）")
+    for name, r in results.items():
+        mark = "✓" if r["passed"] else "✗"
+        print(f"  {mark} {name}: {r['n']} 个斑块，检出 {r['found']:.0%}，直径一致 {r['diameter']:.0%}"
+              f"（中位数 手工 {r['hand_mm']:.2f} / 自动 {r['auto_mm']:.2f} mm），晕环一致 {r['halo']:.0%}")
+    unvalidated = sorted(p for p in summary if p not in passed)
+    if unvalidated:
+        print(f"未通过验证或没有手工测量（不回填）: {', '.join(unvalidated)}")
+    writable = {p: s for p, s in summary.items() if p in passed}
+
+    print()
+    for outline in OUTLINES:
+        path = args.root / outline
+        if not path.exists():
+            continue
+        changes = update_outline(path, writable, VALIDATED_THRESHOLDS, write=args.write)
+        print(f"{outline.name}: {len(changes)} 处{'已写回' if args.write else '差异'}")
+        for phage, header, old, new in changes:
+            print(f"  {phage} {header}: {old} -> {new}")
+
+    if not args.write:
+        print("\n预览模式，未修改大纲（--write 写回验证通过的噬菌体）")
+    elif not writable:
+        print("\n✗ 没有通过验证的噬菌体，未写回大纲")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+大图分块处理（平板扫描等超大图像）
+
+整图一次处理时，增强的每一步都会生成整图大小的临时数组（W2 4284x5712 一帧就 73 MB）。
+分块模式把图像切成带重叠边（halo）的块，逐块处理后只写回块的内部区域：
+
+1. 切块 - tile_grid：内部区域互不重叠、拼起来正好是整图，外部区域 = 内部 + halo
+2. 逐块 - map_tiles：线程池处理（OpenCV 运算释放 GIL），同时在处理中的块数有上限，
+   峰值内存由块大小 × 线程数决定，与图像大小无关
+3. 拼接 - 结果写回内部区域；输入输出都可以是 .npy 内存映射，整图不必进内存
+
+需要整图统计量的步骤先扫一遍：增强的灰度均值、斑块分割的菌苔噪声水平（见 plaque_stats）。
+halo 覆盖所有邻域运算的半径，分块结果与整图处理逐像素一致。
+
+用法:
+    python plaque_tiles.py 扫描.npy --out 扫描_增强.npy
+    python plaque_tiles.py 扫描.jpg --out 扫描_增强.jpg --tile 2048 --workers 4
+"""
+
+import argparse
+import os
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from plaque_pipeline import enhance_array, gray_sum, load_rgb, save_jpeg
+
+TILE_SIZE = 1024
+# 增强的邻域半径：锐度 3x3 平滑 1px + USM 模糊（PIL 三次盒式滤波，半径 1.375 -> 每次 2px）6px
+ENHANCE_HALO = 8
+
+# inner: 本块负责写回的区域；outer: 读取的区域（inner + halo，限制在图内）
+Tile = namedtuple("Tile", ["inner", "outer"])
+
+
+def tile_grid(shape: tuple, tile: int = TILE_SIZE, halo: int = 0) -> list:
+    """按 tile 边长切块，返回 [Tile]，框均为 (left, top, right, bottom)"""
+    h, w = shape[:2]
+    tiles = []
+    for top in range(0, h, tile):
+        for left in range(0, w, tile):
+            right, bottom = min(left + tile, w), min(top + tile, h)
+            outer = (max(0, left - halo), max(0, top - halo), min(w, right + halo), min(h, bottom + halo))
+            tiles.append(Tile((left, top, right, bottom), outer))
+    return tiles
+
+
+def block(image: np.ndarray, box: tuple) -> np.ndarray:
+    """框内区域（视图；内存映射输入只读这一块）"""
+    left, top, right, bottom = box
+    return image[top:bottom, left:right]
+
+
+def inner_of(result: np.ndarray, t: Tile) -> np.ndarray:
+    """外部区域上的结果 -> 内部区域部分"""
+    left, top = t.inner[0] - t.outer[0], t.inner[1] - t.outer[1]
+    return result[top:top + t.inner[3] - t.inner[1], left:left + t.inner[2] - t.inner[0]]
+
+
+def map_tiles(fn, tiles: list, workers: int = None):
+    """
+    并行处理各块，按 tiles 顺序逐个产出 (Tile, fn(Tile))
+
+    同时提交的块最多 2 × workers 个，结果被消费后才提交新块，内存不随块数增长。
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tiles)))
+    if workers == 1:
+        for t in tiles:
+            yield t, fn(t)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for t in tiles:
+            pending.append((t, pool.submit(fn, t)))
+            if len(pending) >= 2 * workers:
+                done, future = pending.popleft()
+                yield done, future.result()
+        while pending:
+            done, future = pending.popleft()
+            yield done, future.result()
+
+
+def open_output(path: Path, shape: tuple) -> np.ndarray:
+    """输出 .npy（内存映射，写入的块直接落盘）"""
+    return np.lib.format.open_memmap(str(path), mode="w+", dtype=np.uint8, shape=tuple(shape))
+
+
+def open_image(path: Path) -> np.ndarray:
+    """.npy 以只读内存映射打开（按块读取），其他格式整图解码"""
+    if Path(path).suffix.lower() == ".npy":
+        return np.load(path, mmap_mode="r")
+    return load_rgb(path)
+
+
+def tiled_gray_mean(image: np.ndarray, tile: int = TILE_SIZE, workers: int = None) -> int:
+    """整图灰度均值（逐块求和），与 enhance_array 中的取整一致"""
+    total = sum(s for _, s in map_tiles(lambda t: gray_sum(block(image, t.inner)),
+                                         tile_grid(image.shape, tile), workers))
+    return int(total / (image.shape[0] * image.shape[1]) + 0.5)
+
+
+def sector_block(box: tuple, size: int) -> np.ndarray:
+    """1/4扇形mask（同 quarter_mask，左上角 size 正方形内）在框内的部分，只生成这一块"""
+    left, top, right, bottom = box
+    y, x = np.ogrid[top:bottom, left:right]
+    return ((x ** 2 + (y - size) ** 2) <= size ** 2) & (x < size) & (y < size)
+
+
+def apply_sector(result: np.ndarray, box: tuple, size: int) -> np.ndarray:
+    """框内扇形外的像素置黑（原地）"""
+    result[~sector_block(box, size)] = 0
+    return result
+
+
+def enhance_tiled(image: np.ndarray, out: np.ndarray = None, tile: int = TILE_SIZE,
+                  workers: int = None, sector: bool = False) -> np.ndarray:
+    """
+    分块增强，结果与 enhance_array(image) 一致
+
+    out: 输出数组（如 open_output 的内存映射），None 时新建
+    sector: 同一遍里再做 sector_mask（扇形外纯黑）
+    """
+    mean = tiled_gray_mean(image, tile, workers)
+    size = min(image.shape[:2])
+    if out is None:
+        out = np.empty(image.shape, dtype=np.uint8)
+
+    def work(t: Tile) -> np.ndarray:
+        result = inner_of(enhance_array(np.ascontiguousarray(block(image, t.outer)), mean), t)
+        return apply_sector(result, t.inner, size) if sector else result
+
+    for t, result in map_tiles(work, tile_grid(image.shape, tile, ENHANCE_HALO), workers):
+        left, top, right, bottom = t.inner
+        out[top:bottom, left:right] = result
+    return out
+
+
+def sector_mask_tiled(image: np.ndarray, out: np.ndarray = None, tile: int = TILE_SIZE,
+                      workers: int = None) -> np.ndarray:
+    """分块版 sector_mask：左上角正方形内的1/4扇形保留，其余纯黑；out 可以就是 image"""
+    size = min(image.shape[:2])
+    if out is None:
+        out = np.empty(image.shape, dtype=np.uint8)
+
+    def work(t: Tile) -> np.ndarray:
+        return apply_sector(np.array(block(image, t.inner)), t.inner, size)
+
+    for t, result in map_tiles(work, tile_grid(image.shape, tile), workers):
+        left, top, right, bottom = t.inner
+        out[top:bottom, left:right] = result
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="大图分块增强（.npy 输入输出时全程内存映射）")
+    parser.add_argument("input", type=Path, help="输入图像（.npy / .jpg / .png）")
+    parser.add_argument("--out", type=Path, required=True, help="输出（.npy 或 .jpg）")
+    parser.add_argument("--tile", type=int, default=TILE_SIZE, help="块边长（px）")
+    parser.add_argument("--workers", type=int, default=None, help="并行线程数")
+    parser.add_argument("--sector", action="store_true", help="增强后只保留1/4扇形")
+    args = parser.parse_args()
+
+    image = open_image(args.input)
+    h, w = image.shape[:2]
+    print(f"输入: {args.input.name} ({w}x{h})，块: {args.tile}px")
+
+    start = time.perf_counter()
+    to_npy = args.out.suffix.lower() == ".npy"
+    out = open_output(args.out, image.shape) if to_npy else None
+    out = enhance_tiled(image, out, args.tile, args.workers, args.sector)
+    if to_npy:
+        out.flush()
+    else:
+        save_jpeg(out, args.out)
+    print(f"保存: {args.out}（{time.perf_counter() - start:.1f} 秒）")
+
+
+if __name__ == "__main__":
+    main()
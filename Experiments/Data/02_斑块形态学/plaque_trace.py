@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+流水线逐阶段计时与内存记录
+
+批量处理变慢时，用来分清是霍夫检测、颜色检测的形态学运算、增强链还是 JPEG 编码占了时间:
+1. 记录 - 每个阶段（及其中的子步骤）记录墙钟时间、CPU 时间、峰值分配（可选），
+   按照片区分；子步骤的名字带上所在阶段，如 detect_plate/hough
+2. 追踪文件 - 每条记录立即追加一行 JSON（JSON Lines），中途中断也不丢
+3. 汇总 - 处理结束时按阶段汇总：次数、总耗时、平均、CPU、峰值内存、占比
+
+默认关闭：span() 直接返回同一个空上下文，几乎没有开销。
+峰值内存用 tracemalloc（NumPy 数组与 OpenCV 输出都经 NumPy 分配，都能统计到），
+开启后处理会明显变慢，所以单独开关。
+
+开启方式（各 process_plaque_*.py 脚本不用改）:
+    PLAQUE_TRACE=追踪.jsonl python process_plaque_quarter.py
+    PLAQUE_TRACE=追踪.jsonl PLAQUE_TRACE_MEMORY=1 python process_plaque_quarter.py
+
+代码中:
+    with TRACER.span("hough"):
+        circles = cv2.HoughCircles(...)
+"""
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+TRACE_ENV = "PLAQUE_TRACE"
+MEMORY_ENV = "PLAQUE_TRACE_MEMORY"
+
+_DISABLED = nullcontext()
+
+
+class Tracer:
+    """
+    阶段计时器
+
+    trace_path: JSON Lines 追踪文件（追加写），None 时只在内存中汇总
+    memory: 同时记录峰值分配（tracemalloc）
+
+    CPU 时间为进程 CPU 时间（含 OpenCV 内部线程）；多张照片并行处理时，
+    CPU 时间和峰值内存都包含同时运行的其他线程。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.memory = False
+        self.trace_path = None
+        self._file = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._totals = defaultdict(lambda: [0, 0.0, 0.0, 0])  # 次数, 墙钟, CPU, 峰值字节
+
+    def enable(self, trace_path: Path = None, memory: bool = False):
+        self.disable()
+        self.enabled, self.memory = True, memory
+        self.trace_path = Path(trace_path) if trace_path else None
+        if self.trace_path is not None:
+            self._file = open(self.trace_path, "a", encoding="utf-8")
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._totals.clear()
+
+    def disable(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.enabled = self.memory = False
+
+    def span(self, name: str, photo: str = None):
+        """
+        计时一个阶段 / 步骤（with 语句）；嵌套时名字为 外层/内层，照片名沿用外层
+        """
+        if not self.enabled:
+            return _DISABLED
+        return self._span(name, photo)
+
+    @contextmanager
+    def _span(self, name: str, photo: str):
+        stack = self._local.__dict__.setdefault("stack", [])
+        parent = stack[-1] if stack else None
+        frame = {
+            "stage": f"{parent['stage']}/{name}" if parent else name,
+            "photo": photo if photo is not None else (parent and parent["photo"]),
+            "peak": 0,
+        }
+        if self.memory:
+            # 重置前先把到目前为止的峰值记到外层
+            if parent is not None:
+                parent["peak"] = max(parent["peak"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        stack.append(frame)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            stack.pop()
+            peak = None
+            if self.memory:
+                peak = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+                if parent is not None:
+                    parent["peak"] = max(parent["peak"], peak)
+            self._record(frame["stage"], frame["photo"], wall, cpu, peak, depth=len(stack))
+
+    def _record(self, stage: str, photo: str, wall: float, cpu: float, peak: int, depth: int):
+        record = {"photo": photo, "stage": stage, "wall_s": round(wall, 6), "cpu_s": round(cpu, 6)}
+        if peak is not None:
+            record["peak_mb"] = round(peak / 2 ** 20, 2)
+        with self._lock:
+            totals = self._totals[(depth, stage)]
+            totals[0] += 1
+            totals[1] += wall
+            totals[2] += cpu
+            totals[3] = max(totals[3], peak or 0)
+            if self._file is not None:
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self._file.flush()
+
+    def summary(self) -> list:
+        """
+        按阶段汇总
+
+        Returns:
+            [(阶段, 次数, 总墙钟秒, 总CPU秒, 最大峰值字节, 占顶层总耗时比例)]，按总耗时从高到低
+        """
+        with self._lock:
+            items = [(depth, stage, *t) for (depth, stage), t in self._totals.items()]
+        top = sum(wall for depth, _, _, wall, _, _ in items if depth == 0) or 1.0
+        rows = [(stage, count, wall, cpu, peak, wall / top) for _, stage, count, wall, cpu, peak in items]
+        return sorted(rows, key=lambda r: -r[2])
+
+    def print_summary(self):
+        """打印汇总表（未开启时什么都不做）"""
+        if not self.enabled:
+            return
+        rows = self.summary()
+        print("\n阶段耗时汇总" + (f"（追踪文件: {self.trace_path}）" if self.trace_path else ""))
+        print(f"  {'阶段':<30}{'次数':>4}{'总计':>8}{'平均':>8}{'CPU':>10}{'峰值内存':>8}{'占比':>6}")
+        for stage, count, wall, cpu, peak, share in rows:
+            peak_text = f"{peak / 2 ** 20:.0f}MB" if self.memory else "-"
+            print(f"  {stage:<32}{count:>6}{wall:>9.2f}s{wall / count * 1000:>8.0f}ms"
+                  f"{cpu:>9.2f}s{peak_text:>12}{share:>8.0%}")
+
+
+TRACER = Tracer()
+
+
+def enable_from_env():
+    """按环境变量开启: PLAQUE_TRACE=追踪文件，PLAQUE_TRACE_MEMORY=1 记录峰值内存"""
+    path = os.environ.get(TRACE_ENV)
+    if path:
+        TRACER.enable(path, memory=os.environ.get(MEMORY_ENV, "") not in ("", "0"))
+
+
+enable_from_env()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+输出图像的编码与并行写入
+
+原来每个输出都在主线程上 Image.save(..., "JPEG", quality=95)，编码 800x800 和原尺寸
+输出占了不少时间。这里把编码 + 写盘交给线程池:
+
+1. 编码器 - ENCODERS 中选择:
+   "pil"    PIL JPEG，可选 optimize（哈夫曼表优化）、progressive、subsampling
+   "opencv" cv2.imencode JPEG（通常最快；不写 EXIF/ICC）
+   "webp"   PIL WebP，有损或 lossless，用于归档副本
+   "avif"   PIL AVIF（Pillow 需带 libavif，或装 pillow-avif-plugin），用于归档副本
+   编码器都在 C 代码里释放 GIL，几个线程可以真正并行编码
+2. 并行 - ImageWriter.submit() 把 (图像, 路径) 交给线程池后立即返回，
+   流水线继续处理下一张照片，编码、写盘与计算重叠
+3. 背压 - 排队 + 正在写的图像最多 max_pending 张，满了 submit() 阻塞，
+   内存上限 = max_pending × 单张输出大小，不随照片数增长
+4. 出错 - 写入失败不打断流水线，close() 时汇总返回
+
+提交的数组不复制：提交后不能再原地修改（流水线各阶段都生成新数组，满足这一点）。
+
+用法:
+    with ImageWriter(workers=4) as writer:
+        writer.submit(image, Path("R1_统一.jpg"), quality=95, exif=exif)
+    writer.errors  # [(路径, 异常)]
+"""
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image, features
+
+from plaque_trace import TRACER
+
+DEFAULT_QUALITY = 95
+
+# 编码器 -> 输出扩展名
+EXTENSIONS = {"pil": ".jpg", "opencv": ".jpg", "webp": ".webp", "avif": ".avif"}
+
+
+def _register_avif():
+    if not features.check("avif"):
+        import pillow_avif  # noqa: F401  注册 AVIF 插件
+
+
+def _pil_extra(exif: bytes, icc_profile: bytes) -> dict:
+    return {k: v for k, v in (("exif", exif), ("icc_profile", icc_profile)) if v}
+
+
+def encode_pil(image: np.ndarray, path: Path, quality: int, exif: bytes = None, icc_profile: bytes = None,
+               optimize: bool = False, progressive: bool = False, subsampling: int = -1):
+    """PIL JPEG；subsampling -1 为 PIL 默认（4:2:0），0 为 4:4:4"""
+    Image.fromarray(np.ascontiguousarray(image)).save(
+        path, "JPEG", quality=quality, optimize=optimize, progressive=progressive,
+        subsampling=subsampling, **_pil_extra(exif, icc_profile))
+
+
+def encode_opencv(image: np.ndarray, path: Path, quality: int, exif: bytes = None, icc_profile: bytes = None,
+                  optimize: bool = False, progressive: bool = False):
+    """cv2.imencode JPEG；不写 EXIF/ICC"""
+    bgr = cv2.cvtColor(np.ascontiguousarray(image), cv2.COLOR_RGB2BGR)
+    params = [cv2.IMWRITE_JPEG_QUALITY, quality,
+              cv2.IMWRITE_JPEG_OPTIMIZE, int(optimize), cv2.IMWRITE_JPEG_PROGRESSIVE, int(progressive)]
+    ok, data = cv2.imencode(".jpg", bgr, params)
+    if not ok:
+        raise ValueError(f"OpenCV 编码失败: {path}")
+    # tofile：Windows 中文路径下 cv2.imwrite 会失败
+    data.tofile(str(path))
+
+
+def encode_webp(image: np.ndarray, path: Path, quality: int, exif: bytes = None, icc_profile: bytes = None,
+                lossless: bool = False, method: int = 4):
+    """PIL WebP；method 0~6，越大越慢、文件越小"""
+    Image.fromarray(np.ascontiguousarray(image)).save(
+        path, "WEBP", quality=quality, lossless=lossless, method=method, **_pil_extra(exif, icc_profile))
+
+
+def encode_avif(image: np.ndarray, path: Path, quality: int, exif: bytes = None, icc_profile: bytes = None,
+                speed: int = 6):
+    """PIL AVIF；speed 0~10，越小越慢、文件越小"""
+    _register_avif()
+    Image.fromarray(np.ascontiguousarray(image)).save(
+        path, "AVIF", quality=quality, speed=speed, **_pil_extra(exif, icc_profile))
+
+
+ENCODERS = {"pil": encode_pil, "opencv": encode_opencv, "webp": encode_webp, "avif": encode_avif}
+
+
+def write_image(image: np.ndarray, path: Path, quality: int = DEFAULT_QUALITY, exif: bytes = None,
+                icc_profile: bytes = None, encoder: str = "pil", **options):
+    """用指定编码器编码并写入（当前线程）"""
+    with TRACER.span("encode", photo=Path(path).stem):
+        ENCODERS[encoder](image, path, quality, exif, icc_profile, **options)
+
+
+class ImageWriter:
+    """
+    线程池写入器
+
+    workers: 编码线程数，默认 CPU 核数
+    max_pending: 排队 + 正在写的图像上限，默认 2 × workers
+    encoder / options: 默认编码器及其参数，submit() 时可单独覆盖
+    """
+
+    def __init__(self, workers: int = None, max_pending: int = None, encoder: str = "pil", **options):
+        if encoder not in ENCODERS:
+            raise ValueError(f"未知编码器: {encoder}（可选 {', '.join(ENCODERS)}）")
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.max_pending = max(1, max_pending or 2 * self.workers)
+        self.encoder, self.options = encoder, options
+        self.errors = []
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="writer")
+
+    def submit(self, image: np.ndarray, path: Path, quality: int = DEFAULT_QUALITY, exif: bytes = None,
+               icc_profile: bytes = None, encoder: str = None, **options) -> Future:
+        """
+        提交一张图像（不复制，提交后不要原地修改）；队列满时阻塞到有空位
+
+        Returns:
+            Future，结果为写入的路径
+        """
+        encoder = encoder or self.encoder
+        options = {**self.options, **options} if encoder == self.encoder else options
+        self._slots.acquire()
+        try:
+            future = self._pool.submit(self._write, image, Path(path), quality, exif, icc_profile,
+                                       encoder, options)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f, p=Path(path): self._done(f, p))
+        return future
+
+    @staticmethod
+    def _write(image, path, quality, exif, icc_profile, encoder, options) -> Path:
+        write_image(image, path, quality, exif, icc_profile, encoder, **options)
+        return path
+
+    def _done(self, future: Future, path: Path):
+        self._slots.release()
+        error = future.exception()
+        if error is not None:
+            with self._lock:
+                self.errors.append((path, error))
+
+    def close(self) -> list:
+        """等所有写入完成，返回 [(路径, 异常)]"""
+        self._pool.shutdown(wait=True)
+        return self.errors
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -2,30 +2,55 @@
 """
 可视化培养皿位置，帮助精确测量参数
 在原始照片上画出培养皿的圆圈和裁剪区域
+
+--qa 模式：所有全盘照片拼成一张检测QA总览图（检测QA.jpg）
+- 每格: 自动检测的圆（绿=置信度达标，橙=不足将用手动配置）、手动配置的圆（红）、
+  选中的象限裁剪框（蓝）、名称/置信度
+- 照片按 1/4（有缓存时 1/8）分辨率解码（JPEG DCT 缩小），多进程并行
+- 检测结果缓存在 检测缓存.json（按文件大小+修改时间失效），再次生成只需解码缩略图
+
+用法:
+    python visualize_plates.py           # 每张照片一个标注图
+    python visualize_plates.py --qa      # 一张总览图
 """
 
+import argparse
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+
+import cv2
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 
+from photo_catalog import originals
+from photo_ingest import read_meta
+from plaque_pipeline import PLATE_CONFIG as QUARTER_CONFIG
+from plaque_pipeline import (MIN_CONFIDENCE, PLATES, Frame, PlateStats, best_view, detect_auto,
+                             load_rgb, photo_name, quadrant_box, save_jpeg)
+
 PHOTOS_DIR = Path(r"C:\Users\36094\Desktop\EcAZPhageDocumentation\Experiments\Data\02_斑块形态学\Photos")
 OUTPUT_DIR = PHOTOS_DIR / "可视化"
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-# 当前配置（根据可视化结果调整）
-# 格式: (center_x, center_y, radius)
+# 手动配置的圆 (center_x, center_y, radius)，见 plaque_pipeline.PLATES
 # 目标：红圈正好贴合培养皿外边缘
-PLATE_CONFIG = {
-    # R1 (3024x4032): 圆心往左移约130px，往上移约100px，半径增大
-    "R1": (1380, 1520, 780),
-    # R2 (3024x4032): 半径稍微增大
-    "R2": (1512, 1950, 1400),
-    # R3 (3024x4032): 圆心往左移约110px，往上移约50px，半径增大
-    "R3": (1400, 1650, 750),
-    # W1 (3024x4032): 圆心往左移约110px，半径增大
-    "W1": (1400, 1500, 780),
-    # W2 (4284x5712): 半径增大
-    "W2": (2142, 2050, 1100),
-}
+PLATE_CONFIG = PLATES
+
+# QA 总览图
+QA_REDUCE = 4          # 需要检测时的解码缩小倍数
+QA_THUMB_REDUCE = 8    # 已有缓存时只需缩略图，缩得更小
+TILE_SIZE = 360        # 每格长边
+SHEET_COLUMNS = 6
+SHEET_NAME = "检测QA.jpg"
+CACHE_NAME = "检测缓存.json"
+# 检测坐标的换算改变时加一，旧缓存全部失效
+# （2: EXIF 方向 5-8 的照片原先按未转正的宽换算，缓存的圆是错的）
+CACHE_VERSION = 2
+# 逐张标注图的解码缩小倍数
+VIEW_REDUCE = 4
 
 
 def visualize_plate(input_path: Path, output_dir: Path):
@@ -35,13 +60,10 @@ def visualize_plate(input_path: Path, output_dir: Path):
     if name not in PLATE_CONFIG:
         return
 
-    img = Image.open(input_path)
-    if img.mode != 'RGB':
-        img = img.convert('RGB')
-
-    # 缩小以便查看
-    scale = 0.25
-    small = img.resize((int(img.width * scale), int(img.height * scale)), Image.Resampling.LANCZOS)
+    # 缩小解码以便查看；按 EXIF 方向转正，与流水线（及配置的坐标）一致
+    meta = read_meta(input_path)
+    small = Image.fromarray(np.ascontiguousarray(load_rgb(input_path, VIEW_REDUCE, meta.orientation)))
+    scale = small.width / meta.width
 
     draw = ImageDraw.Draw(small)
 
@@ -63,7 +85,7 @@ def visualize_plate(input_path: Path, output_dir: Path):
     # 标注信息
     info = f"{name}: center=({cx},{cy}), r={radius}"
     draw.text((10, 10), info, fill='yellow')
-    draw.text((10, 30), f"Image: {img.width}x{img.height}", fill='yellow')
+    draw.text((10, 30), f"Image: {meta.width}x{meta.height}", fill='yellow')
     draw.text((10, 50), "Red=plate, Green=top-right, Blue=bottom-left", fill='yellow')
 
     output_path = output_dir / f"{name}_标注.jpg"
@@ -71,14 +93,135 @@ def visualize_plate(input_path: Path, output_dir: Path):
     print(f"保存: {output_path.name}")
 
 
+def photo_key(path: Path) -> str:
+    """缓存键：缓存版本 + 文件大小 + 修改时间"""
+    st = path.stat()
+    return f"{CACHE_VERSION}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def load_cache(cache_path: Path) -> dict:
+    if cache_path.exists():
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_cache(cache_path: Path, cache: dict):
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, indent=1)
+
+
+def qa_tile(job: tuple) -> tuple:
+    """
+    子进程入口：缩小解码一张照片，（无缓存时）检测，画出一格
+
+    Returns:
+        (name, tile RGB数组, detection dict 原图坐标)
+    """
+    path, detection = job
+    name = photo_name(path)
+    meta = read_meta(path)  # 只读文件头；宽高是转正后的
+    small = load_rgb(path, QA_REDUCE if detection is None else QA_THUMB_REDUCE, meta.orientation)
+    to_small = small.shape[1] / meta.width
+
+    if detection is None:
+        d = detect_auto(Frame(small))
+        plate = None if d.plate is None else [round(v / to_small) for v in d.plate]
+        detection = {"plate": plate, "confidence": round(float(d.confidence), 3), "method": d.method}
+
+    scale = TILE_SIZE / max(small.shape[:2])
+    tile = cv2.resize(small, (round(small.shape[1] * scale), round(small.shape[0] * scale)),
+                      interpolation=cv2.INTER_AREA)
+    k = to_small * scale  # 原图坐标 -> 格内坐标
+
+    manual = QUARTER_CONFIG.get(name)
+    if manual is not None:
+        cv2.circle(tile, (round(manual[0] * k), round(manual[1] * k)), round(manual[2] * k), (230, 0, 0), 1)
+
+    plate = detection["plate"]
+    confident = detection["confidence"] >= MIN_CONFIDENCE
+    if plate is not None:
+        cx, cy, r = (round(v * k) for v in plate)
+        cv2.circle(tile, (cx, cy), r, (0, 200, 0) if confident else (255, 140, 0), 2)
+        cv2.circle(tile, (cx, cy), 3, (0, 200, 0), -1)
+        # 象限：手动配置里有就用，否则和 select_quadrant 一样按积分图打分选
+        if manual is not None:
+            quadrant = manual[3]
+        else:
+            gray = cv2.cvtColor(tile, cv2.COLOR_RGB2GRAY)
+            _, quadrant, _ = best_view(PlateStats(gray, (cx, cy, r)), (cx, cy, r))
+        left, top, right, bottom = quadrant_box(cx, cy, r, quadrant)
+        cv2.rectangle(tile, (left, top), (right, bottom), (0, 90, 255), 2)
+        detection["quadrant"] = quadrant
+
+    label = f"{name}  {detection['confidence']:.2f} {detection['method'] or '-'}"
+    cv2.rectangle(tile, (0, 0), (tile.shape[1], 22), (0, 0, 0), -1)
+    cv2.putText(tile, label, (4, 16), cv2.FONT_HERSHEY_SIMPLEX, 0.5,
+                (255, 255, 255) if confident else (255, 140, 0), 1, cv2.LINE_AA)
+    return name, tile, detection
+
+
+def contact_sheet(tiles: list, columns: int = SHEET_COLUMNS, background: int = 40) -> np.ndarray:
+    """把格子按行列拼成一张图（每格居中放在 TILE_SIZE×TILE_SIZE 的格位里）"""
+    rows = math.ceil(len(tiles) / columns)
+    sheet = np.full((rows * TILE_SIZE, columns * TILE_SIZE, 3), background, dtype=np.uint8)
+    for i, tile in enumerate(tiles):
+        h, w = tile.shape[:2]
+        y = (i // columns) * TILE_SIZE + (TILE_SIZE - h) // 2
+        x = (i % columns) * TILE_SIZE + (TILE_SIZE - w) // 2
+        sheet[y:y + h, x:x + w] = tile
+    return sheet
+
+
+def qa_sheet(photos_dir: Path, output_dir: Path, max_workers: int = None) -> Path:
+    """生成检测QA总览图，返回输出路径"""
+    photos = originals(photos_dir, closeup=False)
+    cache_path = output_dir / CACHE_NAME
+    cache = load_cache(cache_path)
+
+    jobs = []
+    for p in photos:
+        entry = cache.get(p.name)
+        jobs.append((p, entry["detection"] if entry and entry["key"] == photo_key(p) else None))
+    print(f"全盘照片: {len(photos)}，需要重新检测: {sum(d is None for _, d in jobs)}")
+
+    workers = min(max_workers or os.cpu_count() or 1, max(len(jobs), 1))
+    if workers <= 1:
+        results = [qa_tile(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(qa_tile, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+    for (p, _), (name, _, detection) in zip(jobs, results):
+        cache[p.name] = {"key": photo_key(p), "detection": detection}
+        if detection["confidence"] < MIN_CONFIDENCE:
+            print(f"  {name}: 置信度 {detection['confidence']:.2f}，需要检查")
+    save_cache(cache_path, cache)
+
+    sheet_path = output_dir / SHEET_NAME
+    save_jpeg(contact_sheet([tile for _, tile, _ in results]), sheet_path, quality=85)
+    print(f"保存: {sheet_path}")
+    return sheet_path
+
+
 def main():
+    parser = argparse.ArgumentParser(description="可视化培养皿位置")
+    parser.add_argument("--qa", action="store_true", help="生成一张检测QA总览图")
+    parser.add_argument("--photos", type=Path, default=PHOTOS_DIR, help="原始照片目录")
+    parser.add_argument("--out", type=Path, default=OUTPUT_DIR, help="输出目录")
+    parser.add_argument("--workers", type=int, default=None, help="并行进程数")
+    args = parser.parse_args()
+
     print("可视化培养皿位置")
     print("=" * 40)
+    args.out.mkdir(parents=True, exist_ok=True)
+
+    if args.qa:
+        qa_sheet(args.photos, args.out, args.workers)
+        return
 
-    for p in sorted(PHOTOS_DIR.glob("*_原始.jpg")):
-        name = p.stem.replace("_原始", "")
-        if "-" not in name:  # 只处理全盘照片
-            visualize_plate(p, OUTPUT_DIR)
+    for p in originals(args.photos, closeup=False):
+        visualize_plate(p, args.out)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+噬菌体滴度计算（多稀释度合并）
+- 输入每块平板的噬菌斑数、稀释度、加样体积
+- 所有可计数稀释度合并，用Poisson最大似然估计PFU/mL
+- 给出置信区间（Garwood精确区间）
+- 全部向量化，一次调用可处理整个筛选实验的上千块平板
+
+模型: 每块平板的斑块数 c_i ~ Poisson(λ · d_i · v_i)
+      λ = 原液滴度 (PFU/mL), d_i = 稀释度 (如1e-8), v_i = 加样体积 (mL)
+MLE:  λ̂ = Σc_i / Σ(d_i · v_i)   （等价于按有效体积加权）
+
+CSV格式 (UTF-8, 含表头):
+    phage,dilution,count,volume_ul
+    R3,1e-10,544,100
+    W1,10^-8,40,100
+    R2,1e-8,TNTC,100
+dilution 是稀释度（≤1 的分数），不是稀释倍数：1e8 这类大于 1 的值会报错
+"""
+
+import csv
+import math
+import sys
+from pathlib import Path
+from statistics import NormalDist
+
+import numpy as np
+
+# 可计数范围（与 04_滴度测定.md 一致：选取30-300个噬菌斑的平板）
+MIN_COUNTABLE = 30
+MAX_COUNTABLE = 300
+
+# 默认加样体积 100 μL
+DEFAULT_VOLUME_ML = 0.1
+
+SUPERSCRIPT = str.maketrans("0123456789-", "⁰¹²³⁴⁵⁶⁷⁸⁹⁻")
+
+
+def parse_dilution(text: str) -> float:
+    """
+    解析稀释度（≤1 的分数，如 1e-8）：支持 1e-8、10^-8、10⁻⁸、-8 四种写法
+    大于 1 的值（如 1e8）无法区分是稀释倍数还是写错，直接报错
+    """
+    s = str(text).strip().replace("⁻", "-").replace("−", "-")
+    s = s.translate(str.maketrans("⁰¹²³⁴⁵⁶⁷⁸⁹", "0123456789"))
+    if s.startswith("10^"):
+        value = 10.0 ** float(s[3:])
+    elif s.startswith("10") and len(s) > 2 and s[2] == "-":
+        value = 10.0 ** float(s[2:])
+    else:
+        value = float(s)
+        # 只写指数（如 -8）时视为 10^-8
+        if value < 0:
+            value = 10.0 ** value
+    if not 0 < value <= 1:
+        raise ValueError(f"稀释度应为 0~1 的分数（如 1e-8、10^-8、-8），不是稀释倍数: {text!r}")
+    return value
+
+
+def parse_count(text: str) -> float:
+    """解析斑块数，TNTC/空值记为 NaN"""
+    s = str(text).strip().upper()
+    if s in ("", "TNTC", "NA", "NAN", "-"):
+        return np.nan
+    return float(s)
+
+
+_lgamma = np.vectorize(math.lgamma, otypes=[np.float64])
+
+
+def _gammainc(a: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """
+    正则化下不完全伽马函数 P(a, x)（a>0, x≥0，向量化）
+    x < a+1 用级数，否则用连分式（Numerical Recipes 6.2），迭代到相对误差 <1e-15
+    """
+    a, x = np.broadcast_arrays(np.asarray(a, dtype=np.float64), np.asarray(x, dtype=np.float64))
+    with np.errstate(divide="ignore"):
+        log_prefix = a * np.log(x) - x - _lgamma(a)
+    series = x < a + 1
+    tiny = 1e-300
+
+    # 级数: P = e^(-x) x^a / Γ(a) · Σ x^n / (a(a+1)...(a+n))
+    term = 1.0 / a
+    total = term.copy()
+    denom = a.copy()
+    # 连分式 (Lentz): Q = e^(-x) x^a / Γ(a) · 1/(x+1-a- 1·(1-a)/(x+3-a- ...))
+    b = x + 1.0 - a
+    c = np.full_like(x, 1.0 / tiny)
+    d = 1.0 / np.where(np.abs(b) < tiny, tiny, b)
+    h = d.copy()
+    for i in range(1, 100000):
+        denom = denom + 1.0
+        term = term * x / denom
+        total = total + term
+        an = -i * (i - a)
+        b = b + 2.0
+        d = an * d + b
+        d = 1.0 / np.where(np.abs(d) < tiny, tiny, d)
+        c = b + an / c
+        c = np.where(np.abs(c) < tiny, tiny, c)
+        delta = d * c
+        h = h * delta
+        done = np.where(series, np.abs(term) < np.abs(total) * 1e-15, np.abs(delta - 1.0) < 1e-15)
+        if done.all():
+            break
+    p_series = total * np.exp(log_prefix)
+    q_fraction = h * np.exp(log_prefix)
+    return np.where(x <= 0, 0.0, np.where(series, p_series, 1.0 - q_fraction))
+
+
+def _gamma_ppf(p: float, a: np.ndarray) -> np.ndarray:
+    """
+    伽马分布（尺度 1）的 p 分位数，即 P(a, x) = p 的解（a>0，向量化）
+    Wilson-Hilferty 近似作初值，带区间保护的牛顿迭代到相对误差 <1e-12；
+    χ²(df) 分位数 = 2 · _gamma_ppf(p, df/2)
+    """
+    a = np.asarray(a, dtype=np.float64)
+    z = NormalDist().inv_cdf(p)
+    h = 1.0 / (9.0 * a)
+    x = np.maximum(a * np.maximum(1.0 - h + z * np.sqrt(h), 0.0) ** 3, 1e-300)
+    lo = np.zeros_like(a)
+    hi = np.maximum(2 * x, a + 40 * np.sqrt(a) + 40)
+    for _ in range(200):
+        f = _gammainc(a, x) - p
+        lo = np.where(f < 0, x, lo)
+        hi = np.where(f > 0, x, hi)
+        pdf = np.exp((a - 1) * np.log(x) - x - _lgamma(a))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = np.where(pdf > 0, f / pdf, np.inf)
+        new = x - step
+        # 牛顿步跳出区间时改用二分
+        new = np.where((new > lo) & (new < hi), new, (lo + hi) / 2)
+        converged = np.abs(new - x) <= 1e-12 * np.maximum(new, 1e-300)
+        x = new
+        if converged.all():
+            break
+    return x
+
+
+def poisson_ci(total: np.ndarray, confidence: float = 0.95) -> tuple:
+    """
+    Poisson 计数的 Garwood 置信区间
+    返回: (lower, upper)，与 total 形状相同
+    """
+    total = np.asarray(total, dtype=np.float64)
+    alpha = 1.0 - confidence
+    safe = np.maximum(total, 1.0)
+    # χ²(2c, α/2)/2 = Gamma(c) 的 α/2 分位数
+    lower = np.where(total > 0, _gamma_ppf(alpha / 2, safe), 0.0)
+    upper = _gamma_ppf(1 - alpha / 2, total + 1)
+    return lower, upper
+
+
+def titer_mle(counts, dilutions, volumes_ml=DEFAULT_VOLUME_ML, groups=None,
+              min_count: int = MIN_COUNTABLE, max_count: int = MAX_COUNTABLE,
+              confidence: float = 0.95) -> dict:
+    """
+    多稀释度合并的滴度估计（向量化）
+
+    Args:
+        counts: 每块平板的斑块数，TNTC 用 NaN 表示
+        dilutions: 稀释度（如 1e-8）
+        volumes_ml: 加样体积 (mL)，标量或数组
+        groups: 每块平板所属噬菌体/样品标签；None 表示全部属于同一组
+        min_count, max_count: 可计数范围
+        confidence: 置信水平
+
+    Returns:
+        dict，每个键对应一个按组排列的数组:
+        group, titer, ci_low, ci_high, total_count, n_plates, fallback
+        fallback=True 表示该组没有落在可计数范围内的平板，
+        退而使用所有未饱和（≤max_count）的平板
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    dilutions = np.broadcast_to(np.asarray(dilutions, dtype=np.float64), counts.shape)
+    volumes = np.broadcast_to(np.asarray(volumes_ml, dtype=np.float64), counts.shape)
+
+    if groups is None:
+        labels = np.array(["all"])
+        inverse = np.zeros(counts.shape, dtype=np.intp)
+    else:
+        labels, inverse = np.unique(np.asarray(groups), return_inverse=True)
+    n_groups = len(labels)
+
+    valid = np.isfinite(counts) & (counts <= max_count)
+    countable = valid & (counts >= min_count)
+
+    # 每组是否有可计数平板；没有则回退到全部未饱和平板
+    has_countable = np.bincount(inverse, weights=countable, minlength=n_groups) > 0
+    use = np.where(has_countable[inverse], countable, valid)
+
+    effective_volume = dilutions * volumes
+    total = np.bincount(inverse, weights=np.where(use, counts, 0.0), minlength=n_groups)
+    exposure = np.bincount(inverse, weights=np.where(use, effective_volume, 0.0), minlength=n_groups)
+    n_plates = np.bincount(inverse, weights=use, minlength=n_groups).astype(int)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        titer = np.where(exposure > 0, total / exposure, np.nan)
+        low, high = poisson_ci(total, confidence)
+        ci_low = np.where(exposure > 0, low / exposure, np.nan)
+        ci_high = np.where(exposure > 0, high / exposure, np.nan)
+
+    return {
+        "group": labels,
+        "titer": titer,
+        "ci_low": ci_low,
+        "ci_high": ci_high,
+        "total_count": total,
+        "n_plates": n_plates,
+        "fallback": ~has_countable,
+    }
+
+
+def format_titer(value: float, digits: int = 1) -> str:
+    """格式化为幻灯片用的 '3.7×10¹⁴' 形式"""
+    if not np.isfinite(value) or value <= 0:
+        return "—"
+    exponent = int(np.floor(np.log10(value)))
+    mantissa = value / 10 ** exponent
+    if round(mantissa, digits) >= 10:
+        mantissa /= 10
+        exponent += 1
+    return f"{mantissa:.{digits}f}×10{str(exponent).translate(SUPERSCRIPT)}"
+
+
+def load_plates(csv_path: Path) -> tuple:
+    """读取平板计数CSV，返回 (groups, counts, dilutions, volumes_ml)"""
+    groups, counts, dilutions, volumes = [], [], [], []
+    with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+        for row in csv.DictReader(f):
+            groups.append(row["phage"].strip())
+            counts.append(parse_count(row["count"]))
+            dilutions.append(parse_dilution(row["dilution"]))
+            volume_ul = row.get("volume_ul") or ""
+            volumes.append(float(volume_ul) / 1000 if volume_ul.strip() else DEFAULT_VOLUME_ML)
+    return (np.array(groups), np.array(counts), np.array(dilutions), np.array(volumes))
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("用法: python titer_calc.py <plates.csv>")
+        sys.exit(1)
+
+    csv_path = Path(sys.argv[1])
+    groups, counts, dilutions, volumes = load_plates(csv_path)
+    result = titer_mle(counts, dilutions, volumes, groups)
+
+    print("=" * 70)
+    print(f"滴度计算 (Poisson MLE, 95% CI) - {csv_path.name}")
+    print(f"平板数: {len(counts)}, 样品数: {len(result['group'])}")
+    print("=" * 70)
+    print(f"{'样品':<10}{'滴度 (PFU/mL)':<16}{'95% CI':<28}{'斑块总数':>8}{'平板':>6}")
+    print("-" * 70)
+    for i, name in enumerate(result["group"]):
+        ci = f"{format_titer(result['ci_low'][i], 2)} - {format_titer(result['ci_high'][i], 2)}"
+        flag = "  *" if result["fallback"][i] else ""
+        print(f"{name:<10}{format_titer(result['titer'][i]):<16}{ci:<28}"
+              f"{int(result['total_count'][i]):>8}{result['n_plates'][i]:>6}{flag}")
+    if result["fallback"].any():
+        print(f"\n* 无{MIN_COUNTABLE}-{MAX_COUNTABLE}范围内的平板，使用全部未饱和平板估计")
+
+
+if __name__ == "__main__":
+    main()
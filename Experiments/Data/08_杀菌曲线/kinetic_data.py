@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+酶标仪动力学CSV解析（BioTek Epoch 2 导出）
+
+- 文件为 latin-1 编码、制表符分隔、逗号作小数点
+- 读取 "Blank 600"（扣空白后的OD600）部分，得到 时间 × 孔位 矩阵
+- 按板布局把重复孔取均值/标准差（一次向量化计算全部分组）
+
+板布局记录在 LAYOUTS 中（来自实验记录与 plot_killing_curve*.R 的注释），
+异常孔已排除：R菌 G3（对照孔下降）、W菌 G6（漏加噬菌体）。
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+SECTION = "Blank 600"
+
+# 分组名 -> (噬菌体, MOI, 孔位)；噬菌体为空表示细菌对照
+R_LAYOUT = {
+    "R_control": ("", None, ["B3", "C3", "D3", "E3", "F3"]),   # 排除G3异常
+    "R1_MOI10": ("R1", 10, ["B4", "C4", "D4"]),     # RP1
+    "R1_MOI1": ("R1", 1, ["E4", "F4", "G4"]),       # RP2
+    "R1_MOI01": ("R1", 0.1, ["B5", "C5", "D5"]),    # RP3
+    "R1_MOI001": ("R1", 0.01, ["E5", "F5", "G5"]),  # RP4
+    "R2_MOI10": ("R2", 10, ["B6", "C6", "D6"]),     # RP5
+    "R2_MOI1": ("R2", 1, ["E6", "F6", "G6"]),       # RP6
+    "R2_MOI01": ("R2", 0.1, ["B7", "C7", "D7"]),    # RP7
+    "R2_MOI001": ("R2", 0.01, ["E7", "F7", "G7"]),  # RP8
+    "R3_MOI10": ("R3", 10, ["B8", "C8", "D8"]),     # RP9
+    "R3_MOI1": ("R3", 1, ["E8", "F8", "G8"]),       # RP10
+    "R3_MOI01": ("R3", 0.1, ["B9", "C9", "D9"]),    # RP11
+    "R3_MOI001": ("R3", 0.01, ["E9", "F9", "G9"]),  # RP12
+}
+
+W_LAYOUT = {
+    "W_control": ("", None, ["B3", "C3", "D3", "E3", "F3", "G3"]),
+    "W1_MOI10": ("W1", 10, ["B4", "C4", "D4"]),     # WP1
+    "W1_MOI1": ("W1", 1, ["E4", "F4", "G4"]),       # WP2
+    "W1_MOI01": ("W1", 0.1, ["B5", "C5", "D5"]),    # WP3
+    "W1_MOI001": ("W1", 0.01, ["E5", "F5", "G5"]),  # WP4
+    "W2_MOI01": ("W2", 0.1, ["B6", "C6", "D6"]),    # WP5
+    "W2_MOI001": ("W2", 0.01, ["E6", "F6"]),        # WP6，排除G6异常
+    "W2_MOI10": ("W2", 10, ["B7", "C7", "D7"]),     # WP7
+    "W2_MOI1": ("W2", 1, ["E7", "F7", "G7"]),       # WP8
+}
+
+# CSV文件名 -> 板布局
+LAYOUTS = {
+    "Protocol kinetic-12h_260119R.csv": R_LAYOUT,
+    "Protocol kinetic-12h_W20260117.csv": W_LAYOUT,
+}
+
+
+def parse_time(text: str) -> float:
+    """'1:14:16' -> 小时"""
+    h, m, s = (int(x) for x in text.split(":"))
+    return h + m / 60 + s / 3600
+
+
+def parse_value(text: str) -> float:
+    """欧洲格式数值（逗号作小数点）；空值/????? -> NaN"""
+    try:
+        return float(text.replace(",", "."))
+    except ValueError:
+        return np.nan
+
+
+def load_kinetic(csv_path: Path, section: str = SECTION):
+    """
+    读取动力学CSV中的一个数据部分
+
+    Returns:
+        (time_hours, wells, od)
+        time_hours: (T,) 小时
+        wells: 孔位列表
+        od: (T, n_wells) 矩阵，缺失值为 NaN
+    """
+    with open(csv_path, "r", encoding="latin-1") as f:
+        lines = f.read().split("\n")
+
+    # 部分标题单独成行（正文中也会出现 "Blank 600" 字样）
+    try:
+        start = lines.index(section)
+    except ValueError:
+        raise ValueError(f"{Path(csv_path).name}: 找不到 '{section}' 部分")
+
+    header_idx = next((i for i in range(start, len(lines)) if lines[i].startswith("Time\t")), None)
+    if header_idx is None:
+        raise ValueError(f"{Path(csv_path).name}: '{section}' 部分缺少表头")
+    wells = lines[header_idx].rstrip("\r").split("\t")[1:]
+
+    times = []
+    rows = []
+    for line in lines[header_idx + 1:]:
+        line = line.rstrip("\r")
+        if not line.strip():
+            break
+        values = line.split("\t")
+        times.append(parse_time(values[0]))
+        row = [parse_value(v) for v in values[1:len(wells) + 1]]
+        row += [np.nan] * (len(wells) - len(row))
+        rows.append(row)
+
+    return np.array(times), wells, np.array(rows, dtype=np.float64)
+
+
+def group_stats(wells: list, od: np.ndarray, layout: dict):
+    """
+    按板布局计算各组重复孔的均值和标准差（所有组一次计算）
+
+    Returns:
+        (names, mean, sd)，mean/sd 形状为 (T, n_groups)
+    """
+    col = {w: i for i, w in enumerate(wells)}
+    names = list(layout)
+    # 孔位 -> 组号 的指示矩阵 (n_wells, n_groups)，再用矩阵乘法求组内和
+    member = np.zeros((len(wells), len(names)))
+    for g, name in enumerate(names):
+        for well in layout[name][2]:
+            if well in col:
+                member[col[well], g] = 1.0
+
+    valid = ~np.isnan(od)
+    values = np.where(valid, od, 0.0)
+    n = valid.astype(np.float64) @ member
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = (values @ member) / n
+        var = (values ** 2 @ member) / n - mean ** 2
+        sd = np.sqrt(np.clip(var * n / np.maximum(n - 1, 1), 0, None))
+    return names, mean, sd
+
+
+def load_groups(csv_path: Path, layout: dict = None):
+    """
+    读取CSV并按布局汇总
+
+    Returns:
+        (time_hours, names, mean, sd)
+    """
+    csv_path = Path(csv_path)
+    if layout is None:
+        layout = LAYOUTS[csv_path.name]
+    time_hours, wells, od = load_kinetic(csv_path)
+    names, mean, sd = group_stats(wells, od, layout)
+    return time_hours, names, mean, sd
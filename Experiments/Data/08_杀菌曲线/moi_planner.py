@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+杀菌曲线 MOI 加样方案规划
+- 输入：板布局（每孔的噬菌体/宿主/MOI）、噬菌体滴度、实测OD600
+- 一次性计算全板每孔的噬菌体稀释度和加样体积（向量化）
+- 自动选择中间稀释度，使加样体积落在可准确移液的范围内
+- 导出排液工作站可用的CSV（source, destination, volume）
+
+公式（08_杀菌曲线.md）:
+    细菌数 = OD600 × CFU_PER_OD600 × 细菌体积
+    所需噬菌体体积 = (细菌数 × MOI) / (噬菌体滴度 × 稀释度)
+
+布局CSV (UTF-8, 含表头):
+    well,host,phage,moi
+    B3,R,,            <- 细菌对照（phage为空）
+    B4,R,R1,10
+    B2,,,             <- LB空白（host为空）
+
+滴度CSV:
+    phage,titer
+    R1,2.5e10
+"""
+
+import argparse
+import csv
+import math
+from pathlib import Path
+
+import numpy as np
+
+# OD600 与细菌浓度的换算：OD600 = 0.2 ≈ 2×10^8 CFU/mL
+CFU_PER_OD600 = 1e9
+
+# 反应体系（μL）
+WELL_VOLUME_UL = 200.0
+BACTERIA_VOLUME_UL = 100.0
+
+# 可准确移液的噬菌体体积范围（μL）
+MIN_PIPETTE_UL = 2.0
+MAX_PHAGE_UL = 20.0
+
+# 梯度稀释：每级 1:10，最多到 10^-MAX_DILUTION_STEPS
+DILUTION_STEP = 10
+MAX_DILUTION_STEPS = 12
+
+# 配制稀释液时的余量（多配20%），每个稀释管至少配制 MIN_TUBE_UL
+DILUTION_OVERAGE = 1.2
+MIN_TUBE_UL = 100.0
+
+ROWS_96 = "ABCDEFGH"
+ROWS_384 = "ABCDEFGHIJKLMNOP"
+
+
+def build_matrix_layout(phages: list, mois: list, host: str, replicates: int = 3,
+                        plate: int = 96, controls: int = 3) -> dict:
+    """
+    生成 噬菌体 × MOI 矩阵布局（按列依次填孔）
+
+    Returns:
+        dict: well -> (host, phage, moi)
+    """
+    rows, n_cols = (ROWS_384, 24) if plate == 384 else (ROWS_96, 12)
+    wells = [f"{r}{c}" for c in range(1, n_cols + 1) for r in rows]
+    entries = [(host, "", 0.0)] * controls
+    entries += [(host, phage, float(moi)) for phage in phages for moi in mois
+                for _ in range(replicates)]
+    if len(entries) > len(wells):
+        raise ValueError(f"{len(entries)} 个样本超出 {plate} 孔板容量")
+    return dict(zip(wells, entries))
+
+
+def load_layout(csv_path: Path) -> dict:
+    """读取板布局CSV，返回 well -> (host, phage, moi)"""
+    layout = {}
+    with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+        for row in csv.DictReader(f):
+            moi = (row.get("moi") or "").strip()
+            layout[row["well"].strip()] = (
+                (row.get("host") or "").strip(),
+                (row.get("phage") or "").strip(),
+                float(moi) if moi else 0.0,
+            )
+    return layout
+
+
+def load_titers(csv_path: Path) -> dict:
+    """读取滴度CSV，返回 phage -> PFU/mL"""
+    with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+        return {row["phage"].strip(): float(row["titer"]) for row in csv.DictReader(f)}
+
+
+def missing_inputs(layout: dict, titers: dict, od600: dict) -> tuple:
+    """
+    检查布局用到的噬菌体滴度和宿主OD是否齐全
+
+    Returns:
+        (缺少有效滴度的噬菌体, 缺少OD的宿主)，均已排序
+    """
+    phages = {phage for host, phage, moi in layout.values() if phage and host and moi > 0}
+    hosts = {host for host, _, _ in layout.values() if host}
+    no_titer = sorted(p for p in phages if not (np.isfinite(titers.get(p, np.nan)) and titers[p] > 0))
+    no_od = sorted(h for h in hosts if not np.isfinite(od600.get(h, np.nan)))
+    return no_titer, no_od
+
+
+def plan_plate(layout: dict, titers: dict, od600: dict,
+               well_volume_ul: float = WELL_VOLUME_UL,
+               bacteria_volume_ul: float = BACTERIA_VOLUME_UL,
+               min_pipette_ul: float = MIN_PIPETTE_UL,
+               max_phage_ul: float = MAX_PHAGE_UL) -> dict:
+    """
+    计算全板加样方案（所有孔一次向量化计算）
+
+    Args:
+        layout: well -> (host, phage, moi)
+        titers: phage -> PFU/mL
+        od600: host -> 扣空白后的OD600（用于换算细菌数）
+
+    Returns:
+        dict，每个键对应一个按孔排列的数组:
+        well, host, phage, moi, cfu, pfu, dilution_steps,
+        phage_ul, bacteria_ul, lb_ul, ok
+    """
+    wells = np.array(list(layout.keys()))
+    hosts = np.array([v[0] for v in layout.values()])
+    phages = np.array([v[1] for v in layout.values()])
+    mois = np.array([v[2] for v in layout.values()], dtype=np.float64)
+
+    has_host = hosts != ""
+    has_phage = (phages != "") & has_host & (mois > 0)
+
+    od = np.array([od600.get(h, np.nan) for h in hosts], dtype=np.float64)
+    titer = np.array([titers.get(p, np.nan) for p in phages], dtype=np.float64)
+
+    bacteria_ul = np.where(has_host, bacteria_volume_ul, 0.0)
+    cfu = np.where(has_host, od * CFU_PER_OD600 * bacteria_ul / 1000, 0.0)
+    pfu = np.where(has_phage, cfu * mois, 0.0)
+
+    # 原液所需体积（μL）
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stock_ul = np.where(has_phage, pfu / titer * 1000, 0.0)
+        # 选择最小的稀释级数，使体积 ≥ 最小可移液体积
+        steps = np.ceil(np.log(min_pipette_ul / stock_ul) / np.log(DILUTION_STEP))
+    steps = np.where(has_phage & np.isfinite(steps), np.clip(steps, 0, MAX_DILUTION_STEPS), 0)
+    steps = steps.astype(int)
+    phage_ul = np.where(has_phage, stock_ul * DILUTION_STEP ** steps.astype(np.float64), 0.0)
+
+    lb_ul = well_volume_ul - bacteria_ul - phage_ul
+    ok = (lb_ul >= 0) & np.where(
+        has_phage,
+        np.isfinite(phage_ul) & (phage_ul >= min_pipette_ul) & (phage_ul <= max_phage_ul),
+        ~has_host | np.isfinite(od),
+    )
+
+    return {
+        "well": wells,
+        "host": hosts,
+        "phage": phages,
+        "moi": mois,
+        "cfu": cfu,
+        "pfu": pfu,
+        "dilution_steps": steps,
+        "phage_ul": phage_ul,
+        "bacteria_ul": bacteria_ul,
+        "lb_ul": lb_ul,
+        "ok": ok,
+    }
+
+
+def dilution_label(phage: str, steps: int) -> str:
+    """稀释液管名称，如 'R3 原液' / 'R3 10^-2'"""
+    return f"{phage} 原液" if steps == 0 else f"{phage} 10^-{steps}"
+
+
+def dilution_series(plan: dict) -> list:
+    """
+    汇总需要配制的稀释液（每个噬菌体从原液逐级1:10稀释）
+    只统计方案可行（ok）的孔；缺滴度、体积超范围的孔不配稀释液
+
+    Returns:
+        [(tube, required_ul)]，按噬菌体和稀释级数排序
+        required_ul 包含供下一级稀释取用的量和余量
+    """
+    mask = plan["ok"] & (plan["phage_ul"] > 0)
+    phages = plan["phage"][mask]
+    steps = plan["dilution_steps"][mask]
+    volumes = plan["phage_ul"][mask]
+
+    tubes = []
+    for phage in sorted(set(phages)):
+        sel = phages == phage
+        need = np.bincount(steps[sel], weights=volumes[sel], minlength=steps[sel].max() + 1)
+        # 从最高稀释度往回累加：每一级还需要给下一级提供其体积的 1/DILUTION_STEP
+        carry = 0.0
+        required = []
+        for k in range(len(need) - 1, -1, -1):
+            total = need[k] * DILUTION_OVERAGE + carry
+            if k > 0:
+                total = max(total, MIN_TUBE_UL)
+            required.append((dilution_label(phage, k), total))
+            carry = total / DILUTION_STEP
+        tubes.extend(reversed(required))
+    return tubes
+
+
+def export_worklist(plan: dict, output_path: Path, bacteria_source: str = "{host}菌") -> list:
+    """
+    导出排液工作站CSV：先加LB，再加细菌，最后加噬菌体
+    列: step, source, destination, volume_ul
+    方案不可行（ok 为 False）的孔整孔不导出，避免只加了LB和细菌
+
+    Returns:
+        未导出的孔
+    """
+    order = [i for i in range(len(plan["well"])) if plan["ok"][i]]
+    with open(output_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["step", "source", "destination", "volume_ul"])
+        for i in order:
+            if plan["lb_ul"][i] > 0:
+                writer.writerow([1, "LB", plan["well"][i], f"{plan['lb_ul'][i]:.1f}"])
+        for i in order:
+            if plan["bacteria_ul"][i] > 0:
+                source = bacteria_source.format(host=plan["host"][i])
+                writer.writerow([2, source, plan["well"][i], f"{plan['bacteria_ul'][i]:.1f}"])
+        for i in order:
+            if plan["phage_ul"][i] > 0:
+                source = dilution_label(plan["phage"][i], int(plan["dilution_steps"][i]))
+                writer.writerow([3, source, plan["well"][i], f"{plan['phage_ul'][i]:.1f}"])
+    return [str(w) for w in plan["well"][~plan["ok"]]]
+
+
+def parse_od(items: list) -> dict:
+    """解析命令行 OD 参数，如 R=0.2 W=0.21"""
+    od = {}
+    for item in items:
+        host, value = item.split("=")
+        od[host.strip()] = float(value)
+    return od
+
+
+def main():
+    parser = argparse.ArgumentParser(description="杀菌曲线 MOI 加样方案规划")
+    parser.add_argument("layout", type=Path, help="板布局CSV (well,host,phage,moi)")
+    parser.add_argument("--titers", type=Path, required=True, help="滴度CSV (phage,titer)")
+    parser.add_argument("--od", nargs="+", required=True, help="各宿主OD600，如 R=0.2 W=0.21")
+    parser.add_argument("--output", type=Path, default=None, help="工作站CSV输出路径")
+    args = parser.parse_args()
+
+    layout = load_layout(args.layout)
+    titers, od600 = load_titers(args.titers), parse_od(args.od)
+    no_titer, no_od = missing_inputs(layout, titers, od600)
+    if no_titer:
+        print(f"✗ 滴度CSV中缺少有效滴度: {', '.join(no_titer)}")
+    if no_od:
+        print(f"✗ 缺少宿主OD600: {', '.join(no_od)}")
+    plan = plan_plate(layout, titers, od600)
+
+    print("=" * 70)
+    print(f"MOI加样方案 - {len(layout)} 孔")
+    print("=" * 70)
+    print(f"{'孔':<6}{'噬菌体':<8}{'MOI':>8}{'稀释液':>12}{'噬菌体μL':>10}{'细菌μL':>8}{'LBμL':>8}")
+    print("-" * 70)
+    for i in range(len(plan["well"])):
+        if plan["phage"][i] == "":
+            continue
+        tube = dilution_label(plan["phage"][i], int(plan["dilution_steps"][i]))
+        flag = "" if plan["ok"][i] else "  ✗"
+        print(f"{plan['well'][i]:<6}{plan['phage'][i]:<8}{plan['moi'][i]:>8g}{tube:>12}"
+              f"{plan['phage_ul'][i]:>10.1f}{plan['bacteria_ul'][i]:>8.1f}{plan['lb_ul'][i]:>8.1f}{flag}")
+
+    print("\n需配制的稀释液（含20%余量）:")
+    for tube, volume in dilution_series(plan):
+        print(f"  {tube:<14}{math.ceil(volume):>6} μL")
+
+    n_bad = int((~plan["ok"]).sum())
+    if n_bad:
+        print(f"\n✗ {n_bad} 孔体积超出可移液范围或缺少滴度/OD，未计入稀释液，请检查")
+
+    if args.output:
+        skipped = export_worklist(plan, args.output)
+        print(f"\n工作站CSV: {args.output}")
+        if skipped:
+            print(f"  未导出 {len(skipped)} 孔: {', '.join(skipped)}")
+
+
+if __name__ == "__main__":
+    main()
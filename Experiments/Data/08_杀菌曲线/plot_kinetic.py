@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+杀菌曲线直接出图（不经过 R）
+
+处理流程:
+1. 解析 - kinetic_data 读取酶标仪CSV的 Blank 600 矩阵，按板布局汇总重复孔
+2. 分组 - 每株噬菌体一个面板：各MOI一条曲线（均值），细菌对照为均值±SD色带
+3. 出图 - Matplotlib Agg 后端，面板分批交给进程池并行渲染，每个进程复用同一个Figure
+4. 组装 - 生成 image_grid 幻灯片（可直接写入大纲，或用 --deck 单独生成PPT）
+
+用法:
+    python plot_kinetic.py                    # 出图到 panels/
+    python plot_kinetic.py --deck 杀菌曲线.pptx --slide-json slide.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from kinetic_data import LAYOUTS, load_groups
+
+PROJECT_ROOT = Path(r"C:\Users\36094\Desktop\EcAZPhageDocumentation")
+DATA_SUBDIR = Path("Experiments/Data/08_杀菌曲线")
+PANEL_SUBDIR = "panels"
+
+# 面板尺寸与 image_grid 版位一致（4" × 2.8"）
+PANEL_SIZE_IN = (4.0, 2.8)
+PANEL_DPI = 200
+
+# 与 plot_killing_curve*.R 一致的配色
+MOI_COLORS = {10: "#E41A1C", 1: "#377EB8", 0.1: "#4DAF4A", 0.01: "#984EA3"}
+CONTROL_COLOR = "black"
+BAND_ALPHA = 0.2
+
+SLIDE_TITLE = "Killing Curves"
+
+
+def moi_label(moi: float) -> str:
+    return f"MOI={moi:g}"
+
+
+def panel_jobs(csv_paths: list) -> list:
+    """
+    把各CSV的分组结果整理成面板任务（每株噬菌体一个）
+
+    Returns:
+        [{"phage", "host", "time", "control": (mean, sd), "series": [(moi, mean, sd)]}]
+    """
+    jobs = []
+    for csv_path in csv_paths:
+        layout = LAYOUTS[Path(csv_path).name]
+        time_hours, names, mean, sd = load_groups(csv_path, layout)
+        control = next(g for g, name in enumerate(names) if not layout[name][0])
+        host = names[control].split("_")[0]
+
+        phages = {}
+        for g, name in enumerate(names):
+            phage, moi, _ = layout[name]
+            if phage:
+                phages.setdefault(phage, []).append((moi, mean[:, g], sd[:, g]))
+
+        for phage, series in phages.items():
+            jobs.append({
+                "phage": phage,
+                "host": host,
+                "time": time_hours,
+                "control": (mean[:, control], sd[:, control]),
+                "series": sorted(series, key=lambda s: -s[0]),
+            })
+    return jobs
+
+
+def draw_panel(ax, job: dict):
+    """在一个坐标轴上画一株噬菌体的杀菌曲线"""
+    t = job["time"]
+    c_mean, c_sd = job["control"]
+    ax.fill_between(t, c_mean - c_sd, c_mean + c_sd, color=CONTROL_COLOR,
+                    alpha=BAND_ALPHA, linewidth=0)
+    ax.plot(t, c_mean, color=CONTROL_COLOR, linewidth=1.5, label=f"{job['host']} control")
+    for moi, mean, _ in job["series"]:
+        ax.plot(t, mean, color=MOI_COLORS.get(moi), linewidth=1.5, label=moi_label(moi))
+
+    ax.set_title(f"{job['phage']} vs {job['host']}", fontsize=11, fontweight="bold")
+    ax.set_xlabel("Time (h)", fontsize=9)
+    ax.set_ylabel("OD600 (blank-corrected)", fontsize=9)
+    ax.set_xlim(0, np.ceil(t.max()))
+    ax.set_ylim(bottom=0)
+    ax.tick_params(labelsize=8)
+    ax.grid(alpha=0.3, linewidth=0.5)
+    ax.legend(fontsize=7, frameon=False, loc="upper left")
+
+
+def _render_batch(batch: list) -> list:
+    """子进程入口：一批面板复用同一个 Figure"""
+    fig = plt.figure(figsize=PANEL_SIZE_IN, dpi=PANEL_DPI)
+    paths = []
+    for job, out_path in batch:
+        fig.clf()
+        ax = fig.add_subplot(111)
+        draw_panel(ax, job)
+        fig.tight_layout()
+        fig.savefig(out_path, dpi=PANEL_DPI)
+        paths.append(out_path)
+    plt.close(fig)
+    return paths
+
+
+def render_panels(jobs: list, out_dir: Path, max_workers: int = None) -> list:
+    """
+    并行渲染所有面板
+
+    Returns:
+        按 jobs 顺序的PNG路径
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tasks = [(job, out_dir / f"killing_curve_{job['phage']}.png") for job in jobs]
+
+    workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        return _render_batch(tasks)
+
+    batches = [tasks[i::workers] for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        done = {path for paths in pool.map(_render_batch, batches) for path in paths}
+    return [path for _, path in tasks if path in done]
+
+
+def figure_slide(paths: list, labels: list, root: Path, title: str = SLIDE_TITLE) -> dict:
+    """image_grid 幻灯片（图片路径相对项目根目录，与大纲一致）"""
+    return {
+        "type": "image_grid",
+        "title": title,
+        "images": [Path(os.path.relpath(p, root)).as_posix() for p in paths],
+        "labels": labels,
+    }
+
+
+def build_deck(slide: dict, deck_path: Path, root: Path):
+    """用 PPT/ppt_renderer.py 把图片幻灯片单独生成PPT"""
+    sys.path.insert(0, str(root / "PPT"))
+    from ppt_renderer import DECK_V3, generate_ppt
+    generate_ppt({"slides": [slide]}, deck_path, root, DECK_V3, incremental=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="从酶标仪CSV直接生成杀菌曲线面板")
+    parser.add_argument("--root", type=Path, default=PROJECT_ROOT, help="项目根目录")
+    parser.add_argument("--out", type=Path, default=None, help="面板输出目录（默认 panels/）")
+    parser.add_argument("--workers", type=int, default=None, help="并行进程数")
+    parser.add_argument("--slide-json", type=Path, default=None, help="写出 image_grid 幻灯片JSON")
+    parser.add_argument("--deck", type=Path, default=None, help="直接生成只含该幻灯片的PPT")
+    args = parser.parse_args()
+
+    data_dir = args.root / DATA_SUBDIR
+    out_dir = args.out or data_dir / PANEL_SUBDIR
+    csv_paths = [data_dir / name for name in LAYOUTS if (data_dir / name).exists()]
+
+    jobs = panel_jobs(csv_paths)
+    paths = render_panels(jobs, out_dir, args.workers)
+    for path in paths:
+        print(f"已生成: {path}")
+
+    slide = figure_slide(paths, [job["phage"] for job in jobs], args.root)
+    if args.slide_json:
+        with open(args.slide_json, "w", encoding="utf-8") as f:
+            json.dump(slide, f, ensure_ascii=False, indent=2)
+        print(f"幻灯片JSON: {args.slide_json}")
+    if args.deck:
+        build_deck(slide, args.deck, args.root)
+
+
+if __name__ == "__main__":
+    main()
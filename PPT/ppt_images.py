@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+PPT插图预处理：按版位缩放 + 缓存
+
+add_picture 会把原图整张嵌入 .pptx，再由形状尺寸缩小显示，
+全分辨率照片（3024x4032）在幻灯片上只占几英寸，大部分像素都浪费了。
+这里先按版位尺寸和目标DPI缩小图片，结果缓存到 .image_cache/，
+缓存键为 (路径, 修改时间, 版位, DPI)，中英文两版PPT共用同一份缓存。
+
+同一张图片缩放结果字节完全相同，python-pptx 按 SHA1 自动去重图片部件，
+因此同一演示文稿中重复引用的图片只嵌入一次。
+"""
+
+import hashlib
+import os
+from pathlib import Path
+
+from PIL import Image
+from pptx.util import Emu
+
+CACHE_DIR = Path(__file__).resolve().parent / ".image_cache"
+
+# 投影/屏幕显示足够的分辨率
+TARGET_DPI = 200
+JPEG_QUALITY = 90
+
+
+def box_pixels(box_width, box_height, dpi: int = TARGET_DPI) -> tuple:
+    """版位尺寸（EMU）-> 目标像素尺寸"""
+    return (max(1, round(Emu(box_width).inches * dpi)),
+            max(1, round(Emu(box_height).inches * dpi)))
+
+
+def cache_key(img_path: Path, box: tuple, dpi: int) -> str:
+    stat = img_path.stat()
+    raw = f"{img_path.resolve()}|{stat.st_mtime_ns}|{box[0]}x{box[1]}|{dpi}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def prepare_image(img_path, box_width, box_height, dpi: int = TARGET_DPI,
+                  cache_dir: Path = CACHE_DIR) -> Path:
+    """
+    返回适合嵌入版位的图片路径
+
+    图片等比缩小到刚好放进版位（按目标DPI换算的像素），
+    原图已经足够小时直接返回原路径。
+    """
+    img_path = Path(img_path)
+    box = box_pixels(box_width, box_height, dpi)
+    suffix = ".png" if img_path.suffix.lower() == ".png" else ".jpg"
+    cached = Path(cache_dir) / f"{cache_key(img_path, box, dpi)}{suffix}"
+    if cached.exists():
+        return cached
+
+    with Image.open(img_path) as img:
+        if img.width <= box[0] and img.height <= box[1]:
+            return img_path
+
+        # draft() 让JPEG解码器直接按 1/2、1/4、1/8 缩小解码
+        img.draft("RGB", (box[0], box[1]))
+        scale = min(box[0] / img.width, box[1] / img.height)
+        size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        resized = img.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_name(f"{cached.stem}.{os.getpid()}.tmp{suffix}")
+        if suffix == ".png":
+            resized.save(tmp, "PNG", optimize=True)
+        else:
+            if resized.mode != "RGB":
+                resized = resized.convert("RGB")
+            resized.save(tmp, "JPEG", quality=JPEG_QUALITY, optimize=True)
+        tmp.replace(cached)
+
+    return cached
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+PPT增量生成：幻灯片指纹 + 复用未变化的幻灯片
+
+- 指纹 = 幻灯片JSON + 页码 + 引用图片的内容哈希 + 生成脚本版本
+- 每次生成后在 .pptx 旁写入 <输出名>.manifest.json 记录各页指纹
+- 再次生成时，指纹未变的幻灯片直接从上一版 .pptx 按部件复制
+  （形状XML + 图片部件），只有变化的幻灯片重新渲染
+- 一个大纲条目可能生成多页（表格分页），这些页共用同一个指纹，整体复用或整体重新渲染
+"""
+
+import copy
+import hashlib
+import io
+import json
+from pathlib import Path
+
+from pptx import Presentation
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+
+# 复制时需要重写引用ID的属性
+_R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_REL_ATTRS = [f"{{{_R_NS}}}embed", f"{{{_R_NS}}}link", f"{{{_R_NS}}}id"]
+
+
+def manifest_path(output_path: Path) -> Path:
+    """指纹清单路径：GroupMeeting_v3.pptx -> GroupMeeting_v3.manifest.json"""
+    output_path = Path(output_path)
+    return output_path.with_name(output_path.stem + ".manifest.json")
+
+
+def load_manifest(output_path: Path) -> dict:
+    path = manifest_path(output_path)
+    if Path(output_path).exists() and path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_manifest(output_path: Path, manifest: dict):
+    with open(manifest_path(output_path), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+
+
+def source_hash(*paths) -> str:
+    """生成脚本的源码哈希，布局代码改动后所有幻灯片都会重新渲染"""
+    h = hashlib.sha1()
+    for p in paths:
+        h.update(Path(p).read_bytes())
+    return h.hexdigest()
+
+
+class ImageHashCache:
+    """
+    图片内容哈希缓存
+    以 (大小, 修改时间) 判断文件是否变化，未变化时直接复用上次的哈希，不重读文件
+    """
+
+    def __init__(self, entries: dict = None):
+        self.entries = dict(entries or {})
+
+    def get(self, path: Path) -> str:
+        path = Path(path)
+        if not path.exists():
+            return "missing"
+        stat = path.stat()
+        key = str(path)
+        cached = self.entries.get(key)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = hashlib.sha1(path.read_bytes()).hexdigest()
+        self.entries[key] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+
+def slide_fingerprint(slide_data: dict, page_num: int, base_path: Path,
+                      image_hashes: ImageHashCache, renderer: str = "") -> str:
+    """单页幻灯片指纹"""
+    h = hashlib.sha1()
+    h.update(renderer.encode())
+    h.update(str(page_num).encode())
+    h.update(json.dumps(slide_data, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+    for img_rel_path in slide_data.get("images", []):
+        h.update(image_hashes.get(Path(base_path) / img_rel_path).encode())
+    return h.hexdigest()
+
+
+def can_copy(src_slide) -> bool:
+    """幻灯片只引用图片（及外部链接）时才能按部件复制；图表、嵌入对象等需要重新渲染"""
+    for rel in src_slide.part.rels.values():
+        if rel.reltype in (RT.SLIDE_LAYOUT, RT.NOTES_SLIDE, RT.IMAGE):
+            continue
+        if not rel.is_external:
+            return False
+    return True
+
+
+def copy_slide(src_slide, dst_prs):
+    """
+    把上一版中的幻灯片按部件复制到新演示文稿末尾
+
+    形状XML深拷贝；图片按二进制复制为新包中的图片部件（不重新解码/缩放），
+    并重写XML中的关系ID。遇到无法复制的关系（图表、嵌入对象等）返回 None，
+    由调用方改为重新渲染。
+    """
+    if not can_copy(src_slide):
+        return None
+
+    rel_map = {}
+    dst_slide = dst_prs.slides.add_slide(dst_prs.slide_layouts[6])
+
+    for r_id, rel in src_slide.part.rels.items():
+        if rel.reltype == RT.IMAGE:
+            _, new_id = dst_slide.part.get_or_add_image_part(io.BytesIO(rel.target_part.blob))
+            rel_map[r_id] = new_id
+        elif rel.is_external:
+            rel_map[r_id] = dst_slide.part.relate_to(rel.target_ref, rel.reltype, is_external=True)
+
+    dst_tree = dst_slide.shapes._spTree
+    for shape in src_slide.shapes:
+        element = copy.deepcopy(shape._element)
+        for node in element.iter():
+            for attr in _REL_ATTRS:
+                old_id = node.get(attr)
+                if old_id in rel_map:
+                    node.set(attr, rel_map[old_id])
+        dst_tree.append(element)
+
+    if src_slide.has_notes_slide:
+        notes = src_slide.notes_slide.notes_text_frame.text
+        if notes:
+            dst_slide.notes_slide.notes_text_frame.text = notes
+
+    return dst_slide
+
+
+class IncrementalBuild:
+    """
+    增量生成上下文
+
+    用法:
+        build = IncrementalBuild(output_path, base_path, renderer)
+        for page_num, slide_data in ...:
+            if not build.reuse(prs, slide_data, page_num):
+                n = render(...)          # 本条目生成的页数
+                build.record(n)
+        prs.save(output_path)
+        build.finish()
+    """
+
+    def __init__(self, output_path: Path, base_path: Path, renderer: str = ""):
+        self.output_path = Path(output_path)
+        self.base_path = Path(base_path)
+        self.renderer = renderer
+
+        manifest = load_manifest(self.output_path)
+        self.image_hashes = ImageHashCache(manifest.get("images"))
+        self.fingerprints = []
+        self._pending = None
+        self.reused = 0
+        self.rendered = 0
+
+        self.previous = {}
+        self.previous_prs = None
+        if manifest.get("renderer") == renderer and manifest.get("slides"):
+            try:
+                self.previous_prs = Presentation(str(self.output_path))
+            except Exception as e:
+                print(f"Warning: 无法读取上一版 {self.output_path.name}: {e}")
+            else:
+                slides = list(self.previous_prs.slides)
+                # 连续相同的指纹属于同一个大纲条目（如分页表格）
+                prev_fp = None
+                for idx, fp in enumerate(manifest["slides"][:len(slides)]):
+                    if fp != prev_fp:
+                        self.previous.setdefault(fp, [])
+                    self.previous[fp].append(slides[idx])
+                    prev_fp = fp
+
+    def reuse(self, prs, slide_data: dict, page_num: int) -> int:
+        """
+        指纹未变时复制上一版的对应幻灯片，返回复制的页数；
+        返回 0 表示需要重新渲染，渲染后调用 record(页数)
+        """
+        fp = slide_fingerprint(slide_data, page_num, self.base_path,
+                               self.image_hashes, self.renderer)
+        srcs = self.previous.get(fp)
+        if srcs and all(can_copy(src) for src in srcs):
+            for src in srcs:
+                copy_slide(src, prs)
+            self.fingerprints.extend([fp] * len(srcs))
+            self.reused += len(srcs)
+            return len(srcs)
+        self._pending = fp
+        return 0
+
+    def record(self, n_slides: int = 1):
+        """记录上一个 reuse() 未命中的条目重新渲染生成的页数"""
+        self.fingerprints.extend([self._pending] * n_slides)
+        self.rendered += n_slides
+        self._pending = None
+
+    def finish(self):
+        """保存指纹清单"""
+        save_manifest(self.output_path, {
+            "renderer": self.renderer,
+            "slides": self.fingerprints,
+            "images": self.image_hashes.entries,
+        })
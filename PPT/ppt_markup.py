@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+幻灯片文本标记：解析一次，缓存为 run 列表
+
+大纲中的文本支持以下标记（可嵌套）:
+    **R3**              加粗（默认绿色）
+    *E. coli*           斜体（菌种名）
+    10^14  10^{-3}      上标（滴度）；已是 10¹⁴ 这种 Unicode 上标的无需标记
+    OD_{600}            下标
+    [red]...[/red]      颜色：配色方案中的名称或 #RRGGBB
+
+每个字符串只解析一次（lru_cache），同一表格/演示文稿中重复出现的文本直接复用；
+不含标记字符的文本不走正则。
+"""
+
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from pptx.dml.color import RGBColor
+
+# 一个 run：文本 + 样式；color 为配色名称或 '#RRGGBB'，baseline 为上/下标偏移
+Run = namedtuple('Run', ['text', 'bold', 'italic', 'color', 'baseline'])
+
+# 解析结果：plain 为去掉标记后的纯文本；simple 表示没有斜体/颜色/上下标，
+# 可以按整段文字设置格式
+Markup = namedtuple('Markup', ['plain', 'runs', 'has_bold', 'simple'])
+
+SUPERSCRIPT = 30000
+SUBSCRIPT = -25000
+
+_MARKUP_CHARS = ('*', '^', '_', '[')
+
+_TOKEN = re.compile(
+    r'\*\*(?P<bold>.+?)\*\*(?!\*)'
+    r'|(?<!\*)\*(?P<italic>[^*\s](?:[^*]*[^*\s])?)\*(?!\*)'
+    r'|\^\{(?P<sup>[^}]+)\}'
+    r'|\^(?P<sup_num>[-−]?\d+)'
+    r'|_\{(?P<sub>[^}]+)\}'
+    r'|\[(?P<color>[a-z_]+|#[0-9A-Fa-f]{6})\](?P<colored>.+?)\[/(?P=color)\]'
+)
+
+_PLAIN = Run('', False, False, None, 0)
+
+
+@lru_cache(maxsize=None)
+def _parse(text, style):
+    """按给定起始样式解析，返回 run 元组"""
+    if not any(c in text for c in _MARKUP_CHARS):
+        return (style._replace(text=text),) if text else ()
+
+    runs = []
+    pos = 0
+    for m in _TOKEN.finditer(text):
+        if m.start() > pos:
+            runs.append(style._replace(text=text[pos:m.start()]))
+        kind = m.lastgroup
+        if kind == 'bold':
+            runs.extend(_parse(m.group('bold'), style._replace(bold=True)))
+        elif kind == 'italic':
+            runs.extend(_parse(m.group('italic'), style._replace(italic=True)))
+        elif kind in ('sup', 'sup_num'):
+            runs.extend(_parse(m.group(kind), style._replace(baseline=SUPERSCRIPT)))
+        elif kind == 'sub':
+            runs.extend(_parse(m.group('sub'), style._replace(baseline=SUBSCRIPT)))
+        else:
+            runs.extend(_parse(m.group('colored'), style._replace(color=m.group('color'))))
+        pos = m.end()
+    if pos < len(text):
+        runs.append(style._replace(text=text[pos:]))
+    return tuple(_merge(runs))
+
+
+def _merge(runs):
+    """相邻同样式的 run 合并"""
+    merged = []
+    for run in runs:
+        if merged and merged[-1][1:] == run[1:]:
+            merged[-1] = merged[-1]._replace(text=merged[-1].text + run.text)
+        else:
+            merged.append(run)
+    return merged
+
+
+@lru_cache(maxsize=None)
+def parse(text):
+    """
+    解析标记文本（结果缓存）
+
+    Returns:
+        Markup(plain, runs, has_bold, simple)
+    """
+    runs = _parse(text, _PLAIN)
+    return Markup(
+        plain=''.join(r.text for r in runs),
+        runs=runs,
+        has_bold=any(r.bold for r in runs),
+        simple=all(not r.italic and r.color is None and not r.baseline for r in runs),
+    )
+
+
+def resolve_color(color, palette):
+    """配色名称或 '#RRGGBB' -> RGBColor；未知名称返回 None（沿用默认颜色）"""
+    if color.startswith('#'):
+        return RGBColor.from_string(color[1:])
+    return palette.get(color)
+
+
+def add_runs(paragraph, runs, palette, size=None, color=None, bold_color='green'):
+    """
+    把 run 列表写入段落
+
+    size（Pt）/color（RGBColor）写到每个 run 上（None 表示沿用段落格式）；
+    加粗 run 未指定颜色时使用 bold_color
+    """
+    for r in runs:
+        run = paragraph.add_run()
+        run.text = r.text
+        rgb = resolve_color(r.color, palette) if r.color else None
+        if rgb is None:
+            rgb = palette[bold_color] if r.bold else color
+        if not (r.bold or r.italic or r.baseline or rgb is not None or size is not None):
+            continue
+        font = run.font
+        if r.bold:
+            font.bold = True
+        if r.italic:
+            font.italic = True
+        if rgb is not None:
+            font.color.rgb = rgb
+        if size is not None:
+            font.size = size
+        if r.baseline:
+            run._r.get_or_add_rPr().set('baseline', str(r.baseline))
+
+
+def emphasize(runs):
+    """整格强调：所有 run 加粗（表格中含 ** 的单元格整格加粗绿色）"""
+    return tuple(r._replace(bold=True) for r in runs)
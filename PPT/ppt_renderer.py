@@ -0,0 +1,845 @@
+#!/usr/bin/env python3
+"""
+组会PPT渲染库
+
+generate_ppt.py / generate_ppt_v2.py / generate_ppt_v3.py 共用的渲染代码
+（各版本一个注册表：DECK_V1 纯文字、DECK_V2 含图片、DECK_V3 再加表格+结论）:
+- 公共元素：标题栏、页码、备注、表格、要点列表
+- 幻灯片类型注册表：每种类型 = 版式函数 + 渲染函数，按 type 字段查表分发
+- 版式（各元素位置）按幻灯片尺寸每副演示文稿只计算一次并缓存
+- 生成入口：增量生成（ppt_incremental）、插图预缩放（ppt_images）、多语言并行
+
+新增幻灯片类型:
+    @DECK_V3.register('my_type', layout=my_layout)
+    def create_my_slide(prs, slide_data, page_num, base_path, layout):
+        ...
+"""
+
+import json
+import math
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+from pptx import Presentation
+from pptx.util import Inches, Pt
+from pptx.dml.color import RGBColor
+from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
+from pptx.enum.shapes import MSO_SHAPE
+
+from ppt_incremental import IncrementalBuild, source_hash
+import ppt_images
+from ppt_images import prepare_image
+import ppt_markup
+from ppt_markup import add_runs, emphasize, parse
+
+# 配色方案
+COLORS = {
+    'primary_blue': RGBColor(0x14, 0x65, 0xC0),
+    'dark_blue': RGBColor(0x0D, 0x47, 0xA1),
+    'green': RGBColor(0x4C, 0xAF, 0x50),
+    'dark_gray': RGBColor(0x33, 0x33, 0x33),
+    'light_gray': RGBColor(0x75, 0x75, 0x75),
+    'white': RGBColor(0xFF, 0xFF, 0xFF),
+    'header_bg': RGBColor(0x14, 0x65, 0xC0),
+    'row_alt': RGBColor(0xF5, 0xF5, 0xF5),
+}
+
+# 幻灯片尺寸 (16:9)
+SLIDE_WIDTH = Inches(13.333)
+SLIDE_HEIGHT = Inches(7.5)
+
+Geometry = namedtuple('Geometry', ['width', 'height'])
+DEFAULT_GEOMETRY = Geometry(SLIDE_WIDTH, SLIDE_HEIGHT)
+
+BLANK_LAYOUT = 6
+
+# 表格行高估算：CJK字符按 1 em、其他字符按 0.55 em 计宽度；
+# 单元格左右边距合计 0.2"，上下合计 0.1"
+CJK_START = 0x2E80
+LATIN_EM = 0.55
+LINE_SPACING = 1.2
+CELL_MARGIN_X = Inches(0.2)
+CELL_MARGIN_Y = Inches(0.1)
+
+
+# ============ 注册表 ============
+
+class SlideType:
+    """一种幻灯片类型：渲染函数 + 版式函数（版式按尺寸缓存）"""
+
+    def __init__(self, name, render, layout=None):
+        self.name = name
+        self.render = render
+        self.layout_fn = layout or base_layout
+        self._layouts = {}
+
+    def layout(self, geometry):
+        cached = self._layouts.get(geometry)
+        if cached is None:
+            cached = self._layouts[geometry] = self.layout_fn(geometry)
+        return cached
+
+
+class SlideRegistry:
+    """
+    幻灯片类型注册表
+
+    base: 继承另一个注册表的全部类型（版本之间只覆盖不同的类型）
+    default: 未知 type 时使用的类型
+    """
+
+    def __init__(self, name, base=None, default=None):
+        self.name = name
+        self.types = dict(base.types) if base else {}
+        self.default = default or (base.default if base else None)
+
+    def register(self, *names, layout=None):
+        def decorator(render):
+            for name in names:
+                self.types[name] = SlideType(name, render, layout)
+            return render
+        return decorator
+
+    def get(self, slide_type):
+        return self.types.get(slide_type) or self.types[self.default]
+
+    def render(self, prs, slide_data, page_num, base_path, geometry=DEFAULT_GEOMETRY):
+        slide_type = self.get(slide_data.get('type', 'content'))
+        return slide_type.render(prs, slide_data, page_num, base_path, slide_type.layout(geometry))
+
+
+# ============ 版式 ============
+
+def base_layout(geo):
+    """所有类型共用的标题栏和页码位置"""
+    return {
+        'header_bar': (0, 0, geo.width, Inches(0.9)),
+        'header_title': (Inches(0.5), Inches(0.2), geo.width - Inches(1), Inches(0.6)),
+        'page_number': (geo.width - Inches(0.8), geo.height - Inches(0.5), Inches(0.6), Inches(0.3)),
+    }
+
+
+def title_layout(geo):
+    layout = base_layout(geo)
+    layout.update({
+        'title': (Inches(0.5), Inches(2.5), geo.width - Inches(1), Inches(1.2)),
+        'subtitle': (Inches(0.5), Inches(3.8), geo.width - Inches(1), Inches(0.6)),
+        'info': (Inches(0.5), Inches(5.5), geo.width - Inches(1), Inches(1)),
+    })
+    return layout
+
+
+def thank_you_layout(geo):
+    layout = base_layout(geo)
+    layout.update({
+        'title': (Inches(0.5), Inches(2.8), geo.width - Inches(1), Inches(1.2)),
+        'qa': (Inches(0.5), Inches(4.2), geo.width - Inches(1), Inches(0.6)),
+    })
+    return layout
+
+
+def image_grid_layout(geo):
+    """5张图片布局: 上排3张，下排2张居中"""
+    layout = base_layout(geo)
+    layout.update({
+        'images': [
+            # 上排3张
+            (Inches(0.5), Inches(1.2), Inches(4), Inches(2.8)),
+            (Inches(4.67), Inches(1.2), Inches(4), Inches(2.8)),
+            (Inches(8.83), Inches(1.2), Inches(4), Inches(2.8)),
+            # 下排2张居中
+            (Inches(2.58), Inches(4.2), Inches(4), Inches(2.8)),
+            (Inches(6.75), Inches(4.2), Inches(4), Inches(2.8)),
+        ],
+        'label_gap': Inches(0.05),
+        'label_height': Inches(0.3),
+    })
+    return layout
+
+
+def two_images_layout(geo):
+    """左右两张图"""
+    layout = base_layout(geo)
+    layout.update({
+        'images': [
+            (Inches(0.3), Inches(1.1), Inches(6.3), Inches(5.8)),   # 左图
+            (Inches(6.7), Inches(1.1), Inches(6.3), Inches(5.8)),   # 右图
+        ],
+        'label_offset': Inches(5.0),
+        'label_height': Inches(0.4),
+    })
+    return layout
+
+
+def summary_table_layout(geo):
+    layout = base_layout(geo)
+    layout.update({
+        'table': (Inches(0.5), Inches(1.2), geo.width - Inches(1.0)),
+        'row_height': Inches(0.6),
+        'max_table_height': Inches(5.5),
+        'header_pt': 16,
+        'body_pt': 14,
+        'footnote': (Inches(0.5), geo.height - Inches(0.8), geo.width - Inches(1.0), Inches(0.4)),
+    })
+    return layout
+
+
+def table_with_conclusion_layout(geo):
+    layout = base_layout(geo)
+    layout.update({
+        'table': (Inches(0.5), Inches(1.2), geo.width - Inches(1.0)),
+        'row_height': Inches(0.55),
+        'max_table_height': None,
+        'header_pt': 18,
+        'body_pt': 16,
+        'conclusion_gap': Inches(0.5),
+        'conclusion_title_height': Inches(0.4),
+        'conclusion_content_offset': Inches(0.5),
+        'conclusion_content_height': Inches(3),
+    })
+    return layout
+
+
+def conclusion_layout(geo):
+    layout = base_layout(geo)
+    layout.update({
+        'left_title': (Inches(0.5), Inches(1.2), Inches(5.5), Inches(0.5)),
+        'left_content': (Inches(0.5), Inches(1.8), Inches(5.8), Inches(4.5)),
+        'right_title': (Inches(6.8), Inches(1.2), Inches(5.5), Inches(0.5)),
+        'right_content': (Inches(6.8), Inches(1.8), Inches(5.8), Inches(4.5)),
+    })
+    return layout
+
+
+def content_layout(geo):
+    layout = base_layout(geo)
+    content_top = Inches(1.3)
+    layout['content'] = (Inches(0.8), content_top,
+                         geo.width - Inches(1.6), geo.height - content_top - Inches(0.8))
+    return layout
+
+
+def table_v1_layout(geo):
+    layout = base_layout(geo)
+    layout.update({
+        'table': (Inches(0.8), Inches(1.3), geo.width - Inches(1.6)),
+        'row_height': Inches(0.5),
+        'max_table_height': Inches(4.5),
+        'header_pt': 14,
+        'body_pt': 13,
+        'footnote': (Inches(0.8), geo.height - Inches(1), geo.width - Inches(1.6), Inches(0.4)),
+    })
+    return layout
+
+
+# ============ 公共元素 ============
+
+def new_slide(prs):
+    return prs.slides.add_slide(prs.slide_layouts[BLANK_LAYOUT])
+
+
+def add_text(slide, rect, text, size, color, bold=False, italic=False, align=None):
+    """添加单段文本框"""
+    box = slide.shapes.add_textbox(*rect)
+    tf = box.text_frame
+    p = tf.paragraphs[0]
+    p.text = text
+    p.font.size = Pt(size)
+    if bold:
+        p.font.bold = True
+    if italic:
+        p.font.italic = True
+    p.font.color.rgb = COLORS[color]
+    if align is not None:
+        p.alignment = align
+    return box
+
+
+def add_page_number(slide, page_num, layout):
+    """添加页码到右下角"""
+    add_text(slide, layout['page_number'], str(page_num), 14, 'primary_blue',
+             bold=True, align=PP_ALIGN.RIGHT)
+
+
+def add_header_bar(slide, title, layout):
+    """添加顶部标题栏"""
+    header = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, *layout['header_bar'])
+    header.fill.solid()
+    header.fill.fore_color.rgb = COLORS['header_bg']
+    header.line.fill.background()
+
+    add_text(slide, layout['header_title'], title, 28, 'white', bold=True)
+
+
+def add_notes(slide, slide_data):
+    if 'notes' in slide_data:
+        slide.notes_slide.notes_text_frame.text = slide_data['notes']
+
+
+def add_markup(paragraph, text, size=None, color=None):
+    """
+    写入带标记的文本（**加粗**、*斜体*、上下标、颜色，见 ppt_markup.py）
+    加粗部分为绿色；size/color 为 None 时沿用段落格式
+    """
+    add_runs(paragraph, parse(text).runs, COLORS,
+             size=Pt(size) if size is not None else None,
+             color=COLORS[color] if color is not None else None)
+
+
+def add_paragraphs(slide, rect, items, fill):
+    """添加多段文本框，fill(paragraph, item) 负责每段的内容和格式"""
+    box = slide.shapes.add_textbox(*rect)
+    tf = box.text_frame
+    tf.word_wrap = True
+    for i, item in enumerate(items):
+        p = tf.add_paragraph() if i > 0 else tf.paragraphs[0]
+        fill(p, item)
+    return box
+
+
+def add_table(slide, headers, rows, layout, rich_cells=False):
+    """
+    添加数据表格
+
+    单元格文本支持 ppt_markup 标记
+    rich_cells=False: 含 ** 的单元格整格加粗绿色（v2/v3）
+    rich_cells=True:  ** 片段逐段加粗（v1）
+
+    Returns:
+        (table, table_height)
+    """
+    left, top, table_width = layout['table']
+    num_cols = len(headers)
+    num_rows = len(rows) + 1
+
+    table_height = layout['row_height'] * num_rows
+    if layout['max_table_height'] is not None:
+        table_height = min(table_height, layout['max_table_height'])
+
+    table = slide.shapes.add_table(
+        num_rows, num_cols, left, top, table_width, table_height
+    ).table
+
+    # 设置列宽
+    col_width = table_width / num_cols
+    for i in range(num_cols):
+        table.columns[i].width = int(col_width)
+
+    # 填充表头
+    for i, header in enumerate(headers):
+        cell = table.cell(0, i)
+        cell.text = header
+        cell.fill.solid()
+        cell.fill.fore_color.rgb = COLORS['primary_blue']
+
+        p = cell.text_frame.paragraphs[0]
+        p.font.size = Pt(layout['header_pt'])
+        p.font.bold = True
+        p.font.color.rgb = COLORS['white']
+        p.alignment = PP_ALIGN.CENTER
+        cell.vertical_anchor = MSO_ANCHOR.MIDDLE
+
+    # 填充数据行：先统一解析全部单元格（解析结果有缓存），再逐格写入
+    cells = [[parse(str(cell_text)) for cell_text in row_data] for row_data in rows]
+    body_size = Pt(layout['body_pt'])
+    alt_fill = COLORS['row_alt']
+
+    for row_idx, row_cells in enumerate(cells):
+        for col_idx, markup in enumerate(row_cells):
+            cell = table.cell(row_idx + 1, col_idx)
+            p = cell.text_frame.paragraphs[0]
+
+            if rich_cells:
+                add_runs(p, markup.runs, COLORS)
+            elif markup.simple:
+                cell.text = markup.plain
+                p = cell.text_frame.paragraphs[0]
+                if markup.has_bold:
+                    p.font.bold = True
+                    p.font.color.rgb = COLORS['green']
+                else:
+                    p.font.color.rgb = COLORS['dark_gray']
+            else:
+                runs = emphasize(markup.runs) if markup.has_bold else markup.runs
+                add_runs(p, runs, COLORS, color=COLORS['dark_gray'])
+
+            p.font.size = body_size
+            p.alignment = PP_ALIGN.CENTER
+            cell.vertical_anchor = MSO_ANCHOR.MIDDLE
+
+            # 交替行背景色
+            if row_idx % 2 == 1:
+                cell.fill.solid()
+                cell.fill.fore_color.rgb = alt_fill
+
+    return table, table_height
+
+
+@lru_cache(maxsize=None)
+def cell_lines(text, font_pt, inner_width):
+    """单元格文本在给定宽度（EMU）下折行后的行数"""
+    line_width = inner_width / Pt(font_pt)
+    lines = 0
+    for segment in text.split('\n'):
+        em = sum(1.0 if ord(c) >= CJK_START else LATIN_EM for c in segment)
+        lines += max(1, math.ceil(em / line_width))
+    return lines
+
+
+def measure_rows(rows, col_width, font_pt, min_height):
+    """
+    估算表格每行的渲染高度（EMU）
+    每行只计算一次，相同文本的折行结果有缓存
+    """
+    inner_width = max(int(col_width - CELL_MARGIN_X), Pt(font_pt))
+    line_height = Pt(font_pt) * LINE_SPACING
+    heights = []
+    for row in rows:
+        lines = max((cell_lines(parse(str(c)).plain, font_pt, inner_width) for c in row), default=1)
+        heights.append(max(min_height, int(lines * line_height + CELL_MARGIN_Y)))
+    return heights
+
+
+def paginate_rows(heights, capacity):
+    """按累计行高贪心分页，返回 [(start, end)]；每页至少一行"""
+    pages = []
+    start = 0
+    used = 0
+    for i, h in enumerate(heights):
+        if i > start and used + h > capacity:
+            pages.append((start, i))
+            start, used = i, 0
+        used += h
+    pages.append((start, len(heights)))
+    return pages
+
+
+def add_table_slides(prs, slide_data, page_num, layout, rich_cells=False):
+    """
+    表格幻灯片（自动分页）
+
+    行高按内容估算一次，放不进 max_table_height 的行移到续页，
+    续页重复表头，标题加 (2/3) 这样的页序；脚注每页都有，备注只放第一页
+    """
+    headers = slide_data.get('headers', [])
+    rows = slide_data.get('rows', [])
+
+    if not headers or not rows:
+        slide = new_slide(prs)
+        add_header_bar(slide, slide_data['title'], layout)
+        add_page_number(slide, page_num, layout)
+        return slide
+
+    _, _, table_width = layout['table']
+    col_width = table_width / len(headers)
+    header_height = measure_rows([headers], col_width, layout['header_pt'], layout['row_height'])[0]
+    heights = measure_rows(rows, col_width, layout['body_pt'], layout['row_height'])
+    pages = paginate_rows(heights, layout['max_table_height'] - header_height)
+
+    for k, (start, end) in enumerate(pages):
+        slide = new_slide(prs)
+        title = slide_data['title']
+        if len(pages) > 1:
+            title = f"{title} ({k + 1}/{len(pages)})"
+        add_header_bar(slide, title, layout)
+
+        add_table(slide, headers, rows[start:end], layout, rich_cells=rich_cells)
+        add_footnote(slide, slide_data, layout)
+
+        add_page_number(slide, page_num + k, layout)
+        if k == 0:
+            add_notes(slide, slide_data)
+    return slide
+
+
+def add_footnote(slide, slide_data, layout):
+    if 'footnote' in slide_data:
+        add_text(slide, layout['footnote'], slide_data['footnote'], 12, 'light_gray', italic=True)
+
+
+def add_picture_fit(slide, img_path, rect):
+    """按版位添加图片：先预缩放，宽度铺满，超高时等比缩小"""
+    left, top, width, height = rect
+    img_file = prepare_image(img_path, width, height)
+    pic = slide.shapes.add_picture(str(img_file), left, top, width=width)
+    if pic.height > height:
+        ratio = height / pic.height
+        pic.width = int(pic.width * ratio)
+        pic.height = height
+    return pic
+
+
+# ============ v3 幻灯片类型（含图片、表格+结论） ============
+
+DECK_V3 = SlideRegistry('v3', default='table')
+
+
+@DECK_V3.register('title', layout=title_layout)
+def create_title_slide(prs, slide_data, page_num, base_path, layout):
+    """创建封面幻灯片（无页码）"""
+    slide = new_slide(prs)
+
+    add_text(slide, layout['title'], slide_data['title'], 44, 'dark_blue',
+             bold=True, align=PP_ALIGN.CENTER)
+    add_text(slide, layout['subtitle'], slide_data.get('subtitle', ''), 24, 'light_gray',
+             align=PP_ALIGN.CENTER)
+    add_text(slide, layout['info'],
+             f"{slide_data.get('presenter', '')}  |  {slide_data.get('date', '')}",
+             18, 'dark_gray', align=PP_ALIGN.CENTER)
+
+    add_notes(slide, slide_data)
+    return slide
+
+
+@DECK_V3.register('image_grid', layout=image_grid_layout)
+def create_image_grid_slide(prs, slide_data, page_num, base_path, layout):
+    """创建图片网格幻灯片（5张斑块照片）"""
+    slide = new_slide(prs)
+    add_header_bar(slide, slide_data['title'], layout)
+
+    images = slide_data.get('images', [])
+    labels = slide_data.get('labels', [])
+
+    for (img_rel_path, label), rect in zip(zip(images, labels), layout['images']):
+        img_path = base_path / img_rel_path
+        if not img_path.exists():
+            continue
+
+        left, top, width, height = rect
+        try:
+            add_picture_fit(slide, img_path, rect)
+        except Exception as e:
+            print(f"Warning: Could not add image {img_path}: {e}")
+            continue
+
+        add_text(slide, (left, top + height + layout['label_gap'], width, layout['label_height']),
+                 label, 14, 'dark_gray', bold=True, align=PP_ALIGN.CENTER)
+
+    add_page_number(slide, page_num, layout)
+    add_notes(slide, slide_data)
+    return slide
+
+
+@DECK_V3.register('two_images', layout=two_images_layout)
+def create_two_images_slide(prs, slide_data, page_num, base_path, layout):
+    """创建双图幻灯片（杀菌曲线对比）"""
+    slide = new_slide(prs)
+    add_header_bar(slide, slide_data['title'], layout)
+
+    images = slide_data.get('images', [])
+    labels = slide_data.get('labels', [])
+
+    for (img_rel_path, label), rect in zip(zip(images, labels), layout['images']):
+        img_path = base_path / img_rel_path
+        if not img_path.exists():
+            print(f"Warning: Image not found: {img_path}")
+            continue
+
+        left, top, max_width, _ = rect
+        try:
+            add_picture_fit(slide, img_path, rect)
+        except Exception as e:
+            print(f"Warning: Could not add image {img_path}: {e}")
+            continue
+
+        # 标签放在图片下方
+        add_text(slide, (left, top + layout['label_offset'], max_width, layout['label_height']),
+                 label, 16, 'dark_blue', bold=True, align=PP_ALIGN.CENTER)
+
+    add_page_number(slide, page_num, layout)
+    add_notes(slide, slide_data)
+    return slide
+
+
+@DECK_V3.register('table', layout=summary_table_layout)
+def create_summary_table_slide(prs, slide_data, page_num, base_path, layout):
+    """创建精简表格幻灯片（行数多时自动分页）"""
+    return add_table_slides(prs, slide_data, page_num, layout)
+
+
+@DECK_V3.register('table_with_conclusion', layout=table_with_conclusion_layout)
+def create_table_with_conclusion_slide(prs, slide_data, page_num, base_path, layout):
+    """创建表格+结论幻灯片"""
+    slide = new_slide(prs)
+    add_header_bar(slide, slide_data['title'], layout)
+
+    headers = slide_data.get('headers', [])
+    rows = slide_data.get('rows', [])
+    conclusions = slide_data.get('conclusions', [])
+
+    if not headers or not rows:
+        add_page_number(slide, page_num, layout)
+        return slide
+
+    # 表格放在上半部分
+    _, table_height = add_table(slide, headers, rows, layout)
+
+    # 添加结论部分（表格下方）
+    if conclusions:
+        left, table_top, table_width = layout['table']
+        conclusion_top = table_top + table_height + layout['conclusion_gap']
+
+        add_text(slide, (left, conclusion_top, table_width, layout['conclusion_title_height']),
+                 "Key Findings", 20, 'primary_blue', bold=True)
+
+        def fill(p, item):
+            p.space_before = Pt(12)
+            add_markup(p, f"• {item}", 18, 'dark_gray')
+
+        add_paragraphs(slide, (left, conclusion_top + layout['conclusion_content_offset'],
+                               table_width, layout['conclusion_content_height']),
+                       conclusions, fill)
+
+    add_page_number(slide, page_num, layout)
+    add_notes(slide, slide_data)
+    return slide
+
+
+@DECK_V3.register('conclusion', layout=conclusion_layout)
+def create_conclusion_slide(prs, slide_data, page_num, base_path, layout):
+    """创建结论幻灯片（双栏布局）"""
+    slide = new_slide(prs)
+    add_header_bar(slide, slide_data['title'], layout)
+
+    # 左栏：主要发现
+    add_text(slide, layout['left_title'],
+             "Main Findings" if 'findings' in slide_data else "主要发现",
+             20, 'primary_blue', bold=True)
+
+    def fill_finding(p, item):
+        p.space_before = Pt(8)
+        add_markup(p, f"• {item}", 16, 'dark_gray')
+
+    add_paragraphs(slide, layout['left_content'], slide_data.get('findings', []), fill_finding)
+
+    # 右栏：下一步计划
+    add_text(slide, layout['right_title'],
+             "Next Steps" if 'next_steps' in slide_data else "下一步计划",
+             20, 'green', bold=True)
+
+    def fill_step(p, item):
+        p.space_before = Pt(8)
+        p.text = f"→ {item}"
+        p.font.size = Pt(16)
+        p.font.color.rgb = COLORS['dark_gray']
+
+    add_paragraphs(slide, layout['right_content'], slide_data.get('next_steps', []), fill_step)
+
+    add_page_number(slide, page_num, layout)
+    add_notes(slide, slide_data)
+    return slide
+
+
+@DECK_V3.register('thank_you', layout=thank_you_layout)
+def create_thank_you_slide(prs, slide_data, page_num, base_path, layout):
+    """创建致谢幻灯片"""
+    slide = new_slide(prs)
+
+    add_text(slide, layout['title'], "Thank You!", 54, 'primary_blue',
+             bold=True, align=PP_ALIGN.CENTER)
+    add_text(slide, layout['qa'], "Questions & Discussion", 24, 'light_gray',
+             align=PP_ALIGN.CENTER)
+
+    add_page_number(slide, page_num, layout)
+    add_notes(slide, slide_data)
+    return slide
+
+
+# ============ v2 幻灯片类型 ============
+
+# v2 没有 table_with_conclusion：与原 generate_ppt_v2.py 一样按精简表格渲染（结论不显示）
+DECK_V2 = SlideRegistry('v2', base=DECK_V3)
+DECK_V2.register('table_with_conclusion', layout=summary_table_layout)(create_summary_table_slide)
+
+
+# ============ v1 幻灯片类型（纯文字版） ============
+
+# v1 只有文字类型：图片、表格+结论等未注册的类型按要点列表渲染（与原 generate_ppt.py 一致）
+DECK_V1 = SlideRegistry('v1', default='content')
+DECK_V1.register('title', layout=title_layout)(create_title_slide)
+DECK_V1.register('thank_you', layout=thank_you_layout)(create_thank_you_slide)
+
+
+@DECK_V1.register('content', 'two_column', layout=content_layout)
+def create_content_slide(prs, slide_data, page_num, base_path, layout):
+    """创建内容幻灯片（要点列表）"""
+    slide = new_slide(prs)
+    add_header_bar(slide, slide_data['title'], layout)
+
+    def fill(p, item):
+        p.space_before = Pt(12)
+        p.space_after = Pt(8)
+        add_markup(p, f"• {item}")
+        p.font.size = Pt(22)
+        p.font.color.rgb = COLORS['dark_gray']
+
+    add_paragraphs(slide, layout['content'], slide_data.get('content', []), fill)
+
+    add_page_number(slide, page_num, layout)
+    add_notes(slide, slide_data)
+    return slide
+
+
+@DECK_V1.register('table', layout=table_v1_layout)
+def create_table_slide(prs, slide_data, page_num, base_path, layout):
+    """创建表格幻灯片（行数多时自动分页）"""
+    return add_table_slides(prs, slide_data, page_num, layout, rich_cells=True)
+
+
+@DECK_V1.register('conclusion', layout=conclusion_layout)
+def create_conclusion_slide_v1(prs, slide_data, page_num, base_path, layout):
+    """创建结论幻灯片（双栏布局，18号字）"""
+    slide = new_slide(prs)
+    add_header_bar(slide, slide_data['title'], layout)
+
+    add_text(slide, layout['left_title'],
+             "Main Findings" if 'findings' in slide_data else "主要发现",
+             20, 'primary_blue', bold=True)
+
+    def fill_finding(p, item):
+        p.space_before = Pt(8)
+        add_markup(p, f"• {item}")
+        p.font.size = Pt(18)
+        p.font.color.rgb = COLORS['dark_gray']
+
+    add_paragraphs(slide, layout['left_content'], slide_data.get('findings', []), fill_finding)
+
+    add_text(slide, layout['right_title'],
+             "Next Steps" if 'next_steps' in slide_data else "下一步计划",
+             20, 'green', bold=True)
+
+    def fill_step(p, item):
+        p.space_before = Pt(8)
+        p.text = f"→ {item}"
+        p.font.size = Pt(18)
+        p.font.color.rgb = COLORS['dark_gray']
+
+    add_paragraphs(slide, layout['right_content'], slide_data.get('next_steps', []), fill_step)
+
+    add_page_number(slide, page_num, layout)
+    add_notes(slide, slide_data)
+    return slide
+
+
+REGISTRIES = {
+    'v1': DECK_V1,
+    'v2': DECK_V2,
+    'v3': DECK_V3,
+}
+
+
+# ============ 生成入口 ============
+
+def load_outline(outline_path):
+    """读取JSON框架"""
+    with open(outline_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def generate_ppt(outline, output_path, base_path, registry=DECK_V3, incremental=True,
+                 geometry=DEFAULT_GEOMETRY):
+    """
+    根据JSON框架生成PPT
+
+    outline 可以是JSON文件路径，也可以是已解析的框架 dict
+    incremental=True 时，指纹未变化的幻灯片直接从上一版 output_path 复制，
+    只重新渲染有改动的幻灯片
+    """
+    if not isinstance(outline, dict):
+        outline = load_outline(outline)
+    base_path = Path(base_path)
+
+    prs = Presentation()
+    prs.slide_width = geometry.width
+    prs.slide_height = geometry.height
+
+    build = None
+    if incremental:
+        # 插图的预缩放（ppt_images）也决定幻灯片内容
+        renderer = f"{registry.name}:{source_hash(__file__, ppt_markup.__file__, ppt_images.__file__)}"
+        build = IncrementalBuild(output_path, base_path, renderer)
+
+    page_num = 0
+
+    for slide_data in outline.get('slides', []):
+        page_num += 1
+        if build is not None:
+            reused = build.reuse(prs, slide_data, page_num)
+            if reused:
+                page_num += reused - 1
+                continue
+        # 一个条目可能生成多页（表格分页）
+        n_before = len(prs.slides)
+        registry.render(prs, slide_data, page_num, base_path, geometry)
+        n_slides = len(prs.slides) - n_before
+        page_num += n_slides - 1
+        if build is not None:
+            build.record(n_slides)
+
+    prs.save(output_path)
+    if build is not None:
+        build.finish()
+        print(f"已生成: {output_path} (复用 {build.reused} 页, 重新渲染 {build.rendered} 页)")
+    else:
+        print(f"已生成: {output_path}")
+    return page_num
+
+
+def prepare_shared_images(outlines, base_path, registry=DECK_V3, geometry=DEFAULT_GEOMETRY,
+                          max_workers=None):
+    """
+    预先缩放所有大纲引用的图片（各语言版本共用，每个 图片×版位 只处理一次）
+    结果写入 ppt_images 缓存，各进程渲染时直接命中缓存
+    """
+    jobs = set()
+    for outline in outlines:
+        for slide_data in outline.get('slides', []):
+            positions = registry.get(slide_data.get('type', 'content')).layout(geometry).get('images')
+            if not positions:
+                continue
+            for img_rel_path, (_, _, width, height) in zip(slide_data.get('images', []), positions):
+                img_path = base_path / img_rel_path
+                if img_path.exists():
+                    jobs.add((img_path, width, height))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        list(pool.map(lambda job: prepare_image(*job), jobs))
+    return len(jobs)
+
+
+def _build_one(job):
+    """子进程入口：渲染一个语言版本"""
+    outline, output_path, base_path, registry_name = job
+    return output_path, generate_ppt(outline, output_path, base_path, REGISTRIES[registry_name])
+
+
+def build_all(targets, base_dir, project_root, version='v3', max_workers=None):
+    """
+    多目标构建：一次读取所有大纲、统一预处理图片，
+    然后每个语言版本在独立进程中并行渲染和保存
+
+    Returns:
+        [(output_path, pages)]
+    """
+    base_dir = Path(base_dir)
+    project_root = Path(project_root)
+    jobs = []
+    for outline_name, output_name in targets:
+        outline_path = base_dir / outline_name
+        if outline_path.exists():
+            jobs.append((load_outline(outline_path), base_dir / output_name, project_root, version))
+
+    if not jobs:
+        return []
+
+    n_images = prepare_shared_images([job[0] for job in jobs], project_root, REGISTRIES[version])
+    if n_images:
+        print(f"预处理图片: {n_images} 个")
+
+    if len(jobs) == 1:
+        return [_build_one(jobs[0])]
+
+    with ProcessPoolExecutor(max_workers=max_workers or len(jobs)) as pool:
+        return list(pool.map(_build_one, jobs))